@@ -7,6 +7,7 @@ from .models import (
     PlayerInfo,
     FloorHistoryModel,
     NonCombatFloorModel,
+    TurnJob,
 )
 
 admin.site.register(GameSession)
@@ -14,3 +15,4 @@ admin.site.register(GameEvent)
 admin.site.register(PlayerInfo)
 admin.site.register(FloorHistoryModel)
 admin.site.register(NonCombatFloorModel)
+admin.site.register(TurnJob)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # Read and compile every prompt template once, at startup. A broken
+        # template fails here instead of in the middle of a turn.
+        from game.llm_api.PromptTemplates import get_prompt_templates
+
+        get_prompt_templates()
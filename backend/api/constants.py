@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 
 # Time period for updating user's last_modified timestamp to reduce database writes
@@ -5,3 +6,31 @@ USER_LAST_MODIFIED_UPDATE_INTERVAL = timedelta(minutes=1)
 
 # Time period after which inactive users will be considered for cleanup
 USER_INACTIVITY_EXPIRY_INTERVAL = timedelta(days=30)  # 1 month
+
+# Generate the next floor's intro while the player finishes the current one, on
+# the turn job threads (TURN_JOB_WORKERS)
+NEXT_FLOOR_PREFETCH_ENABLED = os.getenv(
+    "NEXT_FLOOR_PREFETCH_ENABLED", "0"
+).lower() in ("true", "1", "t")
+
+# A prefetch that has not finished after this long is considered lost
+NEXT_FLOOR_PREFETCH_TIMEOUT = timedelta(minutes=2)
+
+# Run player_input and new_floor as TurnJobs and answer 202 with the job id.
+# A request can also ask for either mode with ?async=1 or ?async=0
+TURN_JOBS_ENABLED = os.getenv("TURN_JOBS_ENABLED", "0").lower() in ("true", "1", "t")
+
+# Run the jobs in threads of the web process. Off to leave them to a separate
+# `python manage.py run_turn_jobs` worker
+TURN_JOBS_IN_PROCESS = os.getenv(
+    "TURN_JOBS_IN_PROCESS", "1"
+).lower() in ("true", "1", "t")
+
+# Number of turns run at the same time by a worker
+TURN_JOB_WORKERS = int(os.getenv("TURN_JOB_WORKERS", "4"))
+
+# A job still running after this long is considered lost and run again
+TURN_JOB_TIMEOUT = timedelta(minutes=5)
+
+# Longest wait of a long-polling status request
+TURN_JOB_MAX_WAIT = 30
@@ -0,0 +1,24 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .constants import TURN_JOB_WORKERS
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    The threads of this process running work outside of the requests: turn jobs
+    and next floor prefetches.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=TURN_JOB_WORKERS, thread_name_prefix="turn-job"
+            )
+
+        return _executor
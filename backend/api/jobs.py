@@ -0,0 +1,176 @@
+import time
+import logging
+import threading
+from typing import Optional
+
+import openai
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from game.models.Telemetry import telemetry_session
+
+from .constants import TURN_JOBS_IN_PROCESS, TURN_JOB_TIMEOUT
+from .executor import get_executor
+from .models import GameSession, TurnJob, TurnJobKind, TurnJobStatus
+from .turns import TurnResult, run_new_floor, run_player_input
+from .utils import llm_error_result
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [TurnJobStatus.QUEUED, TurnJobStatus.RUNNING]
+
+# Notified when a job of this process is done, wakes up the long-polling requests
+job_done = threading.Condition()
+
+_pending_jobs_picked_up = False
+_pending_jobs_lock = threading.Lock()
+
+
+def submit_job(job_id):
+    """
+    Run the job on the threads of this process. The first job also has them
+    pick up the jobs left queued by a previous run.
+    """
+    global _pending_jobs_picked_up
+
+    executor = get_executor()
+    with _pending_jobs_lock:
+        if not _pending_jobs_picked_up:
+            _pending_jobs_picked_up = True
+            executor.submit(run_pending_jobs)
+
+    executor.submit(run_job_in_thread, job_id)
+
+
+def enqueue_turn_job(
+    session: GameSession, kind: TurnJobKind, payload: dict
+) -> tuple[TurnJob, bool]:
+    """
+    Queue a turn of the session. A session has one turn queued or running at a
+    time: while there is one, it is returned instead, with created False.
+    """
+    active = active_turn_job(session)
+    if active is not None:
+        return active, False
+
+    try:
+        with transaction.atomic():
+            job = TurnJob.objects.create(session=session, kind=kind, payload=payload)
+
+    except IntegrityError:
+        # Another request of the session got in between
+        return active_turn_job(session), False
+
+    if TURN_JOBS_IN_PROCESS:
+        submit_job(job.pk)
+
+    return job, True
+
+
+def active_turn_job(session: GameSession) -> Optional[TurnJob]:
+    return TurnJob.objects.filter(session=session, status__in=ACTIVE_STATUSES).first()
+
+
+def claimable() -> Q:
+    """Jobs that are queued, or running for so long that their worker is lost."""
+    return Q(status=TurnJobStatus.QUEUED) | Q(
+        status=TurnJobStatus.RUNNING,
+        started_at__lt=timezone.now() - TURN_JOB_TIMEOUT,
+    )
+
+
+def claim_job(job_id=None) -> Optional[TurnJob]:
+    """
+    Mark the job, or the oldest claimable job, as running. None if there is
+    none, or another worker was faster.
+    """
+    jobs = TurnJob.objects.filter(claimable())
+    if job_id is not None:
+        jobs = jobs.filter(pk=job_id)
+
+    for job in jobs.order_by("created_at")[:10]:
+        claimed = TurnJob.objects.filter(claimable(), pk=job.pk).update(
+            status=TurnJobStatus.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def run_turn(job: TurnJob) -> TurnResult:
+    # Fresh from the database, the turns before this one changed it
+    session = GameSession.objects.get(pk=job.session_id)
+
+    with telemetry_session(session.pk):
+        if job.kind == TurnJobKind.NEW_FLOOR:
+            return run_new_floor(session)
+
+        return run_player_input(
+            session, job.payload["action"], job.payload["suggested_actions"]
+        )
+
+
+def run_job(job: TurnJob):
+    """Run the claimed job and store its result, with the errors the views give."""
+    try:
+        result, status_code = run_turn(job)
+
+    except openai.APIError as e:
+        result, status_code = llm_error_result(e)
+
+    except Exception as e:
+        logger.error(f"Unknown error in {job}: {str(e)}", exc_info=True)
+        result = {"error": "An unknown error occurred. Please try again later."}
+        status_code = 500
+
+    TurnJob.objects.filter(pk=job.pk).update(
+        status=TurnJobStatus.DONE,
+        result=result,
+        status_code=status_code,
+        finished_at=timezone.now(),
+    )
+
+    with job_done:
+        job_done.notify_all()
+
+
+def run_job_in_thread(job_id):
+    """Claim and run the job, unless another worker already has it."""
+    try:
+        job = claim_job(job_id)
+        if job is not None:
+            run_job(job)
+
+    finally:
+        # The thread's own connection
+        connection.close()
+
+
+def run_pending_jobs():
+    """Hand the jobs left by a previous run to the threads."""
+    try:
+        job_ids = TurnJob.objects.filter(claimable()).values_list("pk", flat=True)
+        for job_id in job_ids.order_by("created_at"):
+            get_executor().submit(run_job_in_thread, job_id)
+
+    finally:
+        connection.close()
+
+
+def wait_for_job(job: TurnJob, timeout: float) -> TurnJob:
+    """
+    Wait up to timeout seconds for the job to be done. Jobs of other processes
+    do not notify, so the database is checked every second as well.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job.refresh_from_db()
+        remaining = deadline - time.monotonic()
+        if job.status == TurnJobStatus.DONE or remaining <= 0:
+            return job
+
+        with job_done:
+            job_done.wait(min(remaining, 1.0))
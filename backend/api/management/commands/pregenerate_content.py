@@ -0,0 +1,273 @@
+import time
+import asyncio
+from typing import Optional, Awaitable, Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.Const import CONTENT_STORE_PATH
+from game.classes.EntityClasses import Player
+from game.classes.FloorHistory import FloorHistory
+from game.classes.NonCombatFloorType import NonCombatFloorType
+from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
+from game.llm_api.NonCombatFloorIntroRequest import INTRO_REQUESTS
+from game.llm_api.SuggestActionRequest import SuggestActionRequest
+from game.llm_api.ClassifyRewardTypeRequest import ClassifyRewardTypeRequest
+from game.llm_api.AttributeRewardRequest import AttributeRewardRequest
+from game.models.ContentStore import ContentStore
+from game.models.ProviderRegistry import get_session_provider
+from game.models.Telemetry import get_telemetry, telemetry_session
+
+
+class RateLimiter:
+    """Let at most rate calls per second start, evenly spaced."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if self.interval == 0:
+            return
+
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pregenerate floor intros, suggested actions and rewards for a list of "
+        "themes into the content store, and report the provider throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("themes", nargs="*", help="Themes to generate content for")
+        parser.add_argument(
+            "--themes-file",
+            help="File with one theme (or background) per line",
+        )
+        parser.add_argument(
+            "--player-description",
+            default="A curious adventurer",
+            help="Player description used in the prompts, the content is only "
+            "served to players with this description",
+        )
+        parser.add_argument(
+            "--variants",
+            type=int,
+            default=1,
+            help="Number of variants per theme and floor type",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Maximum number of LLM requests in flight",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Maximum number of LLM requests started per second (0 for no limit)",
+        )
+        parser.add_argument(
+            "--store",
+            default=CONTENT_STORE_PATH,
+            help="Path of the SQLite content store",
+        )
+
+    def handle(self, *args, **options):
+        themes = list(options["themes"])
+        if options["themes_file"]:
+            with open(options["themes_file"], "r") as f:
+                themes += [line.strip() for line in f if line.strip()]
+
+        if not themes:
+            raise CommandError("Give at least one theme or --themes-file")
+
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        self.store = ContentStore(options["store"])
+        self.provider = get_session_provider()
+        self.player = Player.create_start_player_with_random_stats(
+            name="Adventurer", description=options["player_description"]
+        )
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.rate = options["rate"]
+        self.stats = {"generated": 0, "skipped": 0, "failed": 0}
+        self.latencies: list[float] = []
+
+        jobs = [
+            (theme, floor_type, variant)
+            for theme in themes
+            for floor_type in NonCombatFloorType
+            for variant in range(options["variants"])
+        ]
+        self.stdout.write(
+            f"Generating content for {len(jobs)} floor(s) into {options['store']} "
+            f"(concurrency {options['concurrency']}, "
+            f"{f'{self.rate} requests/s' if self.rate else 'no rate limit'})"
+        )
+
+        # Token counts in the report are for this run only
+        get_telemetry().reset()
+
+        start = time.monotonic()
+        try:
+            asyncio.run(self.run_jobs(jobs, options["concurrency"]))
+
+            self.report(time.monotonic() - start)
+
+        finally:
+            self.store.close()
+
+    async def run_jobs(self, jobs: list[tuple], concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiter = RateLimiter(self.rate)
+
+        with telemetry_session("pregenerate_content"):
+            await asyncio.gather(*(self.generate_floor(*job) for job in jobs))
+
+    async def generate(
+        self,
+        theme: str,
+        floor_type: NonCombatFloorType,
+        kind: str,
+        variant: int,
+        ResponseModel: type[LLMResponseModel],
+        send: Callable[[], Awaitable[LLMResponseModel]],
+    ) -> Optional[LLMResponseModel]:
+        """Get the content from the store, or generate and store it."""
+        key = ContentStore.make_key(
+            theme, floor_type.value, kind, self.player.description, variant
+        )
+        stored = self.store.get(key, ResponseModel)
+        if stored is not None:
+            self.stats["skipped"] += 1
+            return stored
+
+        async with self.semaphore:
+            await self.rate_limiter.wait()
+
+            start = time.monotonic()
+            try:
+                response = await send()
+
+            except Exception as e:
+                self.stats["failed"] += 1
+                self.stderr.write(
+                    f"{kind} for {theme} / {floor_type.value} #{variant} failed: {e}"
+                )
+                return None
+
+            latency_ms = (time.monotonic() - start) * 1000
+
+        self.latencies.append(latency_ms)
+        self.stats["generated"] += 1
+        self.store.put(
+            key,
+            theme,
+            floor_type.value,
+            kind,
+            self.player.description,
+            variant,
+            response,
+            latency_ms,
+        )
+        return response
+
+    async def send_variant(
+        self, request: LLMRequest, variant: int, **context
+    ) -> LLMResponseModel:
+        """
+        Send the request. Variants after the first ask for another sample (seed),
+        otherwise identical prompts would share one cached or coalesced completion.
+        """
+        kwargs = request.completion_kwargs(request.render(**context))
+        if variant > 0:
+            kwargs["seed"] = variant
+
+        return await self.provider.aget_completion(**kwargs)
+
+    async def generate_floor(
+        self, theme: str, floor_type: NonCombatFloorType, variant: int
+    ):
+        intro_request = INTRO_REQUESTS[floor_type].shared(self.provider)
+        intro = await self.generate(
+            theme,
+            floor_type,
+            "intro",
+            variant,
+            intro_request.ResponseModel,
+            lambda: self.send_variant(
+                intro_request,
+                variant,
+                theme=theme,
+                player_description=self.player.description,
+                floor_type=floor_type,
+            ),
+        )
+        if intro is None:
+            return
+
+        # The follow-up content sees the floor as it is right after the intro
+        history = FloorHistory()
+        history.add_narrative(intro.summary)
+        narrative = intro.description + " " + intro.investigation_hook
+
+        for kind, request_cls in [
+            ("suggest_action", SuggestActionRequest),
+            ("reward_type", ClassifyRewardTypeRequest),
+            ("attribute_reward", AttributeRewardRequest),
+        ]:
+            request = request_cls.shared(self.provider)
+            await self.generate(
+                theme,
+                floor_type,
+                kind,
+                variant,
+                request.ResponseModel,
+                lambda request=request: self.send_variant(
+                    request,
+                    variant,
+                    theme=theme,
+                    player=self.player,
+                    history=history,
+                    recent_history=narrative,
+                ),
+            )
+
+    def report(self, elapsed: float):
+        self.stdout.write(
+            f"\nGenerated {self.stats['generated']}, skipped {self.stats['skipped']} "
+            f"(already stored), failed {self.stats['failed']} in {elapsed:.1f}s"
+        )
+
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p50 = ordered[len(ordered) // 2]
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self.stdout.write(
+                f"Throughput: {len(ordered) / elapsed:.2f} requests/s, "
+                f"latency p50 {p50:.0f}ms, p95 {p95:.0f}ms"
+            )
+
+        completion_tokens = sum(
+            stats["completion_tokens"]["mean"] * stats["completion_tokens"]["count"]
+            for stats in get_telemetry().summary().values()
+            if stats["completion_tokens"]["count"]
+        )
+        if completion_tokens:
+            self.stdout.write(
+                f"Completion tokens: {completion_tokens:.0f} "
+                f"({completion_tokens / elapsed:.1f} tokens/s)"
+            )
+
+        style = self.style.SUCCESS if self.stats["failed"] == 0 else self.style.WARNING
+        self.stdout.write(style(f"Content store holds {self.store.count()} entries."))
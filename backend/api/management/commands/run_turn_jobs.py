@@ -0,0 +1,78 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.constants import TURN_JOB_WORKERS
+from api.jobs import claim_job, run_job
+from api.models import TurnJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the queued turn jobs, as a worker separate from the web process "
+        "(TURN_JOBS_IN_PROCESS=0)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=TURN_JOB_WORKERS,
+            help="Number of turns run at the same time",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0.5,
+            help="Seconds between checks for new jobs when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        if concurrency < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        # A job is only claimed when a thread is free to run it
+        free = threading.Semaphore(concurrency)
+        done = 0
+
+        def run(job: TurnJob):
+            try:
+                run_job(job)
+
+            finally:
+                # The thread's own connection
+                connection.close()
+                free.release()
+
+        self.stdout.write(f"Running turn jobs (concurrency {concurrency})")
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="turn-job"
+        ) as executor:
+            try:
+                while True:
+                    free.acquire()
+                    job = claim_job()
+                    if job is None:
+                        free.release()
+                        if options["once"]:
+                            break
+
+                        time.sleep(options["interval"])
+                        continue
+
+                    executor.submit(run, job)
+                    done += 1
+
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for the running turns...")
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} turn job(s)."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.2 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="noncombatfloormodel",
+            name="next_floor_intro",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="noncombatfloormodel",
+            name="next_floor_key",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="noncombatfloormodel",
+            name="next_floor_requested_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="noncombatfloormodel",
+            name="next_floor_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("Treasure", "Treasure"),
+                    ("Treasure with Trap", "Treasure With Trap"),
+                    ("Hidden Trap", "Hidden Trap"),
+                    ("NPC Encounter", "Npc Encounter"),
+                ],
+                max_length=20,
+                null=True,
+            ),
+        ),
+    ]
@@ -1,15 +1,22 @@
+import uuid
+from typing import Optional
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from pydantic import ValidationError
 
 from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 from game.classes.NonCombatFloorType import NonCombatFloorType
 from game.classes.NonCombatFloor import NonCombatFloor
+from game.llm_api.NonCombatFloorIntroRequest import NonCombatFloorIntroResponseModel
 from game.classes.Progression import Progression
-from game.models.LLMProvider import ollama
+from game.models.ProviderRegistry import get_session_provider
 from game.DungeonMaster import DungeonMaster
 
+from .constants import NEXT_FLOOR_PREFETCH_ENABLED, NEXT_FLOOR_PREFETCH_TIMEOUT
+
 
 class CustomUser(AbstractUser):
     """
@@ -50,7 +57,7 @@ class GameSession(models.Model):
 
     def load_dm(self):
         # Create DM object
-        dm = DungeonMaster(ollama())
+        dm = DungeonMaster(get_session_provider())
 
         # Set class attributes
         dm.theme = self.theme
@@ -192,12 +199,25 @@ class NonCombatFloorModel(models.Model):
     penalty = models.FloatField(default=0)
     completion_rate = models.IntegerField(default=0)
 
+    # Next floor, generated while the player is still on this one
+    next_floor_type = models.CharField(
+        max_length=20,
+        choices=NonCombatFloorTypeModel.choices,
+        null=True,
+        blank=True,
+    )
+    next_floor_intro = models.JSONField(null=True, blank=True)
+    next_floor_key = models.CharField(
+        max_length=64, null=True, blank=True
+    )  # NonCombatFloor.prefetch_key the intro was generated for
+    next_floor_requested_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return f"Non combat floor for session {self.session.pk}"
 
     def load_non_combat_floor(self, theme: str, player: Player):
         # Create NonCombatFloor object
-        floor = NonCombatFloor(theme, player, ollama())
+        floor = NonCombatFloor(theme, player, get_session_provider())
 
         # Load floor history
         floor_history: FloorHistory = self.floor_history_model.load_floor_history()
@@ -219,4 +239,144 @@ class NonCombatFloorModel(models.Model):
         self.floor_type = non_combat_floor.floor_type.value
         self.penalty = non_combat_floor.penalty
         self.completion_rate = non_combat_floor.progression.completion_rate
-        self.save()
+
+        # The next floor fields are written by the prefetch, leave them alone
+        self.save(update_fields=["floor_type", "penalty", "completion_rate"])
+
+    def request_next_floor(self, non_combat_floor: NonCombatFloor) -> bool:
+        """
+        Mark the next floor's intro as being generated. False if it should not
+        be: prefetching is off, or a fresh one is already stored or on its way.
+        """
+        if not NEXT_FLOOR_PREFETCH_ENABLED:
+            return False
+
+        if (
+            self.next_floor_intro is not None
+            and self.next_floor_key == non_combat_floor.prefetch_key()
+        ):
+            return False
+
+        if (
+            self.next_floor_requested_at is not None
+            and timezone.now() - self.next_floor_requested_at
+            < NEXT_FLOOR_PREFETCH_TIMEOUT
+        ):
+            return False
+
+        self.next_floor_requested_at = timezone.now()
+        self.save(update_fields=["next_floor_requested_at"])
+        return True
+
+    def store_next_floor(
+        self,
+        floor_type: NonCombatFloorType,
+        intro_response: NonCombatFloorIntroResponseModel,
+        key: str,
+    ):
+        """Store the prefetched next floor, see request_next_floor."""
+        # Only the next floor fields, the turns write the rest of the row
+        NonCombatFloorModel.objects.filter(pk=self.pk).update(
+            next_floor_type=floor_type.value,
+            next_floor_intro=intro_response.model_dump(),
+            next_floor_key=key,
+            next_floor_requested_at=None,
+        )
+
+    def release_next_floor(self):
+        """The prefetch failed, let the next turn request it again."""
+        NonCombatFloorModel.objects.filter(pk=self.pk).update(
+            next_floor_requested_at=None
+        )
+
+    def pop_next_floor(
+        self, non_combat_floor: NonCombatFloor
+    ) -> Optional[tuple[NonCombatFloorType, NonCombatFloorIntroResponseModel]]:
+        """
+        Take the prefetched next floor, if it is ready and still fresh for the
+        floor's theme and player. The stored intro is used at most once.
+        """
+        if self.next_floor_intro is None:
+            return None
+
+        prefetched = None
+        if self.next_floor_key == non_combat_floor.prefetch_key():
+            try:
+                prefetched = (
+                    NonCombatFloorType(self.next_floor_type),
+                    NonCombatFloorIntroResponseModel.model_validate(
+                        self.next_floor_intro
+                    ),
+                )
+
+            except (ValueError, ValidationError):
+                prefetched = None
+
+        self.next_floor_type = None
+        self.next_floor_intro = None
+        self.next_floor_key = None
+        self.save(
+            update_fields=["next_floor_type", "next_floor_intro", "next_floor_key"]
+        )
+
+        return prefetched
+
+
+class TurnJobKind(models.TextChoices):
+    NEW_FLOOR = "new_floor"
+    PLAYER_INPUT = "player_input"
+
+
+class TurnJobStatus(models.TextChoices):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    DONE = "Done"
+
+
+class TurnJob(models.Model):
+    """
+    A new_floor or player_input turn run outside of the request, see api.jobs.
+    result and status_code are the response the turn would have given in the
+    request.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(
+        GameSession, on_delete=models.CASCADE, related_name="turn_jobs"
+    )
+    kind = models.CharField(max_length=20, choices=TurnJobKind.choices)
+    payload = models.JSONField(default=dict, blank=True)  # The request data
+
+    status = models.CharField(
+        max_length=10,
+        choices=TurnJobStatus.choices,
+        default=TurnJobStatus.QUEUED,
+    )
+    result = models.JSONField(null=True, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+        constraints = [
+            # One turn of a session at a time
+            models.UniqueConstraint(
+                fields=["session"],
+                condition=models.Q(status__in=["Queued", "Running"]),
+                name="one_active_turn_job_per_session",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} for session {self.session.pk}"
+
+    def to_dict(self) -> dict:
+        data = {"job_id": str(self.pk), "kind": self.kind, "status": self.status}
+        if self.status == TurnJobStatus.DONE:
+            data["status_code"] = self.status_code
+            data["result"] = self.result
+
+        return data
@@ -1,4 +1,6 @@
 import os
+import uuid
+from io import StringIO
 from unittest.mock import patch
 
 import django
@@ -13,11 +15,15 @@ from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.utils import timezone
 from freezegun import freeze_time
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from game.llm_api.NonCombatFloorIntroRequest import NonCombatFloorIntroResponseModel
+from game.test.fakes import FakeProvider
+
 from .constants import USER_INACTIVITY_EXPIRY_INTERVAL
-from .models import GameSession, GameState
+from .models import GameSession, GameState, TurnJob, TurnJobStatus
+from .turns import prefetch_next_floor
 
 User = get_user_model()
 
@@ -431,3 +437,219 @@ class NonAuthUserGameSessionAPITest(APITestCase):
     def test_create_session(self):
         response = self.client.post("/api/session/create-game")
         self.assertEqual(response.status_code, 401)
+
+
+class FakeLLMGameTestCase(APITransactionTestCase):
+    """
+    Plays a game against a fake LLM. Transactions are committed, so the turns
+    run on other threads see the game.
+    """
+
+    # Creating the game asks for the background and its condensed theme
+    answers = {
+        "BackgroundResponseModel": {
+            "theme": "A crypt",
+            "player_backstory": "A tester",
+            "player_motivation": "Finding bugs",
+        },
+        "ThemeCondenseResponseModel": {
+            "theme": "A crypt",
+            "player_backstory": "A tester",
+        },
+    }
+
+    def setUp(self):
+        self.provider = FakeProvider(self.answers)
+        for target in [
+            "api.views.get_session_provider",
+            "api.models.get_session_provider",
+        ]:
+            patcher = patch(target, return_value=self.provider)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Bearer " + str(refresh.access_token)
+        )
+
+        game_data = {
+            "player_name": "Test Player",
+            "strength": 8,
+            "dexterity": 6,
+            "constitution": 7,
+            "intelligence": 3,
+            "wisdom": 5,
+            "charisma": 1,
+        }
+        response = self.client.post(
+            "/api/session/create-game", game_data, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.session_id = response.json()["session_id"]
+
+    def intro_calls(self) -> int:
+        return len(self.provider.calls_of(NonCombatFloorIntroResponseModel))
+
+
+def floor_intro(description: str) -> dict:
+    return {
+        "description": description,
+        "investigation_hook": "A wooden chest stands in the corner.",
+        "suggested_actions": ["Open the chest", "Look around"],
+        "summary": description,
+    }
+
+
+@patch("api.models.NEXT_FLOOR_PREFETCH_ENABLED", True)
+class NextFloorPrefetchTest(FakeLLMGameTestCase):
+    answers = {
+        **FakeLLMGameTestCase.answers,
+        "NonCombatFloorIntroResponseModel": [
+            floor_intro("The first floor."),
+            floor_intro("The prefetched floor."),
+        ],
+    }
+
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor")
+        self.assertEqual(response.status_code, 200)
+
+    def prefetch(self):
+        session = GameSession.objects.get(pk=self.session_id)
+        return prefetch_next_floor(session, session.load_dm().non_combat_floor)
+
+    def test_new_floor_uses_prefetched_intro(self):
+        self.prefetch().result(timeout=10)
+        self.assertEqual(self.intro_calls(), 2)
+
+        # Already stored, not generated again
+        self.assertIsNone(self.prefetch())
+
+        session = GameSession.objects.get(pk=self.session_id)
+        session.game_state = GameState.WAITING_FOR_NEXT_FLOOR
+        session.save()
+
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("The prefetched floor.", response.json()["narrative"])
+        self.assertEqual(self.intro_calls(), 2)
+
+        # Used once
+        floor_model = GameSession.objects.get(pk=self.session_id).non_combat_floor_model
+        self.assertIsNone(floor_model.next_floor_intro)
+
+    def test_failed_prefetch_is_released(self):
+        self.provider.answers["NonCombatFloorIntroResponseModel"] = ValueError("down")
+        self.prefetch().result(timeout=10)
+
+        floor_model = GameSession.objects.get(pk=self.session_id).non_combat_floor_model
+        self.assertIsNone(floor_model.next_floor_intro)
+        self.assertIsNone(floor_model.next_floor_requested_at)
+
+    def test_disabled(self):
+        with patch("api.models.NEXT_FLOOR_PREFETCH_ENABLED", False):
+            self.assertIsNone(self.prefetch())
+
+
+class TurnJobTest(FakeLLMGameTestCase):
+    answers = {
+        **FakeLLMGameTestCase.answers,
+        "NonCombatFloorIntroResponseModel": floor_intro("The first floor."),
+    }
+
+    def job_url(self, job_id) -> str:
+        return f"/api/session/{self.session_id}/turn-jobs/{job_id}"
+
+    def test_new_floor_job(self):
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+
+        response = self.client.get(self.job_url(job_id) + "?wait=10")
+        self.assertEqual(response.status_code, 200)
+        job = response.json()
+        self.assertEqual(job["status"], TurnJobStatus.DONE)
+        self.assertEqual(job["status_code"], 200)
+        self.assertIn("The first floor.", job["result"]["narrative"])
+        self.assertEqual(self.intro_calls(), 1)
+
+    @patch("api.jobs.TURN_JOBS_IN_PROCESS", False)
+    def test_one_turn_at_a_time(self):
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+        job_id = response.json()["job_id"]
+
+        # A retry of the same turn gets the same job
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["job_id"], job_id)
+
+        response = self.client.post(
+            f"/api/session/{self.session_id}/player-input?async=1",
+            {"action": "Look around", "suggested_actions": []},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["job_id"], job_id)
+
+        response = self.client.get(self.job_url(job_id))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], TurnJobStatus.QUEUED)
+
+    @patch("api.jobs.TURN_JOBS_IN_PROCESS", False)
+    def test_turn_refused_in_this_state(self):
+        # The game waits for its first floor
+        response = self.client.post(
+            f"/api/session/{self.session_id}/player-input?async=1",
+            {"action": "Look around", "suggested_actions": []},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Cannot interact in this state")
+        self.assertFalse(TurnJob.objects.exists())
+
+    @patch("api.jobs.TURN_JOBS_IN_PROCESS", False)
+    def test_worker_command(self):
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+        job_id = response.json()["job_id"]
+
+        out = StringIO()
+        call_command("run_turn_jobs", "--once", "--concurrency", "1", stdout=out)
+        self.assertIn("Ran 1 turn job(s).", out.getvalue())
+
+        job = TurnJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, TurnJobStatus.DONE)
+        self.assertEqual(job.status_code, 200)
+
+        response = self.client.get(self.job_url(job_id))
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_job(self):
+        response = self.client.get(self.job_url(uuid.uuid4()))
+        self.assertEqual(response.status_code, 404)
+
+    @patch("api.jobs.TURN_JOBS_IN_PROCESS", False)
+    def test_error_while_waiting(self):
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+
+        with patch("api.views.wait_for_job", side_effect=RuntimeError("lost")):
+            response = self.client.get(
+                self.job_url(response.json()["job_id"]) + "?wait=1"
+            )
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.json())
+
+    @patch("api.jobs.TURN_JOBS_IN_PROCESS", False)
+    def test_invalid_wait(self):
+        response = self.client.post(f"/api/session/{self.session_id}/new-floor?async=1")
+        response = self.client.get(
+            self.job_url(response.json()["job_id"]) + "?wait=soon"
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,188 @@
+import logging
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from django.db import connection
+
+from game.classes.NonCombatFloor import (
+    HandleUserInputDefeat,
+    HandleUserInputEnd,
+    HandleUserInputError,
+    HandleUserInputSuggestedAction,
+    NonCombatFloor,
+)
+from game.models.Telemetry import telemetry_session
+
+from .executor import get_executor
+from .models import (
+    GameEvent,
+    GameSession,
+    GameState,
+    NonCombatFloorModel,
+    Role,
+    TurnJobKind,
+)
+
+logger = logging.getLogger(__name__)
+
+# The JSON body and HTTP status of a turn, the same whether it runs in the
+# request or as a TurnJob
+TurnResult = tuple[dict[str, Any], int]
+
+
+def turn_state_error(session: GameSession, kind: TurnJobKind) -> Optional[TurnResult]:
+    """The error of a turn the session cannot take in its state, or None."""
+    if kind == TurnJobKind.NEW_FLOOR:
+        if session.game_state != GameState.WAITING_FOR_NEXT_FLOOR:
+            return {"error": "Cannot create new floor in this state"}, 400
+
+    elif session.game_state != GameState.IN_PROGRESS:
+        return {"error": "Cannot interact in this state"}, 400
+
+    return None
+
+
+def run_new_floor(session: GameSession) -> TurnResult:
+    error = turn_state_error(session, TurnJobKind.NEW_FLOOR)
+    if error is not None:
+        return error
+
+    # Load the DM
+    dm = session.load_dm()
+
+    # Now we start the floor
+    # Reload the floor and assign the new instance back to dm
+    dm.current_floor += 1
+    dm.non_combat_floor = dm.non_combat_floor.reload()
+
+    # Use the intro generated during the last floor if it is ready
+    prefetched = session.non_combat_floor_model.pop_next_floor(dm.non_combat_floor)
+    if prefetched is not None:
+        intro_response, narrative = dm.non_combat_floor.use_prefetched_intro(
+            *prefetched
+        )
+
+    else:
+        dm.non_combat_floor.generate_floor_type()
+        intro_response, narrative = dm.non_combat_floor.generate_floor_intro()
+
+    # Save the GameEvent
+    GameEvent.objects.create(
+        session=session,
+        role=Role.NARRATOR,
+        content=narrative,
+        suggested_actions=intro_response.suggested_actions,
+    )
+
+    # Now update everything
+    session.game_state = GameState.IN_PROGRESS
+    session.save_dm(dm)
+
+    return {
+        "narrative": narrative,
+        "suggested_actions": intro_response.suggested_actions,
+        "state": session.game_state,
+    }, 200
+
+
+def run_player_input(
+    session: GameSession, action: str, suggested_actions: list[str]
+) -> TurnResult:
+    error = turn_state_error(session, TurnJobKind.PLAYER_INPUT)
+    if error is not None:
+        return error
+
+    # Load the DM
+    dm = session.load_dm()
+
+    # Get the output from dm
+    output = dm.non_combat_floor.handle_user_input(
+        action, suggested_actions, verbose=False
+    )
+
+    # Check the output type
+    if isinstance(output, HandleUserInputError):
+        return {"error": output.error_message}, 400
+
+    session.game_state = GameState.IN_PROGRESS
+
+    # Save the GameEvents
+    game_events = []
+    for message in output.messages:
+        game_event = GameEvent(
+            session=session,
+            role=Role(message["role"]),
+            content=message["content"],
+        )
+
+        game_events.append(game_event)
+
+    if isinstance(output, HandleUserInputSuggestedAction):
+        game_events[-1].suggested_actions = output.suggested_actions
+
+    # Bulk create all game events
+    GameEvent.objects.bulk_create(game_events)
+
+    # Save the dm
+    session.save_dm(dm)
+
+    # Start on the next floor while the player reads this turn
+    if dm.non_combat_floor.should_prefetch_next_floor():
+        prefetch_next_floor(session, dm.non_combat_floor)
+
+    # For different output type
+    if isinstance(output, HandleUserInputEnd):
+        session.game_state = GameState.WAITING_FOR_NEXT_FLOOR
+        session.save()
+        return {"state": session.game_state, "events": output.messages}, 200
+
+    elif isinstance(output, HandleUserInputDefeat):
+        session.game_state = GameState.COMPLETED
+        session.save()
+        return {"state": session.game_state, "events": output.messages}, 200
+
+    else:
+        return {
+            "state": session.game_state,
+            "events": output.messages,
+            "suggested_actions": output.suggested_actions,
+        }, 200
+
+
+def prefetch_next_floor(
+    session: GameSession, non_combat_floor: NonCombatFloor
+) -> Optional[Future]:
+    """
+    Generate the next floor's intro on the turn job threads, unless a fresh one
+    is already stored or being generated. Returns the future of the prefetch,
+    or None if it was not started.
+    """
+    floor_model = session.non_combat_floor_model
+    if not floor_model.request_next_floor(non_combat_floor):
+        return None
+
+    return get_executor().submit(
+        run_next_floor_prefetch, floor_model, non_combat_floor, session.pk
+    )
+
+
+def run_next_floor_prefetch(
+    floor_model: NonCombatFloorModel, non_combat_floor: NonCombatFloor, session_id
+):
+    """
+    Failures are only logged, the intro is then generated on demand by
+    new_floor as usual.
+    """
+    try:
+        with telemetry_session(session_id):
+            floor_type, intro_response, key = non_combat_floor.prefetch_next_floor()
+
+        floor_model.store_next_floor(floor_type, intro_response, key)
+
+    except Exception as e:
+        logger.warning(f"Prefetching the next floor failed: {e}")
+        floor_model.release_next_floor()
+
+    finally:
+        # The thread's own connection
+        connection.close()
@@ -26,6 +26,11 @@ urlpatterns = [
         views.get_session_info,
         name="get_session_info",
     ),
+    path(
+        "session/<int:session_id>/turn-jobs/<uuid:job_id>",
+        views.get_turn_job,
+        name="get_turn_job",
+    ),
     path("get-sessions", views.get_sessions, name="get_sessions"),
     path("session/<int:session_id>/get-events", views.get_events, name="get_events"),
     path(
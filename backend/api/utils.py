@@ -4,11 +4,27 @@ from functools import wraps
 import openai
 from django.http import JsonResponse
 
+from game.models.Telemetry import telemetry_session
+
 from .models import GameSession
 
 logger = logging.getLogger(__name__)
 
 
+def llm_error_result(e: openai.APIError) -> tuple[dict, int]:
+    """The JSON body and HTTP status to answer an LLM error with."""
+    if isinstance(e, openai.APIConnectionError):
+        logger.error(f"LLM API Connection Error: {str(e)}")
+        return {
+            "error": "Failed to connect to the AI service. Please check your internet connection and try again."
+        }, 503
+
+    logger.error(f"LLM API Error: {str(e)}")
+    return {
+        "error": "An error occurred while processing your request with the AI service. Please try again later."
+    }, 500
+
+
 def handle_llm_errors(view_func):
     """
     A decorator to handle common LLM-related errors and return appropriate JSON responses.
@@ -19,23 +35,9 @@ def handle_llm_errors(view_func):
         try:
             return view_func(request, *args, **kwargs)
 
-        except openai.APIConnectionError as e:
-            logger.error(f"LLM API Connection Error: {str(e)}")
-            return JsonResponse(
-                {
-                    "error": "Failed to connect to the AI service. Please check your internet connection and try again."
-                },
-                status=503,
-            )
-
         except openai.APIError as e:
-            logger.error(f"LLM API Error: {str(e)}")
-            return JsonResponse(
-                {
-                    "error": "An error occurred while processing your request with the AI service. Please try again later."
-                },
-                status=500,
-            )
+            body, status = llm_error_result(e)
+            return JsonResponse(body, status=status)
 
     return _wrapped_view
 
@@ -57,7 +59,10 @@ def validate_session(view_func):
 
             # Add session to kwargs for the view function
             kwargs["session"] = session
-            return view_func(request, session_id, *args, **kwargs)
+
+            # Tag the LLM calls made by the view with the session
+            with telemetry_session(session.pk):
+                return view_func(request, session_id, *args, **kwargs)
 
         except GameSession.DoesNotExist:
             return JsonResponse({"error": "Session does not exist"}, status=404)
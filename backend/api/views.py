@@ -1,4 +1,5 @@
 import json
+import uuid
 
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest, HttpResponse, JsonResponse
@@ -7,17 +8,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
 from game.classes.EntityClasses import Player
-from game.classes.NonCombatFloor import (
-    HandleUserInputDefeat,
-    HandleUserInputEnd,
-    HandleUserInputError,
-    HandleUserInputSuggestedAction,
-)
 from game.DungeonMaster import DungeonMaster
-from game.models.LLMProvider import ollama
+from game.models.ProviderRegistry import get_session_provider
+from game.models.Telemetry import telemetry_session
 
+from .constants import TURN_JOBS_ENABLED, TURN_JOB_MAX_WAIT
+from .jobs import active_turn_job, enqueue_turn_job, wait_for_job
 from .models import *  # Import all models
 from .serializers import UserSerializer
+from .turns import run_new_floor, run_player_input, turn_state_error
 from .utils import handle_llm_errors, handle_unknown_error, validate_session
 
 
@@ -102,12 +101,13 @@ def create_game(request: HttpRequest):
     )
 
     # Initialize DM and generate theme
-    dm = DungeonMaster(provider=ollama())
-    background_response = dm.generate_theme()
-    condensed_response = dm.condense_theme(
-        theme=background_response.theme,
-        player_backstory=background_response.player_backstory,
-    )
+    dm = DungeonMaster(provider=get_session_provider())
+    with telemetry_session(session.pk):
+        background_response = dm.generate_theme()
+        condensed_response = dm.condense_theme(
+            theme=background_response.theme,
+            player_backstory=background_response.player_backstory,
+        )
 
     # Update session with theme
     session.theme = condensed_response.theme
@@ -153,47 +153,48 @@ def create_game(request: HttpRequest):
     )
 
 
+def wants_turn_job(request: HttpRequest) -> bool:
+    """Whether to run the turn as a TurnJob, see TURN_JOBS_ENABLED."""
+    value = request.GET.get("async")
+    if value is None:
+        return TURN_JOBS_ENABLED
+
+    return value.lower() in ("true", "1", "t")
+
+
+def enqueue_turn(session: GameSession, kind: TurnJobKind, payload: dict):
+    """
+    Queue the turn and answer 202 with its job. A retry of the turn in progress
+    gets the same job, a different turn has to wait for it.
+    """
+    # Without a turn in progress the session is up to date, so a turn it cannot
+    # take is refused now instead of failing in the job
+    if active_turn_job(session) is None:
+        error = turn_state_error(session, kind)
+        if error is not None:
+            body, status = error
+            return JsonResponse(body, status=status)
+
+    job, created = enqueue_turn_job(session, kind, payload)
+    if not created and (job.kind != kind or job.payload != payload):
+        return JsonResponse(
+            {"error": "Another turn is in progress", **job.to_dict()}, status=409
+        )
+
+    return JsonResponse(job.to_dict(), status=202)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 @handle_unknown_error
 @handle_llm_errors
 @validate_session
 def new_floor(request: HttpRequest, session_id: int, session: GameSession):
-    if session.game_state != GameState.WAITING_FOR_NEXT_FLOOR:
-        return JsonResponse(
-            {"error": "Cannot create new floor in this state"}, status=400
-        )
-
-    # Load the DM
-    dm = session.load_dm()
+    if wants_turn_job(request):
+        return enqueue_turn(session, TurnJobKind.NEW_FLOOR, {})
 
-    # Now we start the floor
-    # Reload the floor and assign the new instance back to dm
-    dm.current_floor += 1
-    dm.non_combat_floor = dm.non_combat_floor.reload()
-    dm.non_combat_floor.generate_floor_type()
-    intro_response, narrative = dm.non_combat_floor.generate_floor_intro()
-
-    # Save the GameEvent
-    GameEvent.objects.create(
-        session=session,
-        role=Role.NARRATOR,
-        content=narrative,
-        suggested_actions=intro_response.suggested_actions,
-    )
-
-    # Now update everything
-    session.game_state = GameState.IN_PROGRESS
-    session.save_dm(dm)
-
-    # Return response
-    return JsonResponse(
-        {
-            "narrative": narrative,
-            "suggested_actions": intro_response.suggested_actions,
-            "state": session.game_state,
-        }
-    )
+    body, status = run_new_floor(session)
+    return JsonResponse(body, status=status)
 
 
 @api_view(["POST"])
@@ -202,9 +203,6 @@ def new_floor(request: HttpRequest, session_id: int, session: GameSession):
 @handle_llm_errors
 @validate_session
 def player_input(request: HttpRequest, session_id: int, session: GameSession):
-    if session.game_state != GameState.IN_PROGRESS:
-        return JsonResponse({"error": "Cannot interact in this state"}, status=400)
-
     try:
         data = json.loads(request.body)
         action = data["action"]
@@ -213,69 +211,45 @@ def player_input(request: HttpRequest, session_id: int, session: GameSession):
     except:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    # Load the DM
-    dm = session.load_dm()
-
-    # Get the output from dm
-    output = dm.non_combat_floor.handle_user_input(
-        action, suggested_actions, verbose=False
-    )
-
-    # Check the output type
-    if isinstance(output, HandleUserInputError):
-        return JsonResponse({"error": output.error_message}, status=400)
-
-    session.game_state = GameState.IN_PROGRESS
-
-    # Save the GameEvents
-    game_events = []
-    for message in output.messages:
-        game_event = GameEvent(
-            session=session,
-            role=Role(message["role"]),
-            content=message["content"],
+    if wants_turn_job(request):
+        return enqueue_turn(
+            session,
+            TurnJobKind.PLAYER_INPUT,
+            {"action": action, "suggested_actions": suggested_actions},
         )
 
-        game_events.append(game_event)
+    body, status = run_player_input(session, action, suggested_actions)
+    return JsonResponse(body, status=status)
 
-    if isinstance(output, HandleUserInputSuggestedAction):
-        game_events[-1].suggested_actions = output.suggested_actions
 
-    # Bulk create all game events
-    GameEvent.objects.bulk_create(game_events)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@handle_unknown_error
+@validate_session
+def get_turn_job(
+    request: HttpRequest, session_id: int, session: GameSession, job_id: uuid.UUID
+):
+    """
+    Status of a turn job, with the turn's response once it is done. With
+    ?wait=<seconds>, wait for it to be done first (long-poll).
+    """
+    try:
+        job = TurnJob.objects.get(pk=job_id, session=session)
 
-    # Save the dm
-    session.save_dm(dm)
+    except TurnJob.DoesNotExist:
+        return JsonResponse({"error": "Job does not exist"}, status=404)
 
-    # For different output type
-    if isinstance(output, HandleUserInputEnd):
-        session.game_state = GameState.WAITING_FOR_NEXT_FLOOR
-        session.save()
-        return JsonResponse(
-            {
-                "state": session.game_state,
-                "events": output.messages,
-            }
-        )
+    try:
+        wait = min(max(float(request.GET.get("wait", 0)), 0), TURN_JOB_MAX_WAIT)
 
-    elif isinstance(output, HandleUserInputDefeat):
-        session.game_state = GameState.COMPLETED
-        session.save()
-        return JsonResponse(
-            {
-                "state": session.game_state,
-                "events": output.messages,
-            }
-        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid wait"}, status=400)
 
-    else:
-        return JsonResponse(
-            {
-                "state": session.game_state,
-                "events": output.messages,
-                "suggested_actions": output.suggested_actions,
-            }
-        )
+    if wait > 0 and job.status != TurnJobStatus.DONE:
+        job = wait_for_job(job, wait)
+
+    status = 200 if job.status == TurnJobStatus.DONE else 202
+    return JsonResponse(job.to_dict(), status=status)
 
 
 @api_view(["GET"])
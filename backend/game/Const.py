@@ -6,3 +6,25 @@ GAME_PATH = os.path.join(PROJECT_PATH, "game")
 PROMPT_PATH = os.path.join(GAME_PATH, "llm_api", "prompt")
 SYSTEM_PROMPT_PATH = os.path.join(PROMPT_PATH, "system")
 USER_PROMPT_PATH = os.path.join(PROMPT_PATH, "user")
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(PROJECT_PATH, "llm_cache.sqlite3")
+)
+
+# Learned max_tokens per request type, see TokenBudget
+TOKEN_BUDGETS_PATH = os.getenv(
+    "LLM_TOKEN_BUDGETS_PATH", os.path.join(PROJECT_PATH, "llm_token_budgets.json")
+)
+
+# LLM classifications of free text actions, the training data of ActionClassifier
+ACTION_CLASSIFIER_PATH = os.getenv(
+    "ACTION_CLASSIFIER_PATH", os.path.join(PROJECT_PATH, "action_classifier.sqlite3")
+)
+
+# Pregenerated content, see the pregenerate_content command
+CONTENT_STORE_PATH = os.getenv(
+    "CONTENT_STORE_PATH", os.path.join(PROJECT_PATH, "content_store.sqlite3")
+)
+
+# GGUF weights used by the in-process llama.cpp provider
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(PROJECT_PATH, "models", "model.gguf"))
@@ -28,8 +28,8 @@ class DungeonMaster:
         self.provider = provider
 
         # Request objects
-        self.background_request = BackgroundRequest(self.provider)
-        self.theme_condense_request = ThemeCondenseRequest(self.provider)
+        self.background_request = BackgroundRequest.shared(self.provider)
+        self.theme_condense_request = ThemeCondenseRequest.shared(self.provider)
         # self.weapon_generation_request = WeaponGenerationRequest(self.provider)
 
     def init_mock(self, mock: int):
@@ -142,6 +142,11 @@ class DungeonMaster:
         self.init_game()
         self.current_floor = 1
 
+        # Print the narrative as it is generated
+        self.non_combat_floor.narrative_stream = lambda text: print(
+            text, end="", flush=True
+        )
+
         #! TODO: Now I just use a while loop to simulate the game
         while True:
             print(f"\n--- Starting Floor {self.current_floor} ---")
@@ -1,4 +1,7 @@
 from game.classes.RollResults import RollResult
+from game.llm_api.PromptBudget import fit_lines
+
+from typing import Optional
 
 
 class FloorHistory:
@@ -43,15 +46,29 @@ class FloorHistory:
 
         return string
 
-    def history_prompt(self):
-        if not self.has_history():
-            return "No history available"
-
-        string = ""
+    def history_lines(self) -> list[tuple[str, str]]:
+        """The (role, line) entries of the history prompt, oldest first."""
+        lines = []
         for item in self.content:
             if item["role"] == "Player":
-                string += f"Player: {item['content']}. ({item['result']})\n"
+                lines.append(
+                    ("Player", f"Player: {item['content']}. ({item['result']})\n")
+                )
             elif item["role"] == "Narrator":
-                string += f"Narrator: {item['content']}\n"
+                lines.append(("Narrator", f"Narrator: {item['content']}\n"))
 
-        return string
+        return lines
+
+    def history_prompt(self, budget: Optional[int] = None):
+        """
+        The history for a prompt. With a budget (in estimated tokens), older
+        entries are collapsed to the narrator's summaries to fit, see fit_lines.
+        """
+        if not self.has_history():
+            return "No history available"
+
+        lines = self.history_lines()
+        if budget is None:
+            return "".join(line for _, line in lines)
+
+        return fit_lines(lines, budget)
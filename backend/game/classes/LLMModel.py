@@ -1,22 +1,69 @@
-from llama_cpp import Llama
+import os
+import threading
+from typing import Optional
+
 from ..Const import MODEL_PATH
 
 
 class LLMModel:
-    def __init__(self):
-        self.setup_llm(MODEL_PATH)
+    """
+    A llama.cpp model loaded in process.
+
+    The weights are memory mapped, so processes loading the same file share the
+    pages. Use LLMModel.shared() to load each model once per process.
+    """
+
+    _shared: dict[str, "LLMModel"] = {}
+    _shared_pid: Optional[int] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_path: str = MODEL_PATH):
+        self.model_path = model_path
+
+        # llama.cpp contexts are not thread safe, hold this while generating
+        self.lock = threading.Lock()
+        self.setup_llm(model_path)
+
+    @classmethod
+    def shared(cls, model_path: str = MODEL_PATH) -> "LLMModel":
+        """Get the process-wide instance of the model, loading it on first use."""
+        with cls._shared_lock:
+            if cls._shared_pid != os.getpid():
+                cls._shared = {}
+                cls._shared_pid = os.getpid()
+
+            model = cls._shared.get(model_path)
+            if model is None:
+                model = cls._shared[model_path] = cls(model_path)
+
+            return model
 
     def setup_llm(self, model_path: str):
+        # Imported here, so llama_cpp is only needed when a model is loaded
+        from llama_cpp import Llama
+
         print(f"Loading model: {model_path}")
 
         self.llm = Llama(
             model_path=model_path,
-            n_ctx=8192,  # Use 8K context
-            n_threads=8,  # Adjust based on your CPU cores
-            n_gpu_layers=0,  # Set to 0 for CPU, or a higher number for GPU offloading
+            # Use 8K context
+            n_ctx=int(os.getenv("LLAMA_N_CTX", "8192")),
+            # Adjust based on your CPU cores
+            n_threads=int(os.getenv("LLAMA_N_THREADS", "8")),
+            # Set to 0 for CPU, or a higher number for GPU offloading
+            n_gpu_layers=int(os.getenv("LLAMA_N_GPU_LAYERS", "0")),
+            use_mmap=True,
             verbose=False,
         )
 
+        # Keep the KV state of recent prompts, so a prompt starting with the same
+        # prefix (system prompt, session context, history) only evaluates the rest
+        cache_size = int(os.getenv("LLAMA_PROMPT_CACHE_MB", "512"))
+        if cache_size > 0:
+            from llama_cpp import LlamaRAMCache
+
+            self.llm.set_cache(LlamaRAMCache(capacity_bytes=cache_size << 20))
+
         print("Model loaded successfully")
 
     def get_model(self):
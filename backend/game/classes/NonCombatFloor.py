@@ -1,32 +1,50 @@
-import os, random
-from typing import Union, Optional, List
+import os, json, random
+import contextlib
+import time
+import functools
+import hashlib
+import logging
+from typing import Union, Optional, List, Callable, TypeVar
 
 from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 
 from game.models.LLMProvider import LLMProvider
+from game.models.TaskGraph import TaskGraph, get_speculation_stats
+from game.models.ActionClassifier import get_action_classifier
+from game.models.ContentStore import get_content_store
+from game.models.RetryPolicy import retry_budget_scope
 
 from game.classes.NonCombatFloorType import NonCombatFloorType
 from game.classes.RollResults import RollResult
 from game.classes.Progression import Progression
 
+from game.llm_api.LLMRequest import LLMRequest
 from game.llm_api.NonCombatFloorIntroRequest import (
     NonCombatFloorIntroRequest,
+    NonCombatFloorIntroResponseModel,
     TreasureRoomIntroRequest,
     TreasureRoomWithTrapIntroRequest,
     HiddenTrapRoomIntroRequest,
     NPCEncounterRoomIntroRequest,
+    INTRO_REQUESTS,
 )
 
 from game.llm_api.ClassifyNonCombatActionRequest import (
     ClassifyNonCombatActionRequest,
 )
+from game.llm_api.ClassifyAndCheckRequest import ClassifyAndCheckRequest
 
-from game.llm_api.AbilityCheckRequest import AbilityCheckRequest
+from game.llm_api.AbilityCheckRequest import (
+    AbilityCheckRequest,
+    AbilityCheckResponseModel,
+)
 
 from game.llm_api.AbilityCheckResolutionRequest import (
     AbilityCheckResolutionRequest,
     AbilityCheckResolutionResponseModel,
+    AbilityCheckResolutionWithSuggestionsRequest,
+    AbilityCheckResolutionWithSuggestionsResponseModel,
 )
 
 from game.llm_api.ItemUseResolutionRequest import (
@@ -40,6 +58,10 @@ from game.llm_api.AttributeRewardRequest import AttributeRewardRequest
 
 from game.Const import GAME_PATH
 
+R = TypeVar("R", bound=LLMRequest)
+
+logger = logging.getLogger(__name__)
+
 
 class HandleUserInputRespond:
     """Base class for handle_user_input responses"""
@@ -122,6 +144,15 @@ class NonCombatFloor:
     fail_penalty: float = 1 / 3
     event_length: int = 3
 
+    # Generate the success and failure resolutions while the ability check is
+    # requested, when the provider has at most this many calls in flight
+    speculative_resolution: bool = os.getenv(
+        "SPECULATIVE_RESOLUTION_ENABLED", "0"
+    ).lower() in ("true", "1", "t")
+    speculative_max_in_flight: int = int(
+        os.getenv("SPECULATIVE_RESOLUTION_MAX_IN_FLIGHT", "2")
+    )
+
     def __init__(self, theme: str, player: Player, provider: LLMProvider):
         # Floor properties
         self.theme = theme
@@ -131,86 +162,79 @@ class NonCombatFloor:
         # History
         self.history: FloorHistory = FloorHistory()
 
-        # Request objects
-        self.intro_request = NonCombatFloorIntroRequest(
-            provider, theme, player.description
-        )
+        # Called with the narrative text while it is generated, if set
+        self.narrative_stream: Optional[Callable[[str], None]] = None
 
-        self.treasure_intro_request = (
-            TreasureRoomIntroRequest.create_from_non_combat_floor_request(
-                self.intro_request
-            )
-        )
+    def get_request(self, request_cls: type[R]) -> R:
+        """
+        Get the request object of the given type, creating it on first use.
+        Requests are stateless, so every floor of every session on the same
+        provider shares one instance.
+        """
+        return request_cls.shared(self.provider)
 
-        self.treasure_with_trap_intro_request = (
-            TreasureRoomWithTrapIntroRequest.create_from_non_combat_floor_request(
-                self.intro_request
-            )
-        )
+    @property
+    def intro_request(self) -> NonCombatFloorIntroRequest:
+        return self.get_request(NonCombatFloorIntroRequest)
 
-        self.hidden_trap_intro_request = (
-            HiddenTrapRoomIntroRequest.create_from_non_combat_floor_request(
-                self.intro_request
-            )
-        )
+    @property
+    def treasure_intro_request(self) -> TreasureRoomIntroRequest:
+        return self.get_request(TreasureRoomIntroRequest)
 
-        self.npc_encounter_intro_request = (
-            NPCEncounterRoomIntroRequest.create_from_non_combat_floor_request(
-                self.intro_request
-            )
-        )
+    @property
+    def treasure_with_trap_intro_request(self) -> TreasureRoomWithTrapIntroRequest:
+        return self.get_request(TreasureRoomWithTrapIntroRequest)
 
-        self.classify_action_request = ClassifyNonCombatActionRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def hidden_trap_intro_request(self) -> HiddenTrapRoomIntroRequest:
+        return self.get_request(HiddenTrapRoomIntroRequest)
 
-        self.ability_check_request = AbilityCheckRequest(
-            provider,
-            player,
-            self.history,
-        )
+    @property
+    def npc_encounter_intro_request(self) -> NPCEncounterRoomIntroRequest:
+        return self.get_request(NPCEncounterRoomIntroRequest)
 
-        self.ability_check_resolution_request = AbilityCheckResolutionRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def classify_action_request(self) -> ClassifyNonCombatActionRequest:
+        return self.get_request(ClassifyNonCombatActionRequest)
 
-        self.suggest_action_request = SuggestActionRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def classify_and_check_request(self) -> ClassifyAndCheckRequest:
+        return self.get_request(ClassifyAndCheckRequest)
 
-        self.item_use_resolution_request = ItemUseResolutionRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def ability_check_request(self) -> AbilityCheckRequest:
+        return self.get_request(AbilityCheckRequest)
 
-        self.classify_reward_type_request = ClassifyRewardTypeRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def ability_check_resolution_request(self) -> AbilityCheckResolutionRequest:
+        return self.get_request(AbilityCheckResolutionRequest)
 
-        self.attribute_reward_request = AttributeRewardRequest(
-            provider,
-            theme,
-            player,
-            self.history,
-        )
+    @property
+    def ability_check_resolution_with_suggestions_request(
+        self,
+    ) -> AbilityCheckResolutionWithSuggestionsRequest:
+        return self.get_request(AbilityCheckResolutionWithSuggestionsRequest)
+
+    @property
+    def suggest_action_request(self) -> SuggestActionRequest:
+        return self.get_request(SuggestActionRequest)
+
+    @property
+    def item_use_resolution_request(self) -> ItemUseResolutionRequest:
+        return self.get_request(ItemUseResolutionRequest)
+
+    @property
+    def classify_reward_type_request(self) -> ClassifyRewardTypeRequest:
+        return self.get_request(ClassifyRewardTypeRequest)
+
+    @property
+    def attribute_reward_request(self) -> AttributeRewardRequest:
+        return self.get_request(AttributeRewardRequest)
 
     def reload(self):
         # Create a new instance but preserve important state
         new_floor = NonCombatFloor(self.theme, self.player, self.provider)
+        new_floor.narrative_stream = self.narrative_stream
         new_floor.penalty = 0
         new_floor.progression = Progression(self.event_length)
         new_floor.history = FloorHistory()
@@ -229,34 +253,68 @@ class NonCombatFloor:
     def generate_floor_type(self):
         self.floor_type = random.choice(list(NonCombatFloorType))
 
-    def generate_floor_intro(self):
-        # Get the floor description and investigation hook
-        match self.floor_type:
-            case NonCombatFloorType.TREASURE:
-                intro_response = self.treasure_intro_request.send(
-                    floor_type=self.floor_type,
-                )
+    def request_floor_intro(
+        self,
+        floor_type: NonCombatFloorType,
+        stream_handler: Optional[Callable[[str], None]] = None,
+    ) -> NonCombatFloorIntroResponseModel:
+        """
+        Generate the intro of a floor of the given type, or take one pregenerated
+        for the theme and player, see stored_floor_intro.
+        """
+        stored = self.stored_floor_intro(floor_type)
+        if stored is not None:
+            if stream_handler is not None:
+                stream_handler(stored.description)
+            return stored
+
+        request = self.get_request(
+            INTRO_REQUESTS.get(floor_type, NonCombatFloorIntroRequest)
+        )
+        return request.send(
+            theme=self.theme,
+            player_description=self.player.description,
+            floor_type=floor_type,
+            stream_handler=stream_handler,
+        )
 
-            case NonCombatFloorType.TREASURE_WITH_TRAP:
-                intro_response = self.treasure_with_trap_intro_request.send(
-                    floor_type=self.floor_type,
-                )
+    def stored_floor_intro(
+        self, floor_type: NonCombatFloorType
+    ) -> Optional[NonCombatFloorIntroResponseModel]:
+        """
+        A random intro pregenerated for the theme, floor type and player
+        description by the pregenerate_content command, or None if there is none.
+        The intro describes the player, so one made for another player is not used.
+        """
+        store = get_content_store()
+        if store is None:
+            return None
+
+        try:
+            intros = store.find(
+                self.theme,
+                floor_type.value,
+                "intro",
+                self.player.description,
+                NonCombatFloorIntroResponseModel,
+            )
 
-            case NonCombatFloorType.HIDDEN_TRAP:
-                intro_response = self.hidden_trap_intro_request.send(
-                    floor_type=self.floor_type,
-                )
+        except Exception as e:
+            logger.warning(f"Reading the content store failed: {e}")
+            return None
 
-            case NonCombatFloorType.NPC_ENCOUNTER:
-                intro_response = self.npc_encounter_intro_request.send(
-                    floor_type=self.floor_type,
-                )
+        return random.choice(intros) if intros else None
 
-            case _:
-                intro_response = self.intro_request.send(
-                    floor_type=self.floor_type,
-                )
+    @retry_budget_scope
+    def generate_floor_intro(self):
+        # Get the floor description and investigation hook
+        intro_response = self.request_floor_intro(
+            self.floor_type, stream_handler=self.narrative_stream
+        )
+        return self.apply_floor_intro(intro_response)
 
+    def apply_floor_intro(self, intro_response: NonCombatFloorIntroResponseModel):
+        """Start the floor with its intro. Returns the intro and its narrative."""
         # Set the description
         self.description = intro_response.description
 
@@ -268,6 +326,41 @@ class NonCombatFloor:
 
         return intro_response, narrative
 
+    def use_prefetched_intro(
+        self,
+        floor_type: NonCombatFloorType,
+        intro_response: NonCombatFloorIntroResponseModel,
+    ):
+        """Start the floor with an intro generated ahead, see prefetch_next_floor."""
+        self.floor_type = floor_type
+        return self.apply_floor_intro(intro_response)
+
+    def prefetch_key(self) -> str:
+        """
+        Fingerprint of what the next floor's intro is generated from. A prefetched
+        intro with another key is stale (e.g. the player description changed).
+        """
+        payload = json.dumps([self.theme, self.player.description])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_prefetch_next_floor(self) -> bool:
+        """The floor is over, or one successful step away from it."""
+        return self.end or self.progression.completion_rate >= self.progression.end - 1
+
+    @retry_budget_scope
+    def prefetch_next_floor(
+        self,
+    ) -> tuple[NonCombatFloorType, NonCombatFloorIntroResponseModel, str]:
+        """
+        Pick the next floor's type and generate its intro, while the player is
+        still on this floor. Returns the floor type, the intro and the
+        prefetch_key it is for. It is not part of a turn, so it has a retry
+        budget of its own.
+        """
+        key = self.prefetch_key()
+        floor_type = random.choice(list(NonCombatFloorType))
+        return floor_type, self.request_floor_intro(floor_type), key
+
     def init_floor(self, floor_type: Optional[NonCombatFloorType] = None):
         # Init the data
         self.end = False
@@ -288,7 +381,11 @@ class NonCombatFloor:
         #! TODO: Error handling
         # Get the floor description and investigation hook
         intro_response, narrative = self.generate_floor_intro()
-        print(narrative)
+        if self.narrative_stream is None:
+            print(narrative)
+        else:
+            # The description is already streamed
+            print(" " + intro_response.investigation_hook)
 
         print("What do you want to do?")
         for i, action in enumerate(intro_response.suggested_actions):
@@ -298,6 +395,7 @@ class NonCombatFloor:
 
         return intro_response.suggested_actions
 
+    @retry_budget_scope
     def handle_user_input(
         self, user_input: str, suggested_actions: list[str], verbose: bool = True
     ) -> HandleUserInputRespond:
@@ -330,8 +428,46 @@ class NonCombatFloor:
             output.add_message({"role": "Player", "content": user_input})
             return self.skip_floor(user_input, output, verbose=verbose)
 
+        # Obvious actions are classified locally, the rest by the LLM
+        classifier = get_action_classifier()
+        local = None
+        if classifier is not None:
+            local = classifier.classify(
+                user_input,
+                suggested_actions,
+                context=[item["content"] for item in self.history.content]
+                + [self.player.inventory_prompt()],
+            )
+
+        if (
+            local is not None
+            and classifier.can_skip_llm(local)
+            and not classifier.should_audit()
+        ):
+            logger.debug(f"Classified locally by {local.source}: {local.action_type}")
+            output.add_message({"role": "Player", "content": user_input})
+            if local.action_type == "skip_floor":
+                return self.skip_floor(user_input, output, verbose=verbose)
+
+            return self.handle_ability_check(user_input, output, verbose=verbose)
+
+        # Classify the action and get its ability check in one go
         #! TODO: Error handling
-        classify_action_response = self.classify_action_request.send(user_input)
+        classify_action_response = self.classify_and_check_request.send(
+            theme=self.theme,
+            player=self.player,
+            history=self.history,
+            user_input=user_input,
+        )
+
+        # Cached or shared answers were already logged when they were generated
+        if classifier is not None and not classify_action_response.reused:
+            classifier.observe(
+                user_input,
+                classify_action_response.action_type,
+                classify_action_response.narrative_consistency,
+                local=local,
+            )
 
         if classify_action_response.narrative_consistency is False:
             if verbose:
@@ -355,20 +491,37 @@ class NonCombatFloor:
 
         output.add_message({"role": "Player", "content": user_input})
         if classify_action_response.action_type == "ability_check":
-            return self.handle_ability_check(user_input, output, verbose=verbose)
+            return self.handle_ability_check(
+                user_input,
+                output,
+                ability_check=classify_action_response.ability_check(),
+                verbose=verbose,
+            )
 
         #! TODO: Not yet implemented
         elif classify_action_response.action_type == "use_item":
             return self.handle_use_item()
 
-        elif classify_action_response.action_type == "go_to_next_floor":
-            return self.skip_floor(user_input, output)
+        elif classify_action_response.action_type in ("skip_floor", "go_to_next_floor"):
+            return self.skip_floor(user_input, output, verbose=verbose)
 
     def handle_ability_roll(
-        self, user_input: str, output: HandleUserInputRespond, verbose: bool = True
+        self,
+        user_input: str,
+        output: HandleUserInputRespond,
+        ability_check: Optional[AbilityCheckResponseModel] = None,
+        verbose: bool = True,
     ):
-        #! TODO: Error handling
-        ability_check_response = self.ability_check_request.send(user_input)
+        """
+        Roll for the action. ability_check is the attribute and DC if they are
+        already known (see ClassifyAndCheckRequest), otherwise they are requested.
+        """
+        ability_check_response = ability_check
+        if ability_check_response is None:
+            #! TODO: Error handling
+            ability_check_response = self.ability_check_request.send(
+                player=self.player, history=self.history, user_input=user_input
+            )
 
         # Calculate the player's score
         roll = random.randint(1, 10)
@@ -404,41 +557,173 @@ class NonCombatFloor:
         user_input: str,
         output: HandleUserInputRespond,
         by_pass_roll_result: Optional[RollResult] = None,
+        ability_check: Optional[AbilityCheckResponseModel] = None,
         verbose: bool = True,
     ) -> HandleUserInputRespond:
-        if by_pass_roll_result is None:
-            roll_result = self.handle_ability_roll(user_input, output, verbose=verbose)
-        else:
-            roll_result = by_pass_roll_result
+        # Drawn before the roll, so the outcome of either roll result is known
+        fail_draw = random.random()
+
+        graph = None
+        if by_pass_roll_result is None and self.should_speculate(ability_check):
+            graph = self.speculate_resolutions(user_input, fail_draw)
+
+        # Closing the graph cancels the speculated resolutions, also when the roll fails
+        story_extend_response = None
+        with graph if graph is not None else contextlib.nullcontext():
+            if by_pass_roll_result is None:
+                roll_result = self.handle_ability_roll(
+                    user_input, output, ability_check=ability_check, verbose=verbose
+                )
+            else:
+                roll_result = by_pass_roll_result
 
+            progression = self.progression_after(roll_result, fail_draw)
+            if (
+                roll_result == RollResult.CRITICAL_FAILURE
+                or roll_result == RollResult.FAILURE
+            ):
+                # Update panalty
+                self.penalty += self.fail_penalty
+
+            # Update the progression
+            self.progression.completion_rate = progression.completion_rate
+
+            if graph is not None:
+                story_extend_response = self.use_speculated_resolution(
+                    graph, roll_result
+                )
+
+        if story_extend_response is None:
+            #! TODO: Error handling
+            story_extend_response = self.resolution_request_for(self.progression).send(
+                theme=self.theme,
+                player=self.player,
+                history=self.history,
+                player_action=user_input,
+                roll_result=roll_result,
+                progression=self.progression,
+                floor_type=self.floor_type,
+                stream_handler=self.narrative_stream,
+            )
+
+        # Add to the history
+        self.history.add_player_actions(user_input, roll_result)
+
+        return self.handle_resolution(story_extend_response, output, verbose=verbose)
+
+    def progression_after(
+        self, roll_result: RollResult, fail_draw: float
+    ) -> Progression:
+        """
+        The progression after a roll with the given result, without changing the
+        floor. A failure ends the event if fail_draw is below the new penalty.
+        """
+        progression = Progression.load(
+            self.progression.completion_rate, self.progression.end
+        )
         if (
             roll_result == RollResult.CRITICAL_FAILURE
             or roll_result == RollResult.FAILURE
         ):
-            # Update panalty
-            self.penalty += self.fail_penalty
-
-            # Is the event ended?
-            if random.random() < self.penalty:
-                self.progression.fail()
+            if fail_draw < self.penalty + self.fail_penalty:
+                progression.fail()
 
         else:
-            # Update the progression
-            self.progression.progress()
+            progression.progress()
 
-        # Get the story extension
-        #! TODO: Error handling
-        story_extend_response = self.ability_check_resolution_request.send(
-            player_action=user_input,
-            roll_result=roll_result,
-            progression=self.progression,
-            floor_type=self.floor_type,
+        return progression
+
+    def resolution_request_for(self, progression: Progression) -> LLMRequest:
+        """
+        If the floor goes on, the next suggested actions come with the story
+        extension instead of being asked for afterwards.
+        """
+        if progression.is_failed() or progression.is_completed():
+            return self.ability_check_resolution_request
+
+        return self.ability_check_resolution_with_suggestions_request
+
+    def should_speculate(
+        self, ability_check: Optional[AbilityCheckResponseModel]
+    ) -> bool:
+        """
+        Speculating only pays off while the ability check is still to be
+        requested, and costs a second resolution, so it is left out when the
+        provider is busy. Streamed narratives are never speculated.
+        """
+        return (
+            self.speculative_resolution
+            and ability_check is None
+            and self.narrative_stream is None
+            and self.provider.in_flight <= self.speculative_max_in_flight
         )
 
-        # Add to the history
-        self.history.add_player_actions(user_input, roll_result)
+    def speculate_resolutions(self, user_input: str, fail_draw: float) -> TaskGraph:
+        """
+        Start generating the resolutions of a success and of a failure. The
+        resolution prompt does not depend on the attribute or DC, only on the
+        roll result and the progression after it.
+        """
+        graph = TaskGraph("speculative resolution")
+        for roll_result in (RollResult.SUCCESS, RollResult.FAILURE):
+            progression = self.progression_after(roll_result, fail_draw)
+            request = self.resolution_request_for(progression)
+            graph.add(
+                roll_result.value,
+                functools.partial(
+                    request.asend,
+                    theme=self.theme,
+                    player=self.player,
+                    history=self.history,
+                    player_action=user_input,
+                    roll_result=roll_result,
+                    progression=progression,
+                    floor_type=self.floor_type,
+                ),
+                speculative=True,
+            )
 
-        return self.handle_resolution(story_extend_response, output, verbose=verbose)
+        return graph
+
+    def use_speculated_resolution(
+        self, graph: TaskGraph, roll_result: RollResult
+    ) -> Optional[AbilityCheckResolutionResponseModel]:
+        """
+        Keep the speculated resolution matching the roll and drop the other.
+        None if neither matches (a critical roll) or the matching one failed.
+        The caller closes the graph.
+        """
+        stats = get_speculation_stats("resolution")
+        response = None
+        if roll_result.value in graph.nodes:
+            for name in graph.nodes:
+                if name != roll_result.value:
+                    graph.discard(name)
+
+            waited_at = time.monotonic()
+            try:
+                response = graph.result(roll_result.value)
+
+            except Exception as e:
+                logger.warning(f"Speculative resolution failed: {e}")
+
+        if response is None:
+            for name in graph.nodes:
+                graph.discard(name)
+
+            stats.record(hit=False, extra_calls=len(graph.nodes))
+            return None
+
+        # Without speculation the whole resolution would have been waited for
+        node = graph.nodes[roll_result.value]
+        resolution_ms = (node.finished_at - node.started_at) * 1000
+        waited_ms = (time.monotonic() - waited_at) * 1000
+        stats.record(
+            hit=True,
+            extra_calls=len(graph.nodes) - 1,
+            saved_ms=max(resolution_ms - waited_ms, 0.0),
+        )
+        return response
 
     #! TODO here
     def handle_use_item(self, verbose: bool = True) -> HandleUserInputRespond:
@@ -471,9 +756,13 @@ class NonCombatFloor:
             print("(System): Resolving item usage...")
         #! TODO: Error handling
         item_use_resolution_response = self.item_use_resolution_request.send(
+            theme=self.theme,
+            player=self.player,
+            history=self.history,
             item_to_use=self.player.inventory[item_index],
             user_input=user_input,
             floor_type=self.floor_type,
+            stream_handler=self.narrative_stream,
         )
 
         if item_use_resolution_response.is_item_consumed:
@@ -486,8 +775,13 @@ class NonCombatFloor:
         reward_type: str,
         recent_history: str,
         output: HandleUserInputRespond,
+        attribute: Optional[str] = None,
         verbose: bool = True,
     ):
+        """
+        Give the reward. attribute is the attribute to increase if it is already
+        picked, otherwise it is requested when needed.
+        """
         if reward_type == "heal":
             heal_amount = random.randint(1, 4)
             feedback = f"(System): You are healed for {heal_amount} health."
@@ -509,11 +803,16 @@ class NonCombatFloor:
             self.player.max_health += increase_amount
 
         elif reward_type == "attribute_increase":
-            attribute_reward_respond = self.attribute_reward_request.send(
-                recent_history=recent_history
-            )
-            self.player.update_attribute(attribute_reward_respond.attribute, 1)
-            feedback = f"(System): Your {attribute_reward_respond.attribute} is increased by 1."
+            if attribute is None:
+                attribute = self.attribute_reward_request.send(
+                    theme=self.theme,
+                    player=self.player,
+                    history=self.history,
+                    recent_history=recent_history,
+                ).attribute
+
+            self.player.update_attribute(attribute, 1)
+            feedback = f"(System): Your {attribute} is increased by 1."
             output.add_message({"role": "System", "content": feedback})
             if verbose:
                 print(feedback)
@@ -533,7 +832,8 @@ class NonCombatFloor:
         # Print the story if in verbose mode
         output.add_message({"role": "Narrator", "content": response.narrative})
         if verbose:
-            print(response.narrative)
+            # A streamed narrative is already printed, only end the line
+            print(response.narrative if self.narrative_stream is None else "")
 
         # Update the player's health
         #! TODO: Check player health! We need special treatment when player is dead here
@@ -577,41 +877,69 @@ class NonCombatFloor:
             if verbose:
                 print("(System): The event is completed successfully.")
 
-            classify_reward_type_respond = self.classify_reward_type_request.send(
+            # The attribute is picked speculatively, while the reward type is
+            # still being classified, and dropped if the reward is another one
+            context = dict(
+                theme=self.theme,
+                player=self.player,
+                history=self.history,
                 recent_history=response.narrative,
             )
+            with TaskGraph("reward") as graph:
+                graph.add(
+                    "reward_type",
+                    lambda: self.classify_reward_type_request.asend(**context),
+                )
+                graph.add(
+                    "attribute",
+                    lambda: self.attribute_reward_request.asend(**context),
+                    speculative=True,
+                )
 
-            # Handle reward
-            self.handle_reward(
-                classify_reward_type_respond.reward_type,
-                recent_history=response.narrative,
-                output=output,
-                verbose=verbose,
-            )
+                reward_type = graph.result("reward_type").reward_type
+                attribute = None
+                if reward_type == "attribute_increase":
+                    attribute = graph.result("attribute").attribute
+                else:
+                    graph.discard("attribute")
+
+                # Handle reward
+                self.handle_reward(
+                    reward_type,
+                    recent_history=response.narrative,
+                    output=output,
+                    attribute=attribute,
+                    verbose=verbose,
+                )
 
             return self.go_to_next_floor(output, verbose=verbose)
 
         else:
             # Suggest some actions for the player to take
-            if verbose:
-                print("(System): Suggesting actions...")
+            if isinstance(response, AbilityCheckResolutionWithSuggestionsResponseModel):
+                suggested_actions = response.suggested_actions
 
-            #! TODO: Error handling
-            suggest_action_response = self.suggest_action_request.send(
-                recent_history=response.narrative,
-            )
+            else:
+                if verbose:
+                    print("(System): Suggesting actions...")
+
+                #! TODO: Error handling
+                suggested_actions = self.suggest_action_request.send(
+                    theme=self.theme,
+                    player=self.player,
+                    history=self.history,
+                    recent_history=response.narrative,
+                ).suggested_actions
 
             if verbose:
                 # Print the suggested actions
                 print("(System): Suggested actions:")
-                for i, action in enumerate(suggest_action_response.suggested_actions):
+                for i, action in enumerate(suggested_actions):
                     print(f"{i + 1}. {action}")
 
                 print(f"{i + 2}. Write your own action.")
 
-            return HandleUserInputSuggestedAction.load(
-                output, suggest_action_response.suggested_actions
-            )
+            return HandleUserInputSuggestedAction.load(output, suggested_actions)
 
     def skip_floor(
         self, user_input: str, output: HandleUserInputRespond, verbose: bool = True
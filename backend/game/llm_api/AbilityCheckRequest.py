@@ -1,11 +1,13 @@
 from __future__ import annotations
 from game.classes.EntityClasses import Player
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 from pydantic import Field
 
+if TYPE_CHECKING:
+    from game.classes.FloorHistory import FloorHistory
+
 
 class AbilityCheckResponseModel(LLMResponseModel):
     attribute: Literal[
@@ -31,27 +33,14 @@ class AbilityCheckRequest(LLMRequest):
     def ResponseModel(self):
         return AbilityCheckResponseModel
 
-    def __init__(self, provider: LLMProvider, player: Player, history: FloorHistory):
-        super().__init__(provider)
-
-        self.player = player
-        self.history = history
-
-    def update_user_prompt(self, user_input: str):
-        """Update the user prompt with the current action and player attributes."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                player_action=user_input,
-                player_description=self.player.description,
-                history=self.history.history_prompt(),
-            )
-        )
+    max_tokens = 50
+    history_budget = 600
+    temperature = 0.4
 
-    def send(self, user_input: str):
-        self.update_user_prompt(user_input)
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=50,
-            temperature=0.4,
+    def prompt_context(self, player: Player, history: FloorHistory, user_input: str):
+        """Fill the prompt with the current action and player attributes."""
+        return dict(
+            player_action=user_input,
+            player_description=player.description,
+            history=history.history_prompt(self.history_budget),
         )
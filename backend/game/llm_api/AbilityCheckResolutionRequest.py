@@ -3,13 +3,13 @@ from __future__ import annotations
 from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 from game.classes.NonCombatFloorType import NonCombatFloorType
-from game.models.LLMProvider import LLMProvider
 
 from game.classes.RollResults import RollResult
 from game.classes.Progression import Progression
 
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 from pydantic import Field
+from typing import List
 
 
 class AbilityCheckResolutionResponseModel(LLMResponseModel):
@@ -34,61 +34,61 @@ class AbilityCheckResolutionRequest(LLMRequest):
     def ResponseModel(self):
         return AbilityCheckResolutionResponseModel
 
-    def __init__(
-        self, provider: LLMProvider, theme: str, player: Player, history: FloorHistory
-    ):
-        super().__init__(provider)
-        self.theme = theme
-        self.player = player
-        self.history = history
-
-    def update_user_prompt(
-        self,
-        player_action: str,
-        roll_result: RollResult,
-        progression: Progression,
-        floor_type: NonCombatFloorType,
-    ):
-        """Update the user prompt with the current context."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                floor_type=floor_type.value,
-                player_description=self.player.description,
-                history=self.history.history_prompt(),
-                player_action=player_action,
-                roll_result=roll_result,
-                progression=progression.to_prompt(),
-            )
-        )
+    max_tokens = 300
+    temperature = 0.8
+    stream_field = "narrative"
 
-    def send(
+    def prompt_context(
         self,
+        theme: str,
+        player: Player,
+        history: FloorHistory,
         player_action: str,
         roll_result: RollResult,
         progression: Progression,
         floor_type: NonCombatFloorType,
     ):
         """
-        Send the request to the LLM and return the response.
+        Fill the prompt with the current context.
 
         Args:
             player_action (str): The player's action description
             roll_result (RollResult): The result of the ability check roll
-
-        Returns:
-            AbilityCheckResolutionResponse: The response from the LLM
         """
-        self.update_user_prompt(
+        return dict(
+            theme=theme,
+            floor_type=floor_type.value,
+            player_description=player.description,
+            history=history.history_prompt(self.history_budget),
             player_action=player_action,
             roll_result=roll_result,
-            progression=progression,
-            floor_type=floor_type,
+            progression=progression.to_prompt(),
         )
 
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=300,
-            temperature=0.8,
-        )
+
+class AbilityCheckResolutionWithSuggestionsResponseModel(
+    AbilityCheckResolutionResponseModel
+):
+    suggested_actions: List[str] = Field(
+        ...,
+        min_items=1,
+        max_items=2,
+        description="List of suggested actions for the player (1-2 items)",
+    )
+
+
+class AbilityCheckResolutionWithSuggestionsRequest(AbilityCheckResolutionRequest):
+    """
+    AbilityCheckResolutionRequest and SuggestActionRequest in one completion, for
+    turns after which the floor continues.
+    """
+
+    @property
+    def prompt_file(self):
+        return "ability_check_resolution_with_suggestions.txt"
+
+    @property
+    def ResponseModel(self):
+        return AbilityCheckResolutionWithSuggestionsResponseModel
+
+    max_tokens = 400
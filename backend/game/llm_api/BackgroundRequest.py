@@ -1,6 +1,5 @@
 from __future__ import annotations
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
-from game.models.LLMProvider import LLMProvider
 
 from pydantic import Field
 
@@ -27,18 +26,8 @@ class BackgroundRequest(LLMRequest):
     def ResponseModel(self) -> type[BackgroundResponseModel]:
         return BackgroundResponseModel
 
-    def __init__(self, provider: LLMProvider):
-        super().__init__(provider)
+    max_tokens = 500
+    temperature = 0.8
 
-    def update_user_prompt(self):
-        self.set_user_prompt(self.user_prompt_template)
-
-    def send(self):
-        self.update_user_prompt()
-
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=500,
-            temperature=0.8,
-        )
+    def prompt_context(self):
+        return {}
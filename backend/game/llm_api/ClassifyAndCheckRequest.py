@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from game.classes.EntityClasses import Player
+from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
+from game.llm_api.AbilityCheckRequest import AbilityCheckResponseModel
+from game.classes.FloorHistory import FloorHistory
+
+from pydantic import Field
+from typing import Literal, Optional
+
+
+class ClassifyAndCheckResponseModel(LLMResponseModel):
+    action_type: Literal["ability_check", "skip_floor", "unknown"] = Field(
+        ...,
+        description="The type of action: 'ability_check', 'skip_floor', or 'unknown'",
+    )
+    narrative_consistency: bool = Field(
+        ..., description="Whether the user input is consistent with the narrative"
+    )
+    attribute: Optional[
+        Literal["strength", "dexterity", "intelligence", "wisdom", "charisma"]
+    ] = Field(
+        None,
+        description="The attribute to check, only for an ability check. Must be one of: strength, dexterity, intelligence, wisdom, or charisma.",
+    )
+    difficulty_class: Optional[int] = Field(
+        None,
+        description="The difficulty class of the check, only for an ability check.",
+        ge=3,
+        le=19,
+    )
+
+    def ability_check(self) -> Optional[AbilityCheckResponseModel]:
+        """The check part of the response, or None if the model left it out."""
+        if self.attribute is None or self.difficulty_class is None:
+            return None
+
+        return AbilityCheckResponseModel(
+            attribute=self.attribute, difficulty_class=self.difficulty_class
+        )
+
+
+class ClassifyAndCheckRequest(LLMRequest):
+    """
+    ClassifyNonCombatActionRequest and AbilityCheckRequest in one completion, for
+    free text actions. Both need the same context, so this saves a round trip.
+    """
+
+    @property
+    def prompt_file(self):
+        return "classify_and_check.txt"
+
+    @property
+    def ResponseModel(self):
+        return ClassifyAndCheckResponseModel
+
+    max_tokens = 80
+    history_budget = 600
+    temperature = 0.2
+    cacheable = True
+
+    def prompt_context(
+        self, theme: str, player: Player, history: FloorHistory, user_input: str
+    ):
+        return dict(
+            theme=theme,
+            player_description=player.description,
+            player_inventory=player.inventory_prompt(),
+            history=history.history_prompt(self.history_budget),
+            user_input=user_input,
+        )
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from game.classes.EntityClasses import Player
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 from game.classes.FloorHistory import FloorHistory
 
@@ -29,34 +28,18 @@ class ClassifyNonCombatActionRequest(LLMRequest):
     def ResponseModel(self):
         return ClassifyNonCombatActionResponseModel
 
-    def __init__(
-        self,
-        provider: LLMProvider,
-        theme: str,
-        player: Player,
-        history: FloorHistory,
-    ):
-        super().__init__(provider)
-        self.theme = theme
-        self.player = player
-        self.history = history
-
-    def update_user_prompt(self, user_input: str):
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                player_description=self.player.description,
-                player_inventory=self.player.inventory_prompt(),
-                history=self.history.history_prompt(),
-                user_input=user_input,
-            )
-        )
+    max_tokens = 50
+    history_budget = 600
+    temperature = 0.1
+    cacheable = True
 
-    def send(self, user_input: str):
-        self.update_user_prompt(user_input)
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=50,
-            temperature=0.1,
+    def prompt_context(
+        self, theme: str, player: Player, history: FloorHistory, user_input: str
+    ):
+        return dict(
+            theme=theme,
+            player_description=player.description,
+            player_inventory=player.inventory_prompt(),
+            history=history.history_prompt(self.history_budget),
+            user_input=user_input,
         )
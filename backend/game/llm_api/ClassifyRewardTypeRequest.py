@@ -1,7 +1,6 @@
 from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 
 from pydantic import Field
@@ -23,31 +22,18 @@ class ClassifyRewardTypeRequest(LLMRequest):
     def ResponseModel(self):
         return ClassifyRewardTypeResponseModel
 
-    def __init__(
-        self, provider: LLMProvider, theme: str, player: Player, history: FloorHistory
-    ):
-        super().__init__(provider)
-        self.theme = theme
-        self.player = player
-        self.history = history
-
-    def update_user_prompt(self, recent_history: str):
-        """Update the user prompt with the current context."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                player_description=self.player.description,
-                history=self.history.history_prompt(),
-                recent_history=recent_history,
-            )
-        )
+    max_tokens = 50
+    history_budget = 600
+    temperature = 0.4
+    cacheable = True
 
-    def send(self, recent_history: str) -> ClassifyRewardTypeResponseModel:
-        """Send the request and return the response."""
-        self.update_user_prompt(recent_history)
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=50,
-            temperature=0.4,
+    def prompt_context(
+        self, theme: str, player: Player, history: FloorHistory, recent_history: str
+    ):
+        """Fill the prompt with the current context."""
+        return dict(
+            theme=theme,
+            player_description=player.description,
+            history=history.history_prompt(self.history_budget),
+            recent_history=recent_history,
         )
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from game.classes.EntityClasses import Player
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 
 from pydantic import Field
@@ -28,35 +27,18 @@ class ItemIdentificationRequest(LLMRequest):
     def ResponseModel(self):
         return ItemIdentificationResponseModel
 
-    def __init__(self, provider: LLMProvider, player: Player):
-        super().__init__(provider)
-        self.player = player
+    max_tokens = 100
+    temperature = 0.1
+    cacheable = True
 
-    def update_user_prompt(
+    def prompt_context(
         self,
-        user_input: str,
+        player: Player,
+        user_input: str = "",
     ):
-        """Update the user prompt with the current context."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                user_input=user_input,
-                # inventory_items=self.player.inventory_prompt(),
-                inventory_items=self.player.inventory_full_prompt(),
-            )
-        )
-
-    def send(self):
-        """
-        Send the item identification request to the LLM.
-
-        Returns:
-            ItemIdentificationResponse: The identified item and confidence
-        """
-        self.update_user_prompt(user_input="")
-
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=100,
-            temperature=0.1,
+        """Fill the prompt with the current context."""
+        return dict(
+            user_input=user_input,
+            # inventory_items=player.inventory_prompt(),
+            inventory_items=player.inventory_full_prompt(),
         )
@@ -5,7 +5,6 @@ from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 from game.classes.NonCombatFloorType import NonCombatFloorType
 
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 from pydantic import Field
 
@@ -38,39 +37,25 @@ class ItemUseResolutionRequest(LLMRequest):
     def ResponseModel(self):
         return ItemUseResolutionResponseModel
 
-    def __init__(
-        self, provider: LLMProvider, theme: str, player: Player, history: FloorHistory
+    max_tokens = 400
+    temperature = 0.8
+    stream_field = "narrative"
+
+    def prompt_context(
+        self,
+        theme: str,
+        player: Player,
+        history: FloorHistory,
+        item_to_use: Item,
+        user_input: str,
+        floor_type: NonCombatFloorType,
     ):
-        super().__init__(provider)
-        self.theme = theme
-        self.player = player
-        self.history = history
-
-    def update_user_prompt(
-        self, item_to_use: Item, user_input: str, floor_type: NonCombatFloorType
-    ):
-        """Update the user prompt with the current context."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                floor_type=floor_type.value,
-                player_description=self.player.description,
-                history=self.history.history_prompt(),
-                item_to_use=item_to_use.to_prompt(),
-                player_action=user_input,
-            )
-        )
-
-    def send(self, item_to_use: Item, user_input: str, floor_type: NonCombatFloorType):
-
-        self.update_user_prompt(
-            item_to_use=item_to_use,
-            user_input=user_input,
-            floor_type=floor_type,
-        )
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=400,
-            temperature=0.8,
+        """Fill the prompt with the current context."""
+        return dict(
+            theme=theme,
+            floor_type=floor_type.value,
+            player_description=player.description,
+            history=history.history_prompt(self.history_budget),
+            item_to_use=item_to_use.to_prompt(),
+            player_action=user_input,
         )
@@ -1,14 +1,62 @@
 from __future__ import annotations
-from game.models.LLMProvider import LLMProvider
-from game.Const import SYSTEM_PROMPT_PATH, USER_PROMPT_PATH
+from game.models.LLMProvider import LLMProvider, TextFieldStream
+from game.models.ResponseSchemas import register_response_model
+from game.llm_api.PromptTemplates import PromptTemplate, get_prompt_templates
+from game.llm_api.PromptBudget import estimate_tokens
 
 import os
+import json
+import hashlib
+import threading
+import weakref
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from types import MappingProxyType
 
-from pydantic import BaseModel
-from typing import TypeVar, Any, Optional
+from pydantic import BaseModel, PrivateAttr
+from typing import TypeVar, Any, Optional, Callable, Mapping
 
 T = TypeVar("T", bound="LLMResponseModel")
+R = TypeVar("R", bound="LLMRequest")
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """
+    The messages of one request, ready to send. Immutable, so it can be shared
+    between threads, cached or batched as it is.
+    """
+
+    messages: tuple[Mapping[str, str], ...]
+
+    # Hash of the prompt file and messages
+    key: str
+
+    # Size of the messages, see estimate_tokens
+    estimated_tokens: int = 0
+
+    @classmethod
+    def create(cls, prompt_file: str, system: str, user: str) -> RenderedPrompt:
+        messages = (
+            MappingProxyType({"role": "system", "content": system}),
+            MappingProxyType({"role": "user", "content": user}),
+        )
+        payload = json.dumps([prompt_file, system, user])
+        return cls(
+            messages,
+            hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+            estimate_tokens(system) + estimate_tokens(user),
+        )
+
+    def to_list(self) -> list[dict[str, str]]:
+        """The messages in the form the provider API expects."""
+        return [dict(message) for message in self.messages]
+
+
+_shared_requests: weakref.WeakKeyDictionary[LLMProvider, dict[type, LLMRequest]] = (
+    weakref.WeakKeyDictionary()
+)
+_shared_requests_lock = threading.Lock()
 
 
 class LLMRequest(ABC):
@@ -24,41 +72,113 @@ class LLMRequest(ABC):
         """The response model class for this request."""
         pass
 
+    # Completion parameters, overridden by each request type
+    max_tokens: int = 200
+    temperature: float = 0.8
+
+    # Low temperature requests are effectively deterministic, so they can opt in
+    # to the provider's response cache
+    cacheable: bool = False
+
+    # Estimated tokens of floor history in the prompt, older entries are collapsed
+    # to fit (see FloorHistory.history_prompt). None sends the whole history
+    history_budget: Optional[int] = 1200
+
+    # The string field of the response that is forwarded while it is generated
+    # when the caller passes a stream_handler, e.g. "narrative"
+    stream_field: Optional[str] = None
+
     def __init__(self, provider: LLMProvider):
+        """
+        A request only holds its provider and template. Everything that varies per
+        session or turn is passed to render/send, so one instance per provider
+        (see shared) serves every session concurrently.
+        """
         self.provider = provider
-        self.messages = [
-            {"role": "system", "content": ""},
-            {"role": "user", "content": ""},
-        ]
+
+        # Shared with every other request of the same prompt file
+        self.template: PromptTemplate = get_prompt_templates().get(self.prompt_file)
 
         self.response_format = {}
-        self.load_system_prompt()
-        self.load_user_prompt_template()
 
-    def set_system_prompt(self, system_prompt: str):
-        self.messages[0]["content"] = system_prompt
+    @classmethod
+    def shared(cls: type[R], provider: LLMProvider) -> R:
+        """Get the process-wide instance of this request for the provider."""
+        with _shared_requests_lock:
+            requests = _shared_requests.setdefault(provider, {})
+            request = requests.get(cls)
+            if request is None:
+                request = requests[cls] = cls(provider)
 
-    def set_user_prompt(self, user_prompt: str):
-        self.messages[1]["content"] = user_prompt
+            return request
 
     def set_response_format(self, response_format: dict):
         self.response_format = response_format
 
-    def load_system_prompt(self):
-        with open(os.path.join(SYSTEM_PROMPT_PATH, self.prompt_file), "r") as f:
-            self.set_system_prompt(f.read())
-
-    def load_user_prompt_template(self):
-        with open(os.path.join(USER_PROMPT_PATH, self.prompt_file), "r") as f:
-            self.user_prompt_template = f.read()
+    @property
+    def user_prompt_template(self) -> str:
+        return self.template.user
 
     @abstractmethod
-    def update_user_prompt(self, **kwargs):
+    def prompt_context(self, *args, **kwargs) -> dict[str, Any]:
+        """Turn the arguments of render into the fields of the user prompt template."""
         pass
 
-    @abstractmethod
-    def send(self) -> LLMResponseModel:
-        pass
+    def render(self, *args, **kwargs) -> RenderedPrompt:
+        """
+        Fill in the prompt. Pure, the request itself is not modified.
+        The arguments are forwarded to prompt_context.
+        """
+        user_prompt = self.template.format(**self.prompt_context(*args, **kwargs))
+        return RenderedPrompt.create(
+            self.prompt_file, self.template.system, user_prompt
+        )
+
+    def completion_kwargs(
+        self,
+        prompt: RenderedPrompt,
+        stream_handler: Optional[Callable[[str], None]] = None,
+    ) -> dict[str, Any]:
+        """Keyword arguments passed to the provider for this request."""
+        kwargs = {
+            "ResponseModel": self.ResponseModel,
+            "messages": prompt.to_list(),
+            "prompt_key": prompt.key,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "use_cache": self.cacheable,
+            "request_type": type(self).__name__,
+            "estimated_prompt_tokens": prompt.estimated_tokens,
+        }
+
+        if stream_handler is not None and self.stream_field is not None:
+            kwargs["on_chunk"] = TextFieldStream(self.stream_field, stream_handler)
+
+        return kwargs
+
+    def send(
+        self, *args, stream_handler: Optional[Callable[[str], None]] = None, **kwargs
+    ) -> Any:
+        """
+        Render the prompt and send the request to the LLM.
+        The arguments are forwarded to prompt_context.
+
+        Args:
+            stream_handler: If set, called with the text of stream_field as it is generated
+        """
+        prompt = self.render(*args, **kwargs)
+        return self.provider.get_completion(
+            **self.completion_kwargs(prompt, stream_handler)
+        )
+
+    async def asend(
+        self, *args, stream_handler: Optional[Callable[[str], None]] = None, **kwargs
+    ) -> Any:
+        """Async version of send."""
+        prompt = self.render(*args, **kwargs)
+        return await self.provider.aget_completion(
+            **self.completion_kwargs(prompt, stream_handler)
+        )
 
     def send_and_save(self, save_path: str, **kwargs) -> Any:
         """Send the request and save the response to a file."""
@@ -111,6 +231,22 @@ class LLMRequest(ABC):
 
 
 class LLMResponseModel(BaseModel):
+    # Set by the provider when the response is a cache hit or was shared with an
+    # identical request in flight, instead of a fresh completion
+    _reused: bool = PrivateAttr(default=False)
+
+    @property
+    def reused(self) -> bool:
+        return self._reused
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any):
+        super().__pydantic_init_subclass__(**kwargs)
+
+        # Schema, response_format and validator are computed at import time,
+        # not while a turn waits for them
+        register_response_model(cls)
+
     @classmethod
     def load(cls, save_path: str):
         """Load the response from a file."""
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from game.models.LLMProvider import LLMProvider
 from game.llm_api.LLMRequest import LLMRequest, LLMResponseModel
 from game.classes.NonCombatFloorType import NonCombatFloorType
 
@@ -35,38 +34,25 @@ class NonCombatFloorIntroRequest(LLMRequest):
     def ResponseModel(self):
         return NonCombatFloorIntroResponseModel
 
-    def __init__(self, provider: LLMProvider, theme: str, player_description: str):
-        super().__init__(provider)
-        self.theme = theme
-        self.player_description = player_description
-
-    def update_user_prompt(self, floor_type: NonCombatFloorType):
-        """Generate the user prompt by filling in the template with provided values."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                player_description=self.player_description,
-                floor_type=floor_type.value,
-            )
-        )
+    max_tokens = 400
+    temperature = 0.8
+    stream_field = "description"
 
-    def send(self, floor_type: NonCombatFloorType):
+    def prompt_context(
+        self, theme: str, player_description: str, floor_type: NonCombatFloorType
+    ):
         """
-        Send the non-combat floor intro request to the LLM.
+        Fill in the template with provided values.
 
         Args:
+            theme: The theme of the game
+            player_description: The description of the player
             floor_type: The type of non-combat floor
-
-        Returns:
-            NonCombatFloorIntroResponse: The generated floor introduction
         """
-        self.update_user_prompt(floor_type)
-
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=400,
-            temperature=0.8,
+        return dict(
+            theme=theme,
+            player_description=player_description,
+            floor_type=floor_type.value,
         )
 
 
@@ -75,29 +61,29 @@ class TreasureRoomIntroRequest(NonCombatFloorIntroRequest):
     def prompt_file(self):
         return "treasure_room_intro.txt"
 
-    @classmethod
-    def create_from_non_combat_floor_request(
-        cls, non_combat_floor_request: NonCombatFloorIntroRequest
-    ) -> TreasureRoomIntroRequest:
-        """Create a TreasureRoomIntroRequest from a NonCombatFloorIntroRequest."""
-        return cls(
-            provider=non_combat_floor_request.provider,
-            theme=non_combat_floor_request.theme,
-            player_description=non_combat_floor_request.player_description,
-        )
-
 
 class TreasureRoomWithTrapIntroRequest(TreasureRoomIntroRequest):
     @property
     def prompt_file(self):
         return "treasure_room_with_trap_intro.txt"
 
+
 class HiddenTrapRoomIntroRequest(TreasureRoomIntroRequest):
     @property
     def prompt_file(self):
         return "hidden_trap_room_intro.txt"
 
+
 class NPCEncounterRoomIntroRequest(TreasureRoomIntroRequest):
     @property
     def prompt_file(self):
         return "npc_encounter_room_intro.txt"
+
+
+# The intro request of each floor type
+INTRO_REQUESTS: dict[NonCombatFloorType, type[NonCombatFloorIntroRequest]] = {
+    NonCombatFloorType.TREASURE: TreasureRoomIntroRequest,
+    NonCombatFloorType.TREASURE_WITH_TRAP: TreasureRoomWithTrapIntroRequest,
+    NonCombatFloorType.HIDDEN_TRAP: HiddenTrapRoomIntroRequest,
+    NonCombatFloorType.NPC_ENCOUNTER: NPCEncounterRoomIntroRequest,
+}
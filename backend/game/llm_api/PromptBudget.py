@@ -0,0 +1,57 @@
+import os
+import math
+from typing import Optional
+
+# Rough size of a token in English prose, for llama and GPT style tokenizers
+CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", "4"))
+
+# Share of a history budget kept for the most recent entries, verbatim
+RECENT_SHARE = 0.75
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the number of tokens of the text without a tokenizer."""
+    if not text:
+        return 0
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fit_lines(lines: list[tuple[str, str]], budget: int) -> str:
+    """
+    Fit (role, line) history lines, oldest first, into about budget tokens.
+
+    The most recent lines are kept as they are. Before them, older entries are
+    collapsed to the narrator's summaries, and whatever still does not fit is
+    left out. A note marks that earlier lines were dropped.
+    """
+    used = 0
+    recent: list[str] = []
+    i = len(lines)
+    while i > 0:
+        cost = estimate_tokens(lines[i - 1][1])
+        # The newest line is always kept, even if it is over budget on its own
+        if recent and used + cost > budget * RECENT_SHARE:
+            break
+
+        recent.append(lines[i - 1][1])
+        used += cost
+        i -= 1
+
+    collapsed: list[str] = []
+    while i > 0:
+        role, line = lines[i - 1]
+        if role == "Narrator":
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                break
+
+            collapsed.append(line)
+            used += cost
+
+        i -= 1
+
+    # Lines before i and the player lines collapsed away are both dropped
+    dropped = len(recent) + len(collapsed) < len(lines)
+    prefix = "(Earlier events omitted)\n" if dropped else ""
+    return prefix + "".join(reversed(collapsed)) + "".join(reversed(recent))
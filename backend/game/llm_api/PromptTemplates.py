@@ -0,0 +1,174 @@
+import os
+import string
+import threading
+from typing import Any, Optional
+
+from game.Const import SYSTEM_PROMPT_PATH, USER_PROMPT_PATH
+
+
+class PromptTemplateError(ValueError):
+    """A prompt template is missing, malformed or filled with the wrong fields."""
+
+
+# How long the value of each placeholder stays the same. User templates put their
+# placeholders in this order, after all of their static instructions, so the start
+# of a prompt is shared by as many calls as possible and the backend can reuse the
+# KV cache of that prefix instead of evaluating it again.
+SESSION, FLOOR, HISTORY, TURN = range(4)
+
+FIELD_TIERS: dict[str, int] = {
+    "theme": SESSION,
+    "player_description": SESSION,
+    "player_backstory": SESSION,
+    "floor_type": FLOOR,
+    "player_inventory": FLOOR,
+    "inventory_items": FLOOR,
+    "history": HISTORY,
+    "recent_history": TURN,
+    "user_input": TURN,
+    "player_action": TURN,
+    "roll_result": TURN,
+    "progression": TURN,
+    "item_to_use": TURN,
+    "rarity": TURN,
+}
+
+
+class PromptTemplate:
+    """
+    A system prompt and its user prompt template, compiled once.
+
+    The user template is split into literal text and placeholders up front, so
+    filling it in is a join instead of a parse. System prompts are used as they are
+    (they contain literal JSON braces).
+    """
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system
+        self.user = user
+
+        # (literal text, placeholder, conversion, format spec) pieces of the template
+        self.segments: list[tuple[str, Optional[str], Optional[str], str]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(user):
+            if field is not None and not field.isidentifier():
+                raise PromptTemplateError(
+                    f"{name}: placeholder {{{field}}} must be a plain name"
+                )
+            self.segments.append((literal, field, conversion, spec or ""))
+
+        self.fields: frozenset[str] = frozenset(
+            field for _, field, _, _ in self.segments if field is not None
+        )
+
+        self.check_prefix_stable()
+
+    def check_prefix_stable(self):
+        """
+        Check that the placeholders come from the most to the least stable, see
+        FIELD_TIERS, and that no instructions follow the last placeholder.
+        """
+        tier = SESSION
+        for literal, field, _, _ in self.segments:
+            if field is None:
+                # Only the text after the last placeholder has no field
+                if self.fields and literal.strip():
+                    raise PromptTemplateError(
+                        f"{self.name}: instructions must come before the placeholders"
+                    )
+                continue
+
+            if field not in FIELD_TIERS:
+                raise PromptTemplateError(
+                    f"{self.name}: placeholder {{{field}}} has no tier in FIELD_TIERS"
+                )
+
+            if FIELD_TIERS[field] < tier:
+                raise PromptTemplateError(
+                    f"{self.name}: placeholder {{{field}}} must come before "
+                    f"the placeholders that change more often"
+                )
+            tier = FIELD_TIERS[field]
+
+    def format(self, **context: Any) -> str:
+        """Fill in the user template. Same output as str.format."""
+        missing = self.fields - context.keys()
+        if missing:
+            raise PromptTemplateError(
+                f"{self.name}: missing fields {', '.join(sorted(missing))}"
+            )
+
+        parts = []
+        for literal, field, conversion, spec in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+
+            value = context[field]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            elif conversion == "a":
+                value = ascii(value)
+
+            parts.append(format(value, spec))
+
+        return "".join(parts)
+
+
+class PromptTemplateRegistry:
+    """Every prompt template of llm_api/prompt, keyed on the file name."""
+
+    def __init__(
+        self,
+        system_prompt_path: str = SYSTEM_PROMPT_PATH,
+        user_prompt_path: str = USER_PROMPT_PATH,
+    ):
+        self.templates: dict[str, PromptTemplate] = {}
+        self.load(system_prompt_path, user_prompt_path)
+
+    def load(self, system_prompt_path: str, user_prompt_path: str):
+        system_files = set(os.listdir(system_prompt_path))
+        user_files = set(os.listdir(user_prompt_path))
+
+        unpaired = system_files ^ user_files
+        if unpaired:
+            raise PromptTemplateError(
+                f"Prompts without a system/user pair: {', '.join(sorted(unpaired))}"
+            )
+
+        for name in sorted(system_files):
+            with open(os.path.join(system_prompt_path, name), "r") as f:
+                system = f.read()
+
+            with open(os.path.join(user_prompt_path, name), "r") as f:
+                user = f.read()
+
+            self.templates[name] = PromptTemplate(name, system, user)
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self.templates[name]
+
+        except KeyError:
+            raise PromptTemplateError(f"No prompt template named {name}")
+
+    def fields(self) -> dict[str, frozenset[str]]:
+        """The placeholders of every user template."""
+        return {name: template.fields for name, template in self.templates.items()}
+
+
+_prompt_templates: Optional[PromptTemplateRegistry] = None
+_prompt_templates_lock = threading.Lock()
+
+
+def get_prompt_templates() -> PromptTemplateRegistry:
+    """Get the process-wide template registry, loading every template on first use."""
+    global _prompt_templates
+
+    with _prompt_templates_lock:
+        if _prompt_templates is None:
+            _prompt_templates = PromptTemplateRegistry()
+
+        return _prompt_templates
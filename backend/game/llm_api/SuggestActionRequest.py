@@ -1,5 +1,4 @@
 from __future__ import annotations
-from game.models.LLMProvider import LLMProvider
 from game.classes.EntityClasses import Player
 from game.classes.FloorHistory import FloorHistory
 
@@ -27,40 +26,16 @@ class SuggestActionRequest(LLMRequest):
     def ResponseModel(self):
         return SuggestActionResponseModel
 
-    def __init__(
-        self, provider: LLMProvider, theme: str, player: Player, history: FloorHistory
-    ):
-        super().__init__(provider)
-        self.theme = theme
-        self.player = player
-        self.history = history
+    max_tokens = 200
+    temperature = 0.7
 
-    def update_user_prompt(
-        self,
-        recent_history: str,
+    def prompt_context(
+        self, theme: str, player: Player, history: FloorHistory, recent_history: str
     ):
-        """Update the user prompt with the current context."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=self.theme,
-                player_description=self.player.description,
-                history=self.history.history_prompt(),
-                recent_history=recent_history,
-            )
-        )
-
-    def send(self, recent_history):
-        """
-        Send the suggest action request to the LLM.
-
-        Returns:
-            SuggestActionResponse: The suggested actions for the player
-        """
-        self.update_user_prompt(recent_history)
-
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=200,
-            temperature=0.7,
+        """Fill the prompt with the current context."""
+        return dict(
+            theme=theme,
+            player_description=player.description,
+            history=history.history_prompt(self.history_budget),
+            recent_history=recent_history,
         )
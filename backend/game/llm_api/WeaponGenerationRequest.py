@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from game.llm_api.LLMRequest import LLMRequest
-from game.models.LLMProvider import LLMProvider
 from game.classes.ItemClasses import Rarity
 
 from pydantic import BaseModel, Field
@@ -31,24 +30,13 @@ class WeaponGenerationRequest(LLMRequest):
     def ResponseModel(self):
         return WeaponGenerationResponseModel
 
-    def __init__(self, provider: LLMProvider):
-        super().__init__(provider)
-
-    def update_user_prompt(self, theme: str, player_backstory: str, rarity: Rarity):
-        """Generate the user prompt by filling in the template with provided values."""
-        self.set_user_prompt(
-            self.user_prompt_template.format(
-                theme=theme,
-                player_backstory=player_backstory,
-                rarity=rarity.value,
-            )
-        )
+    max_tokens = 200
+    temperature = 0.8
 
-    def send(self, theme: str, player_backstory: str, rarity: Rarity):
-        self.update_user_prompt(theme, player_backstory, rarity)
-        return self.provider.get_completion(
-            ResponseModel=self.ResponseModel,
-            messages=self.messages,
-            max_tokens=200,
-            temperature=0.8,
+    def prompt_context(self, theme: str, player_backstory: str, rarity: Rarity):
+        """Fill in the template with provided values."""
+        return dict(
+            theme=theme,
+            player_backstory=player_backstory,
+            rarity=rarity.value,
         )
@@ -0,0 +1,355 @@
+import os
+import re
+import math
+import time
+import random
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Iterable, Literal, Optional
+
+from game.Const import ACTION_CLASSIFIER_PATH
+
+# The labels the classifier learns. Actions the LLM found inconsistent with the
+# narrative get their own label, so the model learns to leave them to the LLM
+LABELS = ("ability_check", "skip_floor", "unknown", "inconsistent")
+
+# Words that say nothing about what the action touches
+STOPWORDS = set(
+    "a an the i me my to at on in into of for with from up down around over "
+    "under it this that these those try carefully quickly slowly again some "
+    "any just then want will would like past behind across through toward "
+    "towards near beside out off away back".split()
+)
+
+# Verbs of actions that are resolved with an ability check, when what they act on
+# is on the floor
+CHECK_VERBS = set(
+    "search inspect examine investigate open close climb pick push pull "
+    "lift read listen sneak hide unlock jump dig light look check touch "
+    "follow talk ask persuade greet grab take loot disarm break force".split()
+)
+
+SKIP_FLOOR_PATTERNS = [
+    re.compile(p)
+    for p in (
+        r"^(go|move|head|proceed|continue|descend|walk) (on )?(to|down to|towards?) "
+        r"(the )?(next|another|lower) (floor|level)$",
+        r"^skip (this |the )?(floor|level|room)$",
+        r"^(leave|exit) (this |the )?(floor|level)$",
+        r"^move on( to the next floor)?$",
+    )
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, without punctuation and the leading 'I' of the action."""
+    text = re.sub(r"[^a-z0-9' ]+", " ", text.lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"^(i )?((want|try|would like) to )?", "", text)
+
+
+def content_words(text: str) -> set[str]:
+    return {
+        word
+        for word in re.findall(r"[a-z0-9']+", text.lower())
+        if word not in STOPWORDS and len(word) > 2
+    }
+
+
+def features(text: str) -> list[str]:
+    """Words and word pairs of the normalized action."""
+    words = normalize(text).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass
+class LocalClassification:
+    action_type: Literal["ability_check", "skip_floor"]
+    confidence: float
+
+    # Which stage decided: "fuzzy", "rule" or "model"
+    source: str
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes over the words and word pairs of actions."""
+
+    def __init__(self):
+        self.label_counts: Counter = Counter()
+        self.feature_counts: dict[str, Counter] = defaultdict(Counter)
+        self.feature_totals: Counter = Counter()
+        self.vocabulary: set[str] = set()
+
+    def add(self, text: str, label: str):
+        self.label_counts[label] += 1
+        for feature in features(text):
+            self.feature_counts[label][feature] += 1
+            self.feature_totals[label] += 1
+            self.vocabulary.add(feature)
+
+    def size(self) -> int:
+        return sum(self.label_counts.values())
+
+    def predict(self, text: str) -> tuple[Optional[str], float, float]:
+        """The most likely label, its probability and the share of known features."""
+        if not self.label_counts:
+            return None, 0.0, 0.0
+
+        text_features = features(text)
+        if not text_features:
+            return None, 0.0, 0.0
+
+        known = sum(feature in self.vocabulary for feature in text_features)
+        vocabulary_size = len(self.vocabulary) + 1
+        total = self.size()
+
+        scores = {}
+        for label, count in self.label_counts.items():
+            score = math.log(count / total)
+            denominator = self.feature_totals[label] + vocabulary_size
+            for feature in text_features:
+                score += math.log(
+                    (self.feature_counts[label][feature] + 1) / denominator
+                )
+            scores[label] = score
+
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / norm, known / len(text_features)
+
+
+class ActionClassifier:
+    """
+    Classifies free text actions locally, to skip the LLM classification when
+    the answer is obvious. The stages, in order:
+
+    - fuzzy match against the suggested actions, which are ability checks
+    - keyword rules: phrasings of going to the next floor, and check verbs acting
+      on something the floor mentions
+    - a naive Bayes model trained on the LLM classifications logged by observe
+
+    Only confident ability_check / skip_floor answers are returned, everything
+    else is left to the LLM. A share of the local answers (audit_rate) is still
+    sent to the LLM, to measure the precision of each stage.
+
+    Free text ability checks (rule and model stages) still need the LLM to judge
+    their narrative consistency, unless trust_checks is set, see can_skip_llm.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.9,
+        fuzzy_threshold: float = 0.85,
+        min_samples: int = 50,
+        min_known: float = 0.8,
+        audit_rate: float = 0.05,
+        trust_checks: bool = False,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.fuzzy_threshold = fuzzy_threshold
+        self.min_samples = min_samples
+        self.min_known = min_known
+        self.audit_rate = audit_rate
+        self.trust_checks = trust_checks
+
+        self.model = NaiveBayes()
+        self.lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+        self.connection: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "user_input TEXT NOT NULL, label TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.connection.commit()
+            rows = self.connection.execute(
+                "SELECT user_input, label FROM classifications"
+            ).fetchall()
+
+        except sqlite3.Error:
+            self.connection = None
+            return
+
+        for user_input, label in rows:
+            self.model.add(user_input, label)
+
+    def classify(
+        self,
+        user_input: str,
+        suggested_actions: Iterable[str],
+        context: Iterable[str] = (),
+    ) -> Optional[LocalClassification]:
+        """
+        Classify the action locally, or None to ask the LLM. context are the texts
+        the action may refer to (floor history, inventory), an ability check on
+        anything else may be inconsistent with the narrative.
+        """
+        text = normalize(user_input)
+        result = self._classify(text, list(suggested_actions), list(context))
+
+        with self.lock:
+            self.stats["attempts"] += 1
+            if result is not None:
+                self.stats[f"local.{result.source}"] += 1
+
+        return result
+
+    def _classify(
+        self, text: str, suggested_actions: list[str], context: list[str]
+    ) -> Optional[LocalClassification]:
+        # Exact parts of suggested actions are matched before the classifier, this
+        # catches rewordings and typos
+        for action in suggested_actions:
+            ratio = SequenceMatcher(None, text, normalize(action)).ratio()
+            if ratio >= self.fuzzy_threshold:
+                return LocalClassification("ability_check", ratio, "fuzzy")
+
+        if any(pattern.match(text) for pattern in SKIP_FLOOR_PATTERNS):
+            return LocalClassification("skip_floor", 0.95, "rule")
+
+        # Several actions in one go are for the LLM to judge
+        words = text.split()
+        if not words or re.search(r"\b(and|then|while)\b", text):
+            return None
+
+        known = set()
+        for line in suggested_actions + context:
+            known |= content_words(line)
+        refers_to_floor = bool(content_words(text) - {words[0]}) and (
+            content_words(text) - {words[0]} <= known
+        )
+
+        if words[0] in CHECK_VERBS and refers_to_floor:
+            return LocalClassification("ability_check", 0.9, "rule")
+
+        with self.lock:
+            if self.model.size() < self.min_samples:
+                return None
+
+            label, probability, known_share = self.model.predict(text)
+
+        if probability < self.threshold or known_share < self.min_known:
+            return None
+
+        if label == "skip_floor" or (label == "ability_check" and refers_to_floor):
+            return LocalClassification(label, probability, "model")
+
+        return None
+
+    def can_skip_llm(self, local: LocalClassification) -> bool:
+        """
+        Whether the local answer can stand in for the LLM classification. Going
+        to the next floor and rewordings of the suggested actions are always
+        consistent with the narrative, other ability checks are not known to be.
+        """
+        return (
+            local.action_type == "skip_floor"
+            or local.source == "fuzzy"
+            or self.trust_checks
+        )
+
+    def should_audit(self) -> bool:
+        """Whether to check a local answer against the LLM anyway."""
+        return random.random() < self.audit_rate
+
+    def observe(
+        self,
+        user_input: str,
+        action_type: str,
+        narrative_consistency: bool,
+        local: Optional[LocalClassification] = None,
+    ):
+        """
+        Log the LLM classification of the action as a training example. local is
+        the local answer when the action was audited. Only pass fresh completions,
+        a cached or shared answer was already logged.
+        """
+        label = action_type if narrative_consistency else "inconsistent"
+        if label not in LABELS:
+            label = "unknown"
+
+        with self.lock:
+            if local is None:
+                self.stats["fallthrough"] += 1
+            else:
+                self.stats[f"audited.{local.source}"] += 1
+                if label == local.action_type:
+                    self.stats[f"agreed.{local.source}"] += 1
+
+            self.model.add(user_input, label)
+
+            if self.connection is not None:
+                try:
+                    self.connection.execute(
+                        "INSERT INTO classifications (user_input, label, created_at) "
+                        "VALUES (?, ?, ?)",
+                        (user_input, label, time.time()),
+                    )
+                    self.connection.commit()
+
+                except sqlite3.Error:
+                    pass
+
+    def summary(self) -> dict:
+        """Skip rate (share of actions classified locally) and precision per stage."""
+        with self.lock:
+            stats = dict(self.stats)
+            samples = self.model.size()
+
+        attempts = stats.get("attempts", 0)
+        local = sum(v for k, v in stats.items() if k.startswith("local."))
+        precision = {}
+        for source in ("fuzzy", "rule", "model"):
+            audited = stats.get(f"audited.{source}", 0)
+            precision[source] = (
+                stats.get(f"agreed.{source}", 0) / audited if audited else None
+            )
+
+        return {
+            "attempts": attempts,
+            "local": local,
+            "skip_rate": local / attempts if attempts else None,
+            "precision": precision,
+            "samples": samples,
+        }
+
+
+_action_classifier: Optional[ActionClassifier] = None
+_action_classifier_pid: Optional[int] = None
+_action_classifier_lock = threading.Lock()
+
+
+def get_action_classifier() -> Optional[ActionClassifier]:
+    """
+    Get the process-wide action classifier configured from the environment.
+    Returns None unless LOCAL_CLASSIFIER_ENABLED is set.
+    """
+    global _action_classifier, _action_classifier_pid
+
+    if os.getenv("LOCAL_CLASSIFIER_ENABLED", "0").lower() not in ("true", "1", "t"):
+        return None
+
+    with _action_classifier_lock:
+        if _action_classifier is None or _action_classifier_pid != os.getpid():
+            _action_classifier_pid = os.getpid()
+            _action_classifier = ActionClassifier(
+                path=ACTION_CLASSIFIER_PATH or None,
+                threshold=float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9")),
+                min_samples=int(os.getenv("LOCAL_CLASSIFIER_MIN_SAMPLES", "50")),
+                audit_rate=float(os.getenv("LOCAL_CLASSIFIER_AUDIT_RATE", "0.05")),
+                trust_checks=os.getenv("LOCAL_CLASSIFIER_TRUST_CHECKS", "0").lower()
+                in ("true", "1", "t"),
+            )
+
+        return _action_classifier
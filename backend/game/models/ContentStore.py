@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from game.Const import CONTENT_STORE_PATH
+from game.models.ResponseSchemas import get_response_schema
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class ContentStore:
+    """
+    SQLite store of pregenerated LLM content (floor intros, suggested actions,
+    rewards), indexed by theme, floor type, kind of content and the description of
+    the player it was generated for.
+
+    Every entry has a key derived from what it was generated for, so an
+    interrupted generation run can skip what is already stored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS content ("
+            "key TEXT PRIMARY KEY, theme TEXT NOT NULL, floor_type TEXT, "
+            "kind TEXT NOT NULL, player_description TEXT NOT NULL, "
+            "variant INTEGER NOT NULL, value TEXT NOT NULL, "
+            "latency_ms REAL, created_at REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS content_lookup "
+            "ON content (theme, floor_type, kind, player_description)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(
+        theme: str,
+        floor_type: Optional[str],
+        kind: str,
+        player_description: str,
+        variant: int,
+    ) -> str:
+        payload = json.dumps([theme, floor_type, kind, player_description, variant])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def has(self, key: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM content WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row is not None
+
+    def get(self, key: str, ResponseModel: Type[T]) -> Optional[T]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM content WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            return get_response_schema(ResponseModel).validate_json(row[0])
+
+        except ValidationError:
+            return None
+
+    def put(
+        self,
+        key: str,
+        theme: str,
+        floor_type: Optional[str],
+        kind: str,
+        player_description: str,
+        variant: int,
+        value: BaseModel,
+        latency_ms: Optional[float] = None,
+    ):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO content (key, theme, floor_type, kind, "
+                "player_description, variant, value, latency_ms, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    theme,
+                    floor_type,
+                    kind,
+                    player_description,
+                    variant,
+                    value.model_dump_json(),
+                    latency_ms,
+                    time.time(),
+                ),
+            )
+            self.connection.commit()
+
+    def find(
+        self,
+        theme: str,
+        floor_type: Optional[str],
+        kind: str,
+        player_description: str,
+        ResponseModel: Type[T],
+    ) -> list[T]:
+        """Every stored variant of the content."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT value FROM content WHERE theme = ? AND floor_type IS ? "
+                "AND kind = ? AND player_description = ? ORDER BY variant",
+                (theme, floor_type, kind, player_description),
+            ).fetchall()
+
+        schema = get_response_schema(ResponseModel)
+        return [schema.validate_json(value) for (value,) in rows]
+
+    def count(self) -> int:
+        with self.lock:
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM content"
+            ).fetchone()
+
+        return count
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_content_store: Optional[ContentStore] = None
+_content_store_pid: Optional[int] = None
+_content_store_lock = threading.Lock()
+
+
+def get_content_store() -> Optional[ContentStore]:
+    """
+    Get the process-wide content store the game reads pregenerated content from.
+    Returns None when CONTENT_STORE_ENABLED is off or nothing was pregenerated yet.
+    """
+    global _content_store, _content_store_pid
+
+    if os.getenv("CONTENT_STORE_ENABLED", "0").lower() not in ("true", "1", "t"):
+        return None
+
+    with _content_store_lock:
+        if _content_store is None or _content_store_pid != os.getpid():
+            # Do not create an empty store, pregenerate_content does
+            if not os.path.exists(CONTENT_STORE_PATH):
+                return None
+
+            _content_store_pid = os.getpid()
+            _content_store = ContentStore(CONTENT_STORE_PATH)
+
+        return _content_store
@@ -0,0 +1,209 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Type, TypeVar, Optional
+
+from pydantic import BaseModel
+
+from game.models.LLMProvider import AsyncLLMProvider, CompletionChunk
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LatencyTracker:
+    """
+    Rolling window of observed completion latencies (in seconds). Cancelled
+    requests are recorded with their elapsed time, a lower bound of the latency.
+    """
+
+    def __init__(self, window: int = 200):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self.lock:
+            self.samples.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Return the given percentile (0 to 1), or None without enough samples."""
+        with self.lock:
+            samples = sorted(self.samples)
+
+        if len(samples) == 0:
+            return None
+
+        index = min(len(samples) - 1, int(percentile * len(samples)))
+        return samples[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class HedgedProvider(AsyncLLMProvider):
+    """
+    Send the request to the primary backend, and if it has not answered after the
+    hedge delay, send a duplicate to the secondary backend. The first validated
+    response wins and the other request is cancelled.
+
+    The hedge delay follows the primary's observed latency percentile, so only the
+    slow tail (e.g. a backed up local GPU queue) is duplicated. If the primary fails,
+    the request fails over to the secondary right away.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncLLMProvider,
+        secondary: AsyncLLMProvider,
+        hedge_percentile: float = 0.95,
+        min_delay: float = 1.0,
+        max_delay: float = 20.0,
+        default_delay: float = 5.0,
+        min_samples: int = 20,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.model = getattr(primary, "model", None)
+
+        self.hedge_percentile = hedge_percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+
+        self.latency = LatencyTracker()
+        self.stats = {
+            "primary_wins": 0,
+            "secondary_wins": 0,
+            "hedged": 0,
+            "failovers": 0,
+        }
+
+    @classmethod
+    def from_env(cls, primary: AsyncLLMProvider, secondary: AsyncLLMProvider):
+        return cls(
+            primary,
+            secondary,
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+            min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1")),
+            max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "20")),
+            default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "5")),
+        )
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before sending the hedged request."""
+        if len(self.latency) < self.min_samples:
+            return self.default_delay
+
+        delay = self.latency.percentile(self.hedge_percentile)
+        return max(self.min_delay, min(self.max_delay, delay))
+
+    async def _timed_primary(self, ResponseModel: Type[T], **kwargs) -> T:
+        start = time.monotonic()
+        try:
+            response = await self.primary.aget_completion(
+                ResponseModel=ResponseModel, **kwargs
+            )
+
+        except asyncio.CancelledError:
+            # Lost to the secondary: it would have taken at least this long.
+            # Leaving it out would bias the window towards the fast answers.
+            self.latency.record(time.monotonic() - start)
+            raise
+
+        self.latency.record(time.monotonic() - start)
+        return response
+
+    async def _agenerate(
+        self,
+        ResponseModel: Type[T],
+        model: Optional[str],
+        verbose: bool,
+        on_chunk: Optional[Callable[[CompletionChunk], None]],
+        attempt: int,
+        **kwargs,
+    ) -> str:
+        """
+        One attempt on the primary. Completions do not come through here, they
+        are hedged whole (with the retries of each backend) in _aget_completion.
+        """
+        return await self.primary._agenerate(
+            ResponseModel,
+            self.primary.resolve_model(model),
+            verbose,
+            on_chunk,
+            attempt,
+            **kwargs,
+        )
+
+    async def _aget_completion(self, ResponseModel: Type[T], **kwargs) -> T:
+        # The child providers pick their own model
+        kwargs.pop("model", None)
+
+        # Two streams cannot feed the same handler, so streamed requests only fail over
+        secondary_kwargs = dict(kwargs)
+        if secondary_kwargs.pop("on_chunk", None) is not None:
+            try:
+                return await self.primary.aget_completion(
+                    ResponseModel=ResponseModel, **kwargs
+                )
+
+            except Exception:
+                self.stats["failovers"] += 1
+                return await self.secondary.aget_completion(
+                    ResponseModel=ResponseModel, **secondary_kwargs
+                )
+
+        primary_task = asyncio.ensure_future(
+            self._timed_primary(ResponseModel=ResponseModel, **kwargs)
+        )
+
+        # Whatever is still pending when the caller gets its answer, fails or is
+        # cancelled (e.g. a discarded speculation) is cancelled with it
+        pending = {primary_task}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay())
+
+            if primary_task in done and primary_task.exception() is None:
+                self.stats["primary_wins"] += 1
+                return primary_task.result()
+
+            if primary_task in done:
+                self.stats["failovers"] += 1
+            else:
+                self.stats["hedged"] += 1
+
+            secondary_task = asyncio.ensure_future(
+                self.secondary.aget_completion(
+                    ResponseModel=ResponseModel, **secondary_kwargs
+                )
+            )
+
+            pending = {
+                task for task in (primary_task, secondary_task) if not task.done()
+            }
+            error: Optional[BaseException] = (
+                primary_task.exception() if primary_task.done() else None
+            )
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is primary_task:
+                            self.stats["primary_wins"] += 1
+                        else:
+                            self.stats["secondary_wins"] += 1
+                        return task.result()
+
+                    error = task.exception()
+
+            raise error
+
+        finally:
+            for task in pending:
+                task.cancel()
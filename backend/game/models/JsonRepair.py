@@ -0,0 +1,194 @@
+import re
+import json
+import math
+import types
+import difflib
+from typing import (
+    Annotated,
+    Any,
+    Literal,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+import jiter
+import annotated_types
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def parse_json_tolerant(content: str) -> tuple[Optional[dict], list[str]]:
+    """
+    Parse the JSON object in content, tolerating the usual small model mistakes.
+
+    Returns:
+        The parsed object (None if nothing could be salvaged) and the fixes applied.
+    """
+    fixes: list[str] = []
+    text = content.strip()
+
+    # ```json ... ``` fences
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", text, re.DOTALL)
+    if fenced is not None and text.startswith("```"):
+        text = fenced.group(1)
+        fixes.append("stripped code fence")
+
+    # Text before the object
+    start = text.find("{")
+    if start == -1:
+        return None, fixes
+
+    if start > 0:
+        text = text[start:]
+        fixes.append("stripped leading text")
+
+    # Trailing garbage after a complete object
+    try:
+        data, end = json.JSONDecoder().raw_decode(text)
+        if text[end:].strip():
+            fixes.append("dropped trailing text")
+        return (data if isinstance(data, dict) else None), fixes
+
+    except json.JSONDecodeError:
+        pass
+
+    # Truncated output, e.g. the generation hit max_tokens
+    try:
+        data = jiter.from_json(text.encode("utf-8"), partial_mode="trailing-strings")
+
+    except ValueError:
+        return None, fixes
+
+    fixes.append("closed truncated JSON")
+    return (data if isinstance(data, dict) else None), fixes
+
+
+def _constraint(metadata: list, kind: type, attribute: str) -> Optional[Any]:
+    for item in metadata:
+        if isinstance(item, kind):
+            return getattr(item, attribute)
+
+    return None
+
+
+def _unwrap_optional(annotation: Any, metadata: list) -> tuple[Any, list]:
+    """
+    The type inside Optional[...] (or X | None), so optional fields are repaired
+    like required ones. Constraints of an Annotated inner type are added to metadata.
+    """
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+
+    if get_origin(annotation) is Annotated:
+        annotation, *extra = get_args(annotation)
+        for item in extra:
+            # Field(...) keeps its constraints in its own metadata
+            metadata = [*metadata, *getattr(item, "metadata", [item])]
+
+    return annotation, metadata
+
+
+def _normalize_literal(value: str) -> str:
+    return re.sub(r"[\s\-]+", "_", value.strip().lower())
+
+
+def repair_fields(data: dict, ResponseModel: Type[BaseModel]) -> tuple[dict, list[str]]:
+    """
+    Bring the field values in line with the response model where it is safe to:
+    clamp numbers into their ge/le range, truncate lists to max_length and coerce
+    near-miss literals (e.g. "Ability Check") to the allowed value.
+    """
+    fixes: list[str] = []
+    data = dict(data)
+
+    for name, field in ResponseModel.model_fields.items():
+        if name not in data:
+            continue
+
+        value = data[name]
+        annotation, metadata = _unwrap_optional(field.annotation, field.metadata)
+
+        if get_origin(annotation) is Literal and isinstance(value, str):
+            options = [
+                option for option in get_args(annotation) if isinstance(option, str)
+            ]
+            if value not in options:
+                normalized = {_normalize_literal(option): option for option in options}
+                match = normalized.get(_normalize_literal(value))
+                if match is None:
+                    close = difflib.get_close_matches(
+                        _normalize_literal(value), list(normalized), n=1, cutoff=0.75
+                    )
+                    match = normalized[close[0]] if close else None
+
+                if match is not None:
+                    data[name] = match
+                    fixes.append(f"coerced {name} {value!r} to {match!r}")
+
+        elif annotation in (int, float) and not isinstance(value, bool):
+            if isinstance(value, str):
+                try:
+                    value = float(value.strip())
+
+                except ValueError:
+                    continue
+
+            # NaN and infinity cannot be rounded or clamped, leave them to validation
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                continue
+
+            if annotation is int and value != int(value):
+                value = round(value)
+                fixes.append(f"rounded {name}")
+
+            lower = _constraint(metadata, annotated_types.Ge, "ge")
+            upper = _constraint(metadata, annotated_types.Le, "le")
+
+            if lower is not None and value < lower:
+                fixes.append(f"clamped {name} {value} to {lower}")
+                value = lower
+
+            elif upper is not None and value > upper:
+                fixes.append(f"clamped {name} {value} to {upper}")
+                value = upper
+
+            data[name] = annotation(value)
+
+        elif isinstance(value, list):
+            max_length = _constraint(metadata, annotated_types.MaxLen, "max_length")
+            if max_length is not None and len(value) > max_length:
+                data[name] = value[:max_length]
+                fixes.append(f"truncated {name} to {max_length} items")
+
+    return data, fixes
+
+
+def repair_response(
+    content: str, ResponseModel: Type[T]
+) -> tuple[Optional[T], list[str]]:
+    """
+    Try to turn output that failed validation into a valid response locally,
+    instead of paying for a new completion.
+
+    Returns:
+        The validated response (None if it could not be repaired) and the fixes applied.
+    """
+    data, fixes = parse_json_tolerant(content)
+    if data is None:
+        return None, fixes
+
+    data, field_fixes = repair_fields(data, ResponseModel)
+    fixes += field_fixes
+
+    try:
+        return ResponseModel.model_validate(data), fixes
+
+    except ValidationError:
+        return None, fixes
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Type, TypeVar, Any
+
+from pydantic import BaseModel, ValidationError
+
+from game.Const import LLM_CACHE_PATH
+from game.models.ResponseSchemas import get_response_schema
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMCache:
+    """
+    Two-tier cache of validated LLM responses.
+
+    Entries are keyed on a hash of everything that affects the completion
+    (model, messages, response schema, temperature, max_tokens).
+    The in-memory tier is an LRU, the on-disk tier is a SQLite table shared by
+    every worker on the machine. Both tiers expire entries after ttl seconds.
+    The disk tier is trimmed to max_disk_entries every evict_every stores, so it
+    can briefly hold a few more.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 50000,
+        ttl: float = 7 * 24 * 3600,
+        evict_every: int = 100,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+
+        # Stores to the disk tier since it was last trimmed
+        self.stores_since_evict = 0
+
+        self.memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        self.connection: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_last_access "
+                "ON llm_cache (last_access)"
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def make_key(
+        model: Optional[str],
+        messages: list[dict[str, Any]],
+        ResponseModel: Type[BaseModel],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        prompt_key: Optional[str] = None,
+        seed: Optional[int] = None,
+    ) -> str:
+        """
+        Hash everything that affects the completion into a cache key.
+        prompt_key, the precomputed hash of the messages, stands in for them if given.
+        """
+        fields = {
+            "model": model,
+            "messages": prompt_key or messages,
+            "schema": get_response_schema(ResponseModel).schema_hash,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        # Only requests asking for a specific sample have one
+        if seed is not None:
+            fields["seed"] = seed
+
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl
+
+    def get(self, key: str, ResponseModel: Type[T]) -> Optional[T]:
+        """Return the cached response, or None on a miss."""
+        with self.lock:
+            value = self._get_value(key)
+
+        if value is None:
+            return None
+
+        try:
+            return get_response_schema(ResponseModel).validate_json(value)
+
+        except ValidationError:
+            # The response model changed since the entry was stored
+            self.delete(key)
+            return None
+
+    def _get_value(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            created_at, value = entry
+            if not self.is_expired(created_at):
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+
+            del self.memory[key]
+
+        if self.connection is not None:
+            row = self.connection.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None:
+                value, created_at = row
+                if not self.is_expired(created_at):
+                    self.connection.execute(
+                        "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self.connection.commit()
+                    self._set_memory(key, created_at, value)
+                    self.stats["disk_hits"] += 1
+                    return value
+
+                self.connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.connection.commit()
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, response: BaseModel):
+        """Store a validated response in both tiers."""
+        value = response.model_dump_json()
+        now = time.time()
+
+        with self.lock:
+            self._set_memory(key, now, value)
+
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+
+                self.stores_since_evict += 1
+                if self.stores_since_evict >= self.evict_every:
+                    self.stores_since_evict = 0
+                    self._evict_disk(now)
+
+                self.connection.commit()
+
+            self.stats["stores"] += 1
+
+    def delete(self, key: str):
+        with self.lock:
+            self.memory.pop(key, None)
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.connection.commit()
+
+    def _set_memory(self, key: str, created_at: float, value: str):
+        self.memory[key] = (created_at, value)
+        self.memory.move_to_end(key)
+
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        cursor = self.connection.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+        )
+        self.stats["evictions"] += cursor.rowcount
+
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_disk_entries:
+            cursor = self.connection.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+            self.stats["evictions"] += cursor.rowcount
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total > 0 else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM llm_cache")
+                self.connection.commit()
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_cache_pid: Optional[int] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[LLMCache]:
+    """
+    Get the process-wide cache configured from the environment.
+    Returns None unless LLM_CACHE_ENABLED is on.
+    The SQLite connection is reopened after a fork.
+    """
+    global _shared_cache, _shared_cache_pid
+
+    if os.getenv("LLM_CACHE_ENABLED", "0").lower() not in ("true", "1", "t"):
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None or _shared_cache_pid != os.getpid():
+            _shared_cache_pid = os.getpid()
+            _shared_cache = LLMCache(
+                path=LLM_CACHE_PATH or None,
+                max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024")),
+                max_disk_entries=int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+
+        return _shared_cache
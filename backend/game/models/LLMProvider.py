@@ -1,26 +1,205 @@
-import os, json
+import os
 import time
+import logging
+import asyncio
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from typing import Type, TypeVar, Optional
-
-from openai import OpenAI
+from dataclasses import dataclass
+from typing import (
+    Type,
+    TypeVar,
+    Optional,
+    Coroutine,
+    Any,
+    Callable,
+    AsyncIterator,
+    Iterator,
+)
+
+import httpx
+import jiter
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from pydantic import BaseModel, ValidationError
 
+from game.models.LLMCache import LLMCache
+from game.models.JsonRepair import repair_response
+from game.models.SingleFlight import SingleFlight
+from game.models.ResponseSchemas import get_response_schema
+from game.models.TokenBudget import TokenBudgets, get_token_budgets
+from game.models.RetryPolicy import (
+    EmptyResponseError,
+    RetryPolicy,
+    RetryBudget,
+    current_retry_budget,
+    get_circuit_breaker,
+)
+from game.models.Telemetry import (
+    LLMCallRecord,
+    current_call,
+    current_session,
+    get_telemetry,
+)
+
 T = TypeVar("T", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+
+class ProviderEventLoop:
+    """
+    An event loop running forever in a daemon thread.
+
+    Async clients (httpx connection pools) are bound to the loop they are first used on,
+    so every async provider runs its requests on this single loop. Sync callers block on
+    the result, and callers on other loops await it through a wrapped future.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="llm-provider-loop", daemon=True
+        )
+        self.thread.start()
+
+    def is_current(self) -> bool:
+        """Check if the caller is running inside this loop."""
+        return threading.current_thread() is self.thread
+
+    def submit(self, coro: Coroutine[Any, Any, T]):
+        """Schedule the coroutine on the loop and return a concurrent future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run the coroutine on the loop and block until it is done."""
+        if self.is_current():
+            coro.close()
+            raise RuntimeError("Cannot block on the provider loop from inside itself")
+
+        return self.submit(coro).result()
+
+    async def run_async(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Await the coroutine on the loop from any other running loop."""
+        if self.is_current():
+            return await coro
+
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+_provider_loop: Optional[ProviderEventLoop] = None
+_provider_loop_pid: Optional[int] = None
+_provider_loop_lock = threading.Lock()
+
+
+def get_provider_loop() -> ProviderEventLoop:
+    """
+    Get the process-wide provider loop, creating it on first use.
+    The loop is recreated after a fork, since threads do not survive it.
+    """
+    global _provider_loop, _provider_loop_pid
+
+    with _provider_loop_lock:
+        if _provider_loop is None or _provider_loop_pid != os.getpid():
+            _provider_loop = ProviderEventLoop()
+            _provider_loop_pid = os.getpid()
+
+        return _provider_loop
+
+
+@dataclass
+class CompletionChunk:
+    """
+    A piece of a streamed completion.
+    The last chunk of astream_completion carries the validated response.
+    """
+
+    delta: str
+    snapshot: str
+    attempt: int = 0
+    response: Optional[BaseModel] = None
+
+    def partial(self) -> dict:
+        """Parse the JSON generated so far, keeping unfinished strings."""
+        try:
+            parsed = jiter.from_json(
+                self.snapshot.encode("utf-8"), partial_mode="trailing-strings"
+            )
+
+        except ValueError:
+            return {}
+
+        return parsed if isinstance(parsed, dict) else {}
+
+
+class TextFieldStream:
+    """
+    Chunk handler that forwards the text of one string field of the response
+    (e.g. the narrative) to handler as soon as it is generated.
+    """
+
+    def __init__(self, field: str, handler: Callable[[str], None]):
+        self.field = field
+        self.handler = handler
+        self.attempt = 0
+        self.sent = 0
+
+    def __call__(self, chunk: CompletionChunk):
+        # A retry generates the text again from the start
+        if chunk.attempt != self.attempt:
+            self.attempt = chunk.attempt
+            self.sent = 0
+
+        value = chunk.partial().get(self.field)
+        if isinstance(value, str) and len(value) > self.sent:
+            self.handler(value[self.sent :])
+            self.sent = len(value)
+
+
+_in_flight_lock = threading.Lock()
+
 
 class LLMProvider(ABC):
+    # Response cache, only used for requests that opt in with use_cache
+    cache: Optional[LLMCache] = None
+
+    # Backoff between attempts of one completion
+    retry_policy: RetryPolicy = RetryPolicy.from_env()
+
     @abstractmethod
     def __init__(self):
         pass
 
+    def get_cache_key(
+        self, ResponseModel: Type[BaseModel], use_cache: bool, kwargs: dict
+    ) -> Optional[str]:
+        """Return the cache key of the completion, or None if it should not be cached."""
+        if not use_cache or self.cache is None:
+            return None
+
+        return self.get_request_key(ResponseModel, kwargs)
+
+    def get_request_key(self, ResponseModel: Type[BaseModel], kwargs: dict) -> str:
+        """
+        Hash of everything that affects the completion. The hash of the messages
+        is reused when the request was rendered with one (prompt_key).
+        """
+        return LLMCache.make_key(
+            model=kwargs.get("model") or getattr(self, "model", None),
+            messages=kwargs.get("messages", []),
+            prompt_key=kwargs.get("prompt_key"),
+            ResponseModel=ResponseModel,
+            temperature=kwargs.get("temperature"),
+            max_tokens=kwargs.get("max_tokens"),
+            seed=kwargs.get("seed"),
+        )
+
     def get_json_schema_response_format(self, response_model: BaseModel):
-        response_format = response_model.model_json_schema()
+        response_format = dict(get_response_schema(response_model).json_schema)
         response_format["type"] = "json_object"
         return response_format
 
@@ -28,83 +207,529 @@ class LLMProvider(ABC):
     def get_completion(self, ResponseModel: Type[T], **kwargs) -> T:
         pass
 
+    @property
+    def in_flight(self) -> int:
+        """Number of calls to the provider currently being made."""
+        return self.__dict__.get("_in_flight", 0)
+
+    @contextmanager
+    def track_call(
+        self,
+        request_type: Optional[str],
+        session: Optional[str],
+        model: Optional[str] = None,
+    ) -> Iterator[LLMCallRecord]:
+        """
+        Time the call and report it to telemetry once it is done.
+        A call made on behalf of another tracked call (e.g. a hedged duplicate)
+        adds to the outer record instead.
+        """
+        outer = current_call.get()
+        if outer is not None:
+            yield outer
+            return
+
+        record = LLMCallRecord(
+            request_type=request_type or "unknown",
+            session=session,
+            provider=type(self).__name__,
+            model=model or getattr(self, "model", None),
+        )
+        token = current_call.set(record)
+        start = time.monotonic()
+        with _in_flight_lock:
+            self.__dict__["_in_flight"] = self.in_flight + 1
+
+        try:
+            yield record
+
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise e
+
+        finally:
+            with _in_flight_lock:
+                self.__dict__["_in_flight"] = self.in_flight - 1
+
+            record.latency_ms = (time.monotonic() - start) * 1000
+            current_call.reset(token)
+            get_telemetry().record(record)
+
+    def parse_response(self, ResponseModel: Type[T], content: str) -> T:
+        """
+        Validate the generated content. If validation fails, try to repair the output
+        locally before giving up, since a retry costs a full new completion.
+        """
+        try:
+            return get_response_schema(ResponseModel).validate_json(content)
+
+        except ValidationError as e:
+            record = current_call.get()
+            if record is not None:
+                record.validation_failures += 1
+
+            response, fixes = repair_response(content, ResponseModel)
+            if response is None:
+                raise e
 
-class OpenAILikeProvider(LLMProvider):
-    """OpenAI LLM"""
+            if record is not None:
+                record.repairs += 1
+
+            logger.info(f"Repaired {ResponseModel.__name__}: {', '.join(fixes)}")
+            return response
+
+    @staticmethod
+    def mark_reused(response: BaseModel):
+        """Flag a response that is not a fresh completion, see LLMResponseModel."""
+        if "_reused" in type(response).__private_attributes__:
+            response._reused = True
+
+    @staticmethod
+    def record_finish(finish_reason: Optional[str]):
+        """Count an attempt cut off by max_tokens in the call's telemetry record."""
+        record = current_call.get()
+        if record is not None and finish_reason == "length":
+            record.truncations += 1
+
+    @staticmethod
+    def widen_truncated(kwargs: dict[str, Any], truncations: int):
+        """
+        If the failed attempt was cut off by max_tokens (the record counts more
+        truncations than before it), raise max_tokens for the retry.
+        """
+        record = current_call.get()
+        budgets = get_token_budgets()
+        if record is None or budgets is None or record.truncations <= truncations:
+            return
+
+        if kwargs.get("max_tokens") is not None:
+            kwargs["max_tokens"] = budgets.widen(
+                record.request_type, kwargs["max_tokens"]
+            )
+
+    async def aget_completion(self, ResponseModel: Type[T], **kwargs) -> T:
+        """Async version of get_completion. Sync providers run in a worker thread."""
+        return await asyncio.to_thread(
+            self.get_completion, ResponseModel=ResponseModel, **kwargs
+        )
 
-    max_retries = 3
 
-    @abstractmethod
-    def __init__(self):
-        self.client: OpenAI
-        pass
+class AsyncLLMProvider(LLMProvider):
+    """
+    Provider whose native API is async.
+    get_completion is a thin blocking wrapper around aget_completion.
 
-    def get_completion(
-        self, ResponseModel: Type[T], model: str, verbose: bool = False, **kwargs
+    Identical requests in flight at the same time (e.g. a double submitted turn)
+    are generated once, see single_flight.
+    """
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self.__dict__.setdefault("_single_flight", SingleFlight())
+
+    def get_completion(self, ResponseModel: Type[T], **kwargs) -> T:
+        # Context variables do not cross into the provider loop, pass them along
+        kwargs.setdefault("retry_budget", current_retry_budget.get())
+        kwargs.setdefault("session", current_session.get())
+        return get_provider_loop().run(
+            self._acomplete(ResponseModel=ResponseModel, **kwargs)
+        )
+
+    async def aget_completion(self, ResponseModel: Type[T], **kwargs) -> T:
+        kwargs.setdefault("retry_budget", current_retry_budget.get())
+        kwargs.setdefault("session", current_session.get())
+        return await get_provider_loop().run_async(
+            self._acomplete(ResponseModel=ResponseModel, **kwargs)
+        )
+
+    async def _acomplete(
+        self,
+        ResponseModel: Type[T],
+        use_cache: bool = False,
+        request_type: Optional[str] = None,
+        session: Optional[str] = None,
+        prompt_key: Optional[str] = None,
+        estimated_prompt_tokens: int = 0,
+        **kwargs,
     ) -> T:
-        for trial in range(self.max_retries):
-            try:
-                result = self.client.beta.chat.completions.parse(
-                    model=model,
-                    response_format=ResponseModel,
-                    **kwargs,
+        with self.track_call(request_type, session, kwargs.get("model")) as record:
+            record.estimated_prompt_tokens = estimated_prompt_tokens
+            key_kwargs = {**kwargs, "prompt_key": prompt_key}
+            cache_key = self.get_cache_key(ResponseModel, use_cache, key_kwargs)
+            if cache_key is not None:
+                # SQLite, keep it off the provider loop
+                cached = await asyncio.to_thread(
+                    self.cache.get, cache_key, ResponseModel
+                )
+                if cached is not None:
+                    record.cached = True
+                    self.mark_reused(cached)
+                    return cached
+
+            # The keys use the request's own max_tokens, the learned one can change
+            budgets = get_token_budgets()
+            if budgets is not None and request_type is not None:
+                if kwargs.get("max_tokens") is not None:
+                    kwargs["max_tokens"] = budgets.budget(
+                        request_type, kwargs["max_tokens"]
+                    )
+
+            if kwargs.get("on_chunk") is None:
+                response, shared = await self.single_flight.do(
+                    self.get_request_key(ResponseModel, key_kwargs),
+                    lambda: self._aget_completion(
+                        ResponseModel=ResponseModel, **kwargs
+                    ),
                 )
 
-                if verbose:
-                    print(result)
+                if shared:
+                    # Every caller gets its own copy
+                    record.coalesced = True
+                    response = response.model_copy(deep=True)
+                    self.mark_reused(response)
 
-                if result.choices[0].message.content is None:
-                    raise ValueError("No content in the response")
+            else:
+                # Followers could not be fed the chunks, streams are never shared
+                response = await self._aget_completion(
+                    ResponseModel=ResponseModel, **kwargs
+                )
 
-                return ResponseModel.model_validate_json(
-                    result.choices[0].message.content
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, response)
+
+            if budgets is not None and request_type is not None:
+                self.update_token_budget(budgets, request_type, record, kwargs)
+
+            return response
+
+    @staticmethod
+    def update_token_budget(
+        budgets: TokenBudgets,
+        request_type: str,
+        record: LLMCallRecord,
+        kwargs: dict[str, Any],
+    ):
+        """Learn from the length of the completion the call got."""
+        if record.coalesced:
+            return
+
+        # Cut off, but repaired into a valid response. A retry would have widened it
+        if record.truncations and not record.retries:
+            if kwargs.get("max_tokens") is not None:
+                budgets.widen(request_type, kwargs["max_tokens"])
+
+        # Only clean single attempts tell how long this request type's output is
+        elif not (record.retries or record.truncations):
+            budgets.observe(request_type, record.completion_tokens)
+
+    async def astream_completion(
+        self, ResponseModel: Type[T], **kwargs
+    ) -> AsyncIterator[CompletionChunk]:
+        """
+        Yield the completion chunk by chunk as it is generated.
+        The last chunk holds the validated response in chunk.response.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Optional[CompletionChunk]] = asyncio.Queue()
+
+        def on_chunk(chunk: CompletionChunk):
+            loop.call_soon_threadsafe(queue.put_nowait, chunk)
+
+        task = asyncio.ensure_future(
+            self.aget_completion(
+                ResponseModel=ResponseModel, on_chunk=on_chunk, **kwargs
+            )
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        try:
+            last_chunk = CompletionChunk(delta="", snapshot="")
+            while (chunk := await queue.get()) is not None:
+                last_chunk = chunk
+                yield chunk
+
+            response = await task
+            yield CompletionChunk(
+                delta="",
+                snapshot=last_chunk.snapshot,
+                attempt=last_chunk.attempt,
+                response=response,
+            )
+
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _aget_completion(
+        self,
+        ResponseModel: Type[T],
+        model: Optional[str] = None,
+        verbose: bool = False,
+        on_chunk: Optional[Callable[[CompletionChunk], None]] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        **kwargs,
+    ) -> T:
+        """
+        Do the actual completion. Always runs on the provider loop.
+        When on_chunk is given, the completion is streamed and on_chunk is called
+        for every chunk.
+
+        Generates with _agenerate, repairs or retries invalid output following
+        retry_policy and the turn's retry budget, and widens max_tokens after a
+        truncated attempt.
+        """
+        model = self.resolve_model(model)
+
+        retry = 0
+        while True:
+            record = current_call.get()
+            truncations = record.truncations if record is not None else 0
+            try:
+                content = await self._agenerate(
+                    ResponseModel, model, verbose, on_chunk, retry, **kwargs
                 )
+                return self.parse_response(ResponseModel, content)
 
-            except (json.JSONDecodeError, ValidationError, ValueError) as e:
-                if trial != self.max_retries - 1:
-                    print(f"Trial {trial + 1} failed. Retrying...")
-                    time.sleep(1)
-                    continue
+            except Exception as e:
+                self.widen_truncated(kwargs, truncations)
 
-                else:
+                if not self.should_retry(e, retry):
                     raise e
 
-            except Exception as e:
-                raise e
+                if retry_budget is not None and not retry_budget.consume():
+                    raise e
 
-        raise e
+                logger.warning(
+                    f"{ResponseModel.__name__} attempt {retry + 1} failed: {e}. Retrying..."
+                )
+                if record is not None:
+                    record.retries += 1
 
+                await asyncio.sleep(self.retry_policy.delay(retry))
+                retry += 1
 
-class ollama(OpenAILikeProvider):
-    """Local LLM ollama"""
+    def resolve_model(self, model: Optional[str]) -> Optional[str]:
+        """The model to generate with, when the request does not name one."""
+        return model or getattr(self, "model", None)
 
-    max_retries = 3
-    default_model = "llama3.1:8B"
+    def should_retry(self, error: Exception, retry: int) -> bool:
+        return self.retry_policy.should_retry(error, retry)
+
+    @abstractmethod
+    async def _agenerate(
+        self,
+        ResponseModel: Type[T],
+        model: Optional[str],
+        verbose: bool,
+        on_chunk: Optional[Callable[[CompletionChunk], None]],
+        attempt: int,
+        **kwargs,
+    ) -> str:
+        """
+        Generate one attempt of the completion and return its raw content.
+        The retry loop of _aget_completion calls it for every attempt.
+        """
+        pass
+
+
+class AsyncOpenAILikeProvider(AsyncLLMProvider):
+    """
+    OpenAI compatible LLM on top of AsyncOpenAI.
+    A single worker can keep many completions in flight at the same time.
+
+    Retries follow retry_policy and the turn's retry budget. Backend failures feed
+    a circuit breaker shared by every provider talking to the same base URL.
+    The client's own retries are turned off so they do not stack on top.
+    """
 
+    default_model: Optional[str] = None
+    base_url: str
+
+    # Backend specific fields sent along with every completion
+    extra_body: Optional[dict[str, Any]] = None
+
+    # Connection pool, shared by every request made through this provider
+    pool_max_connections = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+    pool_max_keepalive_connections = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+    pool_keepalive_expiry = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "120"))
+
+    @abstractmethod
     def __init__(self):
-        self.client = OpenAI(
-            base_url=os.getenv('OLLAMA_URL', 'http://ollama:11435/v1'),
-            api_key="ollama"
+        self.client: AsyncOpenAI
+        self.model: Optional[str]
+        pass
+
+    @property
+    def circuit_breaker(self):
+        return get_circuit_breaker(self.base_url)
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        model = model or self.model or self.default_model
+        if model is None:
+            raise ValueError(f"No model specified for {type(self).__name__}")
+
+        return model
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client with keep-alive enabled."""
+        return DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_max_connections,
+                max_keepalive_connections=self.pool_max_keepalive_connections,
+                keepalive_expiry=self.pool_keepalive_expiry,
+            )
         )
 
-    def get_completion(
-        self, ResponseModel: Type[T], model: str = default_model, **kwargs
-    ) -> T:
-        return super().get_completion(
-            ResponseModel=ResponseModel, model=model, **kwargs
+    async def _agenerate(
+        self,
+        ResponseModel: Type[T],
+        model: str,
+        verbose: bool,
+        on_chunk: Optional[Callable[[CompletionChunk], None]],
+        attempt: int,
+        **kwargs,
+    ) -> str:
+        """Generate one completion through the circuit breaker."""
+        self.circuit_breaker.before_call()
+
+        try:
+            if on_chunk is None:
+                content = await self._acreate(ResponseModel, model, verbose, **kwargs)
+            else:
+                content = await self._astream(
+                    ResponseModel, model, on_chunk, attempt, **kwargs
+                )
+
+        except Exception as e:
+            if self.retry_policy.is_backend_failure(e):
+                self.circuit_breaker.record_failure()
+            else:
+                # The backend answered, only the output is bad
+                self.circuit_breaker.record_success()
+            raise e
+
+        except BaseException:
+            # Cancelled, e.g. a hedged request that lost or a discarded speculation
+            self.circuit_breaker.record_cancelled()
+            raise
+
+        self.circuit_breaker.record_success()
+        return content
+
+    def with_extra_body(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        if not self.extra_body:
+            return kwargs
+
+        return {
+            **kwargs,
+            "extra_body": {**self.extra_body, **kwargs.get("extra_body", {})},
+        }
+
+    @staticmethod
+    def record_usage(usage: Any):
+        """Add the token usage of one attempt to the call's telemetry record."""
+        record = current_call.get()
+        if record is not None:
+            record.add_usage(usage)
+
+    async def _acreate(
+        self, ResponseModel: Type[T], model: str, verbose: bool, **kwargs
+    ) -> str:
+        """
+        Generate the whole completion and return its raw content.
+        Parsing is left to parse_response, so malformed output can still be repaired.
+        """
+        result = await self.client.chat.completions.create(
+            model=model,
+            response_format=get_response_schema(ResponseModel).response_format,
+            **self.with_extra_body(kwargs),
+        )
+        self.record_usage(result.usage)
+        self.record_finish(result.choices[0].finish_reason)
+
+        if verbose:
+            print(result)
+
+        if result.choices[0].message.content is None:
+            raise EmptyResponseError()
+
+        return result.choices[0].message.content
+
+    async def _astream(
+        self,
+        ResponseModel: Type[T],
+        model: str,
+        on_chunk: Callable[[CompletionChunk], None],
+        attempt: int,
+        **kwargs,
+    ) -> str:
+        """Stream the completion into on_chunk and return the full content."""
+        stream = await self.client.chat.completions.create(
+            model=model,
+            response_format=get_response_schema(ResponseModel).response_format,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self.with_extra_body(kwargs),
+        )
+
+        snapshot = ""
+        async for chunk in stream:
+            # The usage comes in a last chunk without choices
+            if getattr(chunk, "usage", None) is not None:
+                self.record_usage(chunk.usage)
+
+            if chunk.choices and chunk.choices[0].finish_reason is not None:
+                self.record_finish(chunk.choices[0].finish_reason)
+
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+
+            delta = chunk.choices[0].delta.content
+            snapshot += delta
+            on_chunk(CompletionChunk(delta=delta, snapshot=snapshot, attempt=attempt))
+
+        if not snapshot:
+            raise EmptyResponseError()
+
+        return snapshot
+
+
+class ollama(AsyncOpenAILikeProvider):
+    """
+    Local LLM ollama
+
+    The model is kept loaded between turns (keep_alive), so ollama can reuse the
+    KV cache of the prompt prefix that consecutive requests share.
+    """
+
+    default_model = "llama3.1:8B"
+    extra_body = {"keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m")}
+
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None):
+        self.base_url = base_url or os.getenv("OLLAMA_URL", "http://ollama:11435/v1")
+        self.model = model or self.default_model
+        self.client = AsyncOpenAI(
+            base_url=self.base_url,
+            api_key="ollama",
+            max_retries=0,
+            http_client=self.create_http_client(),
         )
 
 
-class OpenRouterProvider(OpenAILikeProvider):
+class OpenRouterProvider(AsyncOpenAILikeProvider):
     #! TODO: Need to handle token limit, request limit, etc
-    def __init__(self, model: Optional[str] = os.getenv("OPENROUTER_MODEL")):
+    def __init__(self, model: Optional[str] = None):
+        model = model or os.getenv("OPENROUTER_MODEL") or self.default_model
         if model is None:
             raise ValueError("Model must be specified for OpenRouterProvider")
 
+        self.base_url = "https://openrouter.ai/api/v1"
         self.model = model
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+        self.client = AsyncOpenAI(
+            base_url=self.base_url,
             api_key=os.getenv("OPENROUTER_API_KEY"),
+            max_retries=0,
+            http_client=self.create_http_client(),
         )
 
 
@@ -0,0 +1,185 @@
+import os
+import json
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Type, TypeVar, Optional, Callable, Any
+
+import httpx
+import openai
+from pydantic import BaseModel
+
+from game.Const import MODEL_PATH
+from game.classes.LLMModel import LLMModel
+from game.models.LLMProvider import AsyncLLMProvider, CompletionChunk
+from game.models.ResponseSchemas import get_response_schema
+from game.models.RetryPolicy import EmptyResponseError
+from game.models.Telemetry import current_call
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class LlamaCppQueueFullError(openai.APIConnectionError):
+    """
+    Raised when too many requests are already waiting for the local model.
+    It is an APIConnectionError, so the views report it as 503.
+    """
+
+    def __init__(self, model_path: str, max_queue: int):
+        super().__init__(
+            message=f"{max_queue} requests already waiting for {model_path}",
+            request=httpx.Request("POST", f"file://{model_path}"),
+        )
+
+
+@dataclass
+class _Job:
+    ResponseModel: Type[BaseModel]
+    kwargs: dict[str, Any]
+    on_chunk: Optional[Callable[[CompletionChunk], None]]
+    attempt: int
+    future: Future = field(default_factory=Future)
+
+
+class LlamaCppProvider(AsyncLLMProvider):
+    """
+    LLM running in process on llama.cpp, for deployments without an ollama server.
+
+    The model is loaded once per process (LLMModel.shared) and generation is
+    constrained by a grammar derived from the response model's JSON schema.
+    A single worker thread owns the model; requests wait in a bounded queue and
+    are rejected with LlamaCppQueueFullError once it is full.
+    """
+
+    max_queue = int(os.getenv("LLAMA_MAX_QUEUE", "8"))
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or MODEL_PATH
+        self.model = os.path.basename(self.model_path)
+
+        self.jobs: queue.Queue[_Job] = queue.Queue(maxsize=self.max_queue)
+        self.grammars: dict[Type[BaseModel], Any] = {}
+        self.worker: Optional[threading.Thread] = None
+        self.worker_lock = threading.Lock()
+
+    @property
+    def llm_model(self) -> LLMModel:
+        return LLMModel.shared(self.model_path)
+
+    def get_grammar(self, ResponseModel: Type[BaseModel]):
+        """Compile the GBNF grammar of the response model once."""
+        grammar = self.grammars.get(ResponseModel)
+        if grammar is None:
+            from llama_cpp import LlamaGrammar
+
+            grammar = LlamaGrammar.from_json_schema(
+                json.dumps(get_response_schema(ResponseModel).json_schema),
+                verbose=False,
+            )
+            self.grammars[ResponseModel] = grammar
+
+        return grammar
+
+    def start_worker(self):
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self._run_worker, name="llama-cpp-worker", daemon=True
+                )
+                self.worker.start()
+
+    def _run_worker(self):
+        while True:
+            job = self.jobs.get()
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                job.future.set_result(self._generate(job))
+
+            except BaseException as e:
+                job.future.set_exception(e)
+
+    def _generate(self, job: _Job) -> tuple[str, Any, Optional[str]]:
+        """
+        Run one completion on the model.
+        Returns the content, the usage and the finish reason.
+        """
+        llm_model = self.llm_model
+        with llm_model.lock:
+            result = llm_model.get_model().create_chat_completion(
+                grammar=self.get_grammar(job.ResponseModel),
+                stream=job.on_chunk is not None,
+                **job.kwargs,
+            )
+
+            if job.on_chunk is None:
+                choice = result["choices"][0]
+                return (
+                    choice["message"]["content"],
+                    result.get("usage"),
+                    choice.get("finish_reason"),
+                )
+
+            snapshot = ""
+            finish_reason = None
+            for chunk in result:
+                finish_reason = (
+                    chunk["choices"][0].get("finish_reason") or finish_reason
+                )
+                delta = chunk["choices"][0]["delta"].get("content")
+                if not delta:
+                    continue
+
+                snapshot += delta
+                job.on_chunk(
+                    CompletionChunk(delta=delta, snapshot=snapshot, attempt=job.attempt)
+                )
+
+            return snapshot, None, finish_reason
+
+    def resolve_model(self, model: Optional[str]) -> Optional[str]:
+        # There is only the one loaded model
+        return None
+
+    def should_retry(self, error: Exception, retry: int) -> bool:
+        # A full queue will not drain faster by retrying into it
+        if isinstance(error, LlamaCppQueueFullError):
+            return False
+
+        return super().should_retry(error, retry)
+
+    async def _agenerate(
+        self,
+        ResponseModel: Type[T],
+        model: Optional[str],
+        verbose: bool,
+        on_chunk: Optional[Callable[[CompletionChunk], None]],
+        attempt: int,
+        **kwargs,
+    ) -> str:
+        self.start_worker()
+
+        job = _Job(ResponseModel, kwargs, on_chunk, attempt)
+        try:
+            self.jobs.put_nowait(job)
+
+        except queue.Full:
+            raise LlamaCppQueueFullError(self.model_path, self.max_queue)
+
+        content, usage, finish_reason = await asyncio.wrap_future(job.future)
+
+        record = current_call.get()
+        if record is not None:
+            record.add_usage(usage)
+        self.record_finish(finish_reason)
+
+        if verbose:
+            print(content)
+
+        if not content:
+            raise EmptyResponseError()
+
+        return content
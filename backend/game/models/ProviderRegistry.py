@@ -0,0 +1,122 @@
+import os
+import inspect
+import threading
+from typing import Optional, Type, TypeVar, Callable
+
+from game.models.LLMProvider import (
+    LLMProvider,
+    ollama,
+    OpenRouterProvider,
+    MistralAIProvider,
+    Llama_3_3_8B_Instruct,
+)
+from game.models.HedgedProvider import HedgedProvider
+from game.models.LlamaCppProvider import LlamaCppProvider
+from game.models.LLMCache import get_shared_cache
+
+P = TypeVar("P", bound=LLMProvider)
+
+# Provider names accepted by LLM_PRIMARY_PROVIDER and LLM_SECONDARY_PROVIDER
+PROVIDERS: dict[str, Type[LLMProvider]] = {
+    "ollama": ollama,
+    "openrouter": OpenRouterProvider,
+    "mistral": MistralAIProvider,
+    "llama_3_3_8b": Llama_3_3_8B_Instruct,
+    "llama_cpp": LlamaCppProvider,
+}
+
+
+class ProviderRegistry:
+    """
+    Hand out one long-lived provider per (provider class, backend URL, model) per process.
+
+    Providers built on the async OpenAI client keep an httpx connection pool, so sharing
+    them means the TCP/TLS setup to ollama or OpenRouter is paid once per worker instead
+    of once per HTTP request. Shared providers also share the response cache.
+    The registry is reset after a fork.
+    """
+
+    def __init__(self):
+        self._providers: dict[tuple, LLMProvider] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(
+        self,
+        provider_cls: Type[P],
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> P:
+        """
+        Get the shared provider, creating it on first use.
+
+        Args:
+            provider_cls: The provider class, e.g. ollama
+            base_url: The backend URL. None means the provider's default
+            model: The model name. None means the provider's default
+        """
+        kwargs = {}
+        if base_url is not None:
+            kwargs["base_url"] = base_url
+        if model is not None:
+            kwargs["model"] = model
+
+        # e.g. OpenRouterProvider has a fixed backend URL
+        parameters = inspect.signature(provider_cls).parameters
+        for name in kwargs:
+            if name not in parameters:
+                raise ValueError(f"{provider_cls.__name__} does not take a {name}")
+
+        return self._get_or_create(
+            (provider_cls, base_url, model), lambda: provider_cls(**kwargs)
+        )
+
+    def get_hedged(
+        self, primary_cls: Type[LLMProvider], secondary_cls: Type[LLMProvider]
+    ) -> HedgedProvider:
+        """Get the shared hedged provider over the two shared backends."""
+        primary = self.get(primary_cls)
+        secondary = self.get(secondary_cls)
+
+        return self._get_or_create(
+            (HedgedProvider, primary_cls, secondary_cls),
+            lambda: HedgedProvider.from_env(primary, secondary),
+        )
+
+    def _get_or_create(self, key: tuple, factory: Callable[[], P]) -> P:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._providers = {}
+                self._pid = os.getpid()
+
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = factory()
+                provider.cache = get_shared_cache()
+                self._providers[key] = provider
+
+            return provider
+
+    def clear(self):
+        """Forget all shared providers. For testing purposes."""
+        with self._lock:
+            self._providers = {}
+
+
+provider_registry = ProviderRegistry()
+
+
+def get_session_provider() -> LLMProvider:
+    """
+    Get the provider used by game sessions.
+
+    LLM_PRIMARY_PROVIDER picks the backend (ollama by default). When
+    LLM_SECONDARY_PROVIDER is set too, requests are hedged across both.
+    """
+    primary_cls = PROVIDERS[os.getenv("LLM_PRIMARY_PROVIDER", "ollama")]
+
+    secondary_name = os.getenv("LLM_SECONDARY_PROVIDER")
+    if not secondary_name:
+        return provider_registry.get(primary_cls)
+
+    return provider_registry.get_hedged(primary_cls, PROVIDERS[secondary_name])
@@ -0,0 +1,89 @@
+import json
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Type, TypeVar
+
+import openai
+from pydantic import BaseModel, TypeAdapter
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@dataclass(frozen=True)
+class ResponseSchema:
+    """
+    Everything derived from a response model that the providers need per call,
+    computed once. The dicts are shared, never modify them.
+    """
+
+    model: Type[BaseModel]
+
+    # model_json_schema()
+    json_schema: dict[str, Any]
+
+    # The strict json_schema response_format of the OpenAI API
+    response_format: dict[str, Any]
+
+    # Hash of json_schema, stands in for it in cache keys
+    schema_hash: str
+
+    adapter: TypeAdapter
+
+    @classmethod
+    def create(cls, model: Type[BaseModel]) -> "ResponseSchema":
+        json_schema = model.model_json_schema()
+        return cls(
+            model=model,
+            json_schema=json_schema,
+            response_format=strict_response_format(model),
+            schema_hash=hashlib.sha256(
+                json.dumps(json_schema, sort_keys=True).encode("utf-8")
+            ).hexdigest(),
+            adapter=TypeAdapter(model),
+        )
+
+    def validate_json(self, content: str) -> Any:
+        """Validate the raw JSON output into the response model."""
+        return self.adapter.validate_json(content)
+
+
+def strict_response_format(model: Type[BaseModel]) -> dict[str, Any]:
+    """
+    The json_schema response_format of the model, with the strict schema the
+    OpenAI API expects. The function tool helper is the public way to build it.
+    """
+    function = openai.pydantic_function_tool(model)["function"]
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "schema": function["parameters"],
+            "name": function["name"],
+            "strict": True,
+        },
+    }
+
+
+_schemas: dict[Type[BaseModel], ResponseSchema] = {}
+_schemas_lock = threading.Lock()
+
+
+def register_response_model(model: Type[BaseModel]) -> ResponseSchema:
+    """Compute the schema of the response model now, instead of on first use."""
+    schema = ResponseSchema.create(model)
+    with _schemas_lock:
+        _schemas[model] = schema
+
+    return schema
+
+
+def get_response_schema(model: Type[BaseModel]) -> ResponseSchema:
+    """
+    The precomputed schema of the response model. LLMResponseModel subclasses are
+    registered when they are defined, other models on their first use.
+    """
+    schema = _schemas.get(model)
+    if schema is None:
+        schema = register_response_model(model)
+
+    return schema
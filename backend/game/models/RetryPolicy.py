@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import random
+import threading
+import contextvars
+from functools import wraps
+from typing import Optional
+
+import httpx
+import openai
+from pydantic import ValidationError
+
+
+class CircuitOpenError(openai.APIConnectionError):
+    """
+    Raised without calling the backend while its circuit breaker is open.
+    It is an APIConnectionError, so the views report it as 503.
+    """
+
+    def __init__(self, backend: str, retry_after: float):
+        super().__init__(
+            message=f"Circuit breaker open for {backend}, retry in {retry_after:.0f}s",
+            request=httpx.Request("POST", backend),
+        )
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+class EmptyResponseError(ValueError):
+    """The backend answered without any content."""
+
+    def __init__(self):
+        super().__init__("No content in the response")
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Malformed output (bad JSON, failed validation, no content) and transient
+    backend errors (connection errors, timeouts, rate limits, 5xx) are retried.
+    Anything else, including an open circuit or a broken prompt template, fails
+    straight away.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        multiplier: float = 2.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+        )
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before the given retry (0 for the first retry)."""
+        cap = min(self.max_delay, self.base_delay * self.multiplier**retry)
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def is_output_error(error: Exception) -> bool:
+        """The backend answered, but the output is unusable."""
+        return isinstance(
+            error, (json.JSONDecodeError, ValidationError, EmptyResponseError)
+        )
+
+    @staticmethod
+    def is_backend_failure(error: Exception) -> bool:
+        """The backend is down, overloaded or too slow."""
+        if isinstance(error, CircuitOpenError):
+            return False
+
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+            return True
+
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    def should_retry(self, error: Exception, retry: int) -> bool:
+        if retry >= self.max_retries:
+            return False
+
+        return self.is_output_error(error) or self.is_backend_failure(error)
+
+
+class RetryBudget:
+    """
+    Number of retries allowed across all LLM calls of one player turn,
+    so a bad turn cannot multiply the load on a struggling backend.
+    """
+
+    def __init__(self, retries: Optional[int] = None):
+        if retries is None:
+            retries = int(os.getenv("LLM_TURN_RETRY_BUDGET", "4"))
+
+        self.remaining = retries
+        self.lock = threading.Lock()
+
+    def consume(self) -> bool:
+        """Take one retry from the budget. Returns False if it is used up."""
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+
+            self.remaining -= 1
+            return True
+
+
+current_retry_budget: contextvars.ContextVar[Optional[RetryBudget]] = (
+    contextvars.ContextVar("current_retry_budget", default=None)
+)
+
+
+def retry_budget_scope(func):
+    """
+    Give every call of the decorated function (a player turn) its own retry budget.
+    Nested scopes share the outer budget.
+    """
+
+    @wraps(func)
+    def _wrapped(*args, **kwargs):
+        if current_retry_budget.get() is not None:
+            return func(*args, **kwargs)
+
+        token = current_retry_budget.set(RetryBudget())
+        try:
+            return func(*args, **kwargs)
+
+        finally:
+            current_retry_budget.reset(token)
+
+    return _wrapped
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    After failure_threshold consecutive backend failures the circuit opens and
+    calls fail fast with CircuitOpenError. After reset_timeout one trial call is
+    let through (half open); its outcome closes or reopens the circuit. A trial
+    that is cancelled, or never reports back within reset_timeout, reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, backend: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        self.backend = backend
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not reach the backend."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                if now - self.trial_started_at < self.reset_timeout:
+                    raise CircuitOpenError(
+                        self.backend,
+                        self.reset_timeout - (now - self.trial_started_at),
+                    )
+
+                # The trial got lost, let another one through
+                self.trial_started_at = now
+                return
+
+            elapsed = now - self.opened_at
+            if elapsed >= self.reset_timeout:
+                # Let one trial call through
+                self.state = self.HALF_OPEN
+                self.trial_started_at = now
+                return
+
+            raise CircuitOpenError(self.backend, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """The call was cancelled before the backend answered."""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                # Release the trial, the next one comes after reset_timeout
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(backend: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of the backend."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(backend)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                backend,
+                failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "30")),
+            )
+            _circuit_breakers[backend] = breaker
+
+        return breaker
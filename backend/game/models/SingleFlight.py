@@ -0,0 +1,62 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesce identical concurrent calls: the first caller with a key (the leader)
+    starts the work, callers arriving with the same key while it is in flight
+    (followers) await the same result instead of starting it again.
+
+    The work runs in its own task, so it survives the leader being cancelled as long
+    as somebody is still waiting for it. Only used from the provider loop.
+    """
+
+    def __init__(self):
+        self.flights: dict[str, _Flight] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Run work, or join the identical call already in flight.
+
+        Returns:
+            The result, and whether it was shared from another caller's flight.
+        """
+        flight = self.flights.get(key)
+        shared = flight is not None
+
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(work()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+
+        # Counted on the flight, which outlives its entry in flights
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+
+        finally:
+            flight.waiters -= 1
+            # Nobody wants the result anymore (e.g. every caller was cancelled)
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _land(self, key: str, flight: _Flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def __len__(self):
+        return len(self.flights)
@@ -0,0 +1,185 @@
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from game.models.LLMProvider import get_provider_loop
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskNode:
+    name: str
+    work: Callable[..., Awaitable[Any]]
+    deps: tuple[str, ...]
+
+    # Started before it is known whether its result is needed
+    speculative: bool = False
+    discarded: bool = False
+
+    future: Optional[Future] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    # Duration of the longest chain of dependencies ending with this node
+    path_ms: float = 0.0
+
+
+@dataclass
+class TaskGraph:
+    """
+    Runs the LLM calls of one turn concurrently on the provider loop, each as soon
+    as the calls it depends on are done. The caller only blocks where it needs a
+    result (result), and drops speculative calls it turns out not to need (discard).
+
+    Calls see the context variables (telemetry session, retry budget) of the
+    thread that started the graph.
+    """
+
+    name: str = "turn"
+    nodes: dict[str, TaskNode] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def add(
+        self,
+        name: str,
+        work: Callable[..., Awaitable[Any]],
+        deps: tuple[str, ...] = (),
+        speculative: bool = False,
+    ) -> "TaskGraph":
+        """
+        Add a call and start it. work is called with the results of deps, in order.
+        """
+        for dep in deps:
+            if dep not in self.nodes:
+                raise ValueError(f"{name} depends on unknown task {dep}")
+
+        node = TaskNode(name, work, tuple(deps), speculative)
+        self.nodes[name] = node
+
+        context = contextvars.copy_context()
+        node.future = get_provider_loop().submit(self._run(node, context))
+        return self
+
+    async def _run(self, node: TaskNode, context: contextvars.Context) -> Any:
+        # The task runs in its own copy of the loop's context, fill it with the caller's
+        for var, value in context.items():
+            var.set(value)
+
+        args = []
+        path_ms = 0.0
+        for dep in node.deps:
+            dep_node = self.nodes[dep]
+            args.append(await asyncio.wrap_future(dep_node.future))
+            path_ms = max(path_ms, dep_node.path_ms)
+
+        node.started_at = time.monotonic()
+        try:
+            return await node.work(*args)
+
+        finally:
+            node.finished_at = time.monotonic()
+            node.path_ms = path_ms + (node.finished_at - node.started_at) * 1000
+
+    def result(self, name: str) -> Any:
+        """Block until the call is done and return its result."""
+        return self.nodes[name].future.result()
+
+    def discard(self, name: str):
+        """The result of the speculative call is not needed, cancel it if it still runs."""
+        node = self.nodes[name]
+        node.discarded = True
+        node.future.cancel()
+
+    def timing(self) -> dict[str, Any]:
+        """
+        Critical path (the longest chain of dependent calls that were used) against
+        the time the same calls would take one after another.
+        """
+        used = [
+            node
+            for node in self.nodes.values()
+            if not node.discarded and node.finished_at is not None
+        ]
+        return {
+            "critical_path_ms": max((node.path_ms for node in used), default=0.0),
+            "serial_ms": sum(
+                (node.finished_at - node.started_at) * 1000 for node in used
+            ),
+            "wall_ms": (time.monotonic() - self.started_at) * 1000,
+            "discarded": [node.name for node in self.nodes.values() if node.discarded],
+        }
+
+    def close(self):
+        """Cancel what is still running and log the timing of the turn."""
+        for node in self.nodes.values():
+            if not node.future.done():
+                node.discarded = True
+                node.future.cancel()
+
+        timing = self.timing()
+        logger.info(
+            f"{self.name}: critical path {timing['critical_path_ms']:.0f}ms, "
+            f"serial {timing['serial_ms']:.0f}ms, "
+            f"discarded {', '.join(timing['discarded']) or 'nothing'}"
+        )
+        return timing
+
+    def __enter__(self) -> "TaskGraph":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SpeculationStats:
+    """
+    Cost against latency of speculative calls: how often a speculation was used,
+    how many calls it added and how much waiting it saved.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.extra_calls = 0
+        self.saved_ms = 0.0
+
+    def record(self, hit: bool, extra_calls: int, saved_ms: float = 0.0):
+        with self.lock:
+            self.attempts += 1
+            self.hits += hit
+            self.extra_calls += extra_calls
+            self.saved_ms += saved_ms
+
+    def summary(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "attempts": self.attempts,
+                "hit_rate": self.hits / self.attempts if self.attempts else None,
+                "extra_calls_per_attempt": (
+                    self.extra_calls / self.attempts if self.attempts else None
+                ),
+                "saved_ms_per_attempt": (
+                    self.saved_ms / self.attempts if self.attempts else None
+                ),
+            }
+
+
+# Process-wide, per kind of speculation
+speculation_stats: dict[str, SpeculationStats] = {}
+_speculation_stats_lock = threading.Lock()
+
+
+def get_speculation_stats(kind: str) -> SpeculationStats:
+    with _speculation_stats_lock:
+        stats = speculation_stats.get(kind)
+        if stats is None:
+            stats = speculation_stats[kind] = SpeculationStats()
+
+        return stats
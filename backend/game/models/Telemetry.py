@@ -0,0 +1,366 @@
+import os
+import json
+import time
+import queue
+import atexit
+import bisect
+import sqlite3
+import threading
+import contextvars
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Any
+
+
+@dataclass
+class LLMCallRecord:
+    """Cost of one LLM request, from the caller's point of view."""
+
+    request_type: str = "unknown"
+    session: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Size of the rendered prompt before it was sent, see estimate_tokens
+    estimated_prompt_tokens: int = 0
+    latency_ms: float = 0.0
+
+    # Attempts beyond the first, outputs that failed validation and were repaired
+    retries: int = 0
+    validation_failures: int = 0
+    repairs: int = 0
+    # Attempts cut off by max_tokens
+    truncations: int = 0
+
+    cached: bool = False
+    # Shared the result of an identical request already in flight
+    coalesced: bool = False
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def add_usage(self, usage: Any):
+        """
+        Add the token usage reported by the backend, either an OpenAI usage object
+        or the dict returned by llama.cpp.
+        """
+        if usage is None:
+            return
+
+        if isinstance(usage, dict):
+            self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            self.completion_tokens += usage.get("completion_tokens", 0) or 0
+            return
+
+        self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+class Histogram:
+    """
+    Fixed bucket histogram. Cheap enough to update on every call and good enough
+    for percentiles in a dashboard.
+    """
+
+    def __init__(self, buckets: list[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile (0 to 1)."""
+        if self.count == 0:
+            return None
+
+        target = percentile * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count > 0:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2000, 4000, 8000, 15000, 30000, 60000]
+TOKEN_BUCKETS = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+
+class RequestTypeStats:
+    """Aggregates of every call of one request type."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.validation_failures = 0
+        self.repairs = 0
+        self.truncations = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.estimated_prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+
+    def add(self, record: LLMCallRecord):
+        self.calls += 1
+        self.errors += record.error is not None
+        self.cache_hits += record.cached
+        self.coalesced += record.coalesced
+        self.retries += record.retries
+        self.validation_failures += record.validation_failures
+        self.repairs += record.repairs
+        self.truncations += record.truncations
+        self.latency_ms.observe(record.latency_ms)
+        self.estimated_prompt_tokens.observe(record.estimated_prompt_tokens)
+
+        # Cache hits and coalesced calls cost no tokens, they would only skew the
+        # token histograms
+        if not (record.cached or record.coalesced):
+            self.prompt_tokens.observe(record.prompt_tokens)
+            self.completion_tokens.observe(record.completion_tokens)
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "validation_failures": self.validation_failures,
+            "repairs": self.repairs,
+            "truncations": self.truncations,
+            "latency_ms": self.latency_ms.summary(),
+            "prompt_tokens": self.prompt_tokens.summary(),
+            "estimated_prompt_tokens": self.estimated_prompt_tokens.summary(),
+            "completion_tokens": self.completion_tokens.summary(),
+        }
+
+
+class TelemetrySink(ABC):
+    """Somewhere to persist call records."""
+
+    @abstractmethod
+    def write(self, record: LLMCallRecord):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlSink(TelemetrySink):
+    """Append one JSON line per call."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, record: LLMCallRecord):
+        line = json.dumps(asdict(record))
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class SQLiteSink(TelemetrySink):
+    """Insert one row per call into the llm_calls table."""
+
+    # Column name and SQLite type
+    columns = {
+        "timestamp": "REAL",
+        "request_type": "TEXT",
+        "session": "TEXT",
+        "provider": "TEXT",
+        "model": "TEXT",
+        "prompt_tokens": "INTEGER",
+        "completion_tokens": "INTEGER",
+        "estimated_prompt_tokens": "INTEGER",
+        "latency_ms": "REAL",
+        "retries": "INTEGER",
+        "validation_failures": "INTEGER",
+        "repairs": "INTEGER",
+        "truncations": "INTEGER",
+        "cached": "INTEGER",
+        "coalesced": "INTEGER",
+        "error": "TEXT",
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_calls ("
+            + ", ".join(
+                f"{name} {column_type}" for name, column_type in self.columns.items()
+            )
+            + ")"
+        )
+        self.migrate()
+        self.connection.commit()
+
+    def migrate(self):
+        """Add the columns a table created by an older version is missing."""
+        existing = {
+            row[1] for row in self.connection.execute("PRAGMA table_info(llm_calls)")
+        }
+        for name, column_type in self.columns.items():
+            if name not in existing:
+                self.connection.execute(
+                    f"ALTER TABLE llm_calls ADD COLUMN {name} {column_type}"
+                )
+
+    def write(self, record: LLMCallRecord):
+        row = asdict(record)
+        with self.lock:
+            self.connection.execute(
+                f"INSERT INTO llm_calls ({', '.join(self.columns)}) "
+                f"VALUES ({', '.join('?' * len(self.columns))})",
+                [row[column] for column in self.columns],
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class Telemetry:
+    """
+    Collects a record of every LLM call, aggregates it per request type in memory
+    and forwards it to the configured sinks. The sinks are written from a thread
+    of their own, records mostly come from the provider loop.
+    """
+
+    def __init__(self, sinks: Optional[list[TelemetrySink]] = None):
+        self.sinks: list[TelemetrySink] = sinks or []
+        self.by_request_type: dict[str, RequestTypeStats] = {}
+        self.lock = threading.Lock()
+
+        self.queue: queue.Queue[LLMCallRecord] = queue.Queue()
+        self.writer: Optional[threading.Thread] = None
+
+    def add_sink(self, sink: TelemetrySink):
+        self.sinks.append(sink)
+
+    def record(self, record: LLMCallRecord):
+        with self.lock:
+            stats = self.by_request_type.get(record.request_type)
+            if stats is None:
+                stats = self.by_request_type[record.request_type] = RequestTypeStats()
+            stats.add(record)
+
+            if self.sinks and (self.writer is None or not self.writer.is_alive()):
+                self.writer = threading.Thread(
+                    target=self._run_writer, name="telemetry-writer", daemon=True
+                )
+                self.writer.start()
+
+        if self.sinks:
+            self.queue.put(record)
+
+    def _run_writer(self):
+        while True:
+            record = self.queue.get()
+            for sink in self.sinks:
+                try:
+                    sink.write(record)
+
+                except Exception as e:
+                    # Telemetry must never break a game turn
+                    print(f"Failed to write telemetry to {type(sink).__name__}: {e}")
+
+            self.queue.task_done()
+
+    def flush(self):
+        """Wait until the sinks have written every record so far."""
+        self.queue.join()
+
+    def summary(self) -> dict[str, dict]:
+        """Aggregates per request type."""
+        with self.lock:
+            return {
+                request_type: stats.summary()
+                for request_type, stats in sorted(self.by_request_type.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.by_request_type = {}
+
+
+# The game session the current LLM calls belong to
+current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_session", default=None
+)
+
+# The record of the LLM call being made, updated along the way by the provider
+current_call: contextvars.ContextVar[Optional[LLMCallRecord]] = contextvars.ContextVar(
+    "current_call", default=None
+)
+
+
+@contextmanager
+def telemetry_session(session: Any):
+    """Tag the LLM calls made inside the block with the game session."""
+    token = current_session.set(None if session is None else str(session))
+    try:
+        yield
+
+    finally:
+        current_session.reset(token)
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_pid: Optional[int] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Get the process-wide telemetry, creating it on first use.
+    LLM_TELEMETRY_JSONL and LLM_TELEMETRY_SQLITE add the matching sink.
+    The telemetry is recreated after a fork, since SQLite connections do not survive it.
+    """
+    global _telemetry, _telemetry_pid
+
+    with _telemetry_lock:
+        if _telemetry is None or _telemetry_pid != os.getpid():
+            _telemetry = Telemetry()
+            _telemetry_pid = os.getpid()
+
+            jsonl_path = os.getenv("LLM_TELEMETRY_JSONL")
+            if jsonl_path:
+                _telemetry.add_sink(JsonlSink(jsonl_path))
+
+            sqlite_path = os.getenv("LLM_TELEMETRY_SQLITE")
+            if sqlite_path:
+                _telemetry.add_sink(SQLiteSink(sqlite_path))
+
+            atexit.register(_telemetry.flush)
+
+        return _telemetry
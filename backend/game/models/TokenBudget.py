@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import time
+import atexit
+import threading
+from collections import deque
+from typing import Optional
+
+from game.Const import TOKEN_BUDGETS_PATH
+
+
+class RequestTypeBudget:
+    """Recent completion lengths of one request type and its widened minimum."""
+
+    def __init__(self, window: int, samples: Optional[list[int]] = None, floor=0):
+        self.samples: deque[int] = deque(samples or [], maxlen=window)
+        self.floor: int = floor
+
+        # The hardcoded max_tokens of the request, the last time it asked
+        self.default: Optional[int] = None
+
+        # Samples observed since the floor was last raised
+        self.since_widened = 0
+
+    def percentile(self, percentile: float) -> int:
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+    def to_dict(self) -> dict:
+        return {"samples": list(self.samples), "floor": self.floor}
+
+
+class TokenBudgets:
+    """
+    max_tokens per request type, learned from the completion lengths the backend
+    reports.
+
+    Once a request type has min_samples observations its budget is the given
+    percentile of the recent lengths plus a margin, instead of the hardcoded
+    max_tokens of the request, which only serves as the starting point and to
+    bound the learned budget (between min_tokens and max_factor times it).
+    A completion cut off by max_tokens raises the budget of its type by
+    widen_factor, for the retry and for the calls after it.
+
+    The observations are saved to a JSON file, so the budgets survive restarts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        percentile: float = 95,
+        margin: float = 0.25,
+        min_samples: int = 20,
+        window: int = 500,
+        widen_factor: float = 1.5,
+        min_tokens: int = 16,
+        max_factor: float = 4,
+        save_interval: float = 30,
+    ):
+        self.path = path
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.window = window
+        self.widen_factor = widen_factor
+        self.min_tokens = min_tokens
+        self.max_factor = max_factor
+        self.save_interval = save_interval
+
+        self.types: dict[str, RequestTypeBudget] = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.last_save = 0.0
+
+        if path is not None:
+            self.load()
+
+    def get_type(self, request_type: str) -> RequestTypeBudget:
+        budget = self.types.get(request_type)
+        if budget is None:
+            budget = self.types[request_type] = RequestTypeBudget(self.window)
+
+        return budget
+
+    def budget(self, request_type: str, default: int) -> int:
+        """The max_tokens to use for the request type, default is its hardcoded value."""
+        with self.lock:
+            budget = self.get_type(request_type)
+            budget.default = default
+
+            tokens = default
+            if len(budget.samples) >= self.min_samples:
+                learned = budget.percentile(self.percentile) * (1 + self.margin)
+                tokens = math.ceil(learned)
+
+            tokens = max(tokens, budget.floor, self.min_tokens)
+            return min(tokens, self.max_tokens(budget, default))
+
+    def max_tokens(self, budget: RequestTypeBudget, default: int) -> int:
+        return math.ceil((budget.default or default) * self.max_factor)
+
+    def observe(self, request_type: str, completion_tokens: int):
+        """Record the length of a completion that was not cut off."""
+        if completion_tokens <= 0:
+            return
+
+        with self.lock:
+            budget = self.get_type(request_type)
+            budget.samples.append(completion_tokens)
+
+            # Enough lengths since the last truncation to trust the percentile again
+            budget.since_widened += 1
+            if budget.floor and budget.since_widened >= self.min_samples:
+                budget.floor = 0
+
+            self.dirty = True
+
+        self.save(force=False)
+
+    def widen(self, request_type: str, max_tokens: int) -> int:
+        """
+        A completion was cut off at max_tokens: raise the budget of the type.
+        Returns the max_tokens for the retry.
+        """
+        with self.lock:
+            budget = self.get_type(request_type)
+            widened = math.ceil(max_tokens * self.widen_factor)
+            budget.floor = min(
+                max(budget.floor, widened), self.max_tokens(budget, max_tokens)
+            )
+            budget.since_widened = 0
+
+            # The output needed more than max_tokens, count it as at least widened
+            budget.samples.append(widened)
+
+            self.dirty = True
+            tokens = budget.floor
+
+        self.save(force=False)
+        return tokens
+
+    def summary(self) -> dict[str, dict]:
+        with self.lock:
+            return {
+                request_type: {
+                    "samples": len(budget.samples),
+                    "percentile": (
+                        budget.percentile(self.percentile) if budget.samples else None
+                    ),
+                    "floor": budget.floor,
+                }
+                for request_type, budget in self.types.items()
+            }
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+
+        except (OSError, ValueError):
+            return
+
+        for request_type, entry in data.items():
+            self.types[request_type] = RequestTypeBudget(
+                self.window, entry.get("samples"), entry.get("floor", 0)
+            )
+
+    def save(self, force: bool = True):
+        """
+        Write the observations to path. Throttled to save_interval unless forced.
+        The throttled saves come from the provider loop, they write from a thread
+        of their own.
+        """
+        if self.path is None:
+            return
+
+        with self.lock:
+            if not self.dirty:
+                return
+
+            if not force and time.time() - self.last_save < self.save_interval:
+                return
+
+            data = {
+                request_type: budget.to_dict()
+                for request_type, budget in self.types.items()
+            }
+            self.dirty = False
+            self.last_save = time.time()
+
+        if force:
+            self.write(data)
+        else:
+            threading.Thread(
+                target=self.write, args=(data,), name="token-budgets-save", daemon=True
+            ).start()
+
+    def write(self, data: dict):
+        # Replace the file in one go, so a crash never leaves half of it behind
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self.write_lock:
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+
+                os.replace(tmp_path, self.path)
+
+            except OSError:
+                pass
+
+
+_token_budgets: Optional[TokenBudgets] = None
+_token_budgets_pid: Optional[int] = None
+_token_budgets_lock = threading.Lock()
+
+
+def get_token_budgets() -> Optional[TokenBudgets]:
+    """
+    Get the process-wide token budgets configured from the environment.
+    Returns None unless LLM_TOKEN_BUDGETS_ENABLED is set.
+    """
+    global _token_budgets, _token_budgets_pid
+
+    if os.getenv("LLM_TOKEN_BUDGETS_ENABLED", "0").lower() not in ("true", "1", "t"):
+        return None
+
+    with _token_budgets_lock:
+        if _token_budgets is None or _token_budgets_pid != os.getpid():
+            _token_budgets_pid = os.getpid()
+            _token_budgets = TokenBudgets(
+                path=TOKEN_BUDGETS_PATH or None,
+                percentile=float(os.getenv("LLM_TOKEN_BUDGET_PERCENTILE", "95")),
+                margin=float(os.getenv("LLM_TOKEN_BUDGET_MARGIN", "0.25")),
+                min_samples=int(os.getenv("LLM_TOKEN_BUDGET_MIN_SAMPLES", "20")),
+            )
+            atexit.register(_token_budgets.save)
+
+        return _token_budgets
@@ -0,0 +1,69 @@
+import json
+import asyncio
+from typing import Any, Callable, Optional, Union
+
+from pydantic import BaseModel
+
+from game.models.LLMProvider import AsyncLLMProvider, CompletionChunk
+from game.models.RetryPolicy import RetryPolicy
+
+# What the fake answers for a response model: the content (a dict is dumped as
+# JSON), an exception to raise, or a function of the request kwargs returning either
+Answer = Union[str, dict, BaseException, Callable[[dict], Any]]
+
+
+class FakeProvider(AsyncLLMProvider):
+    """
+        Provider answering from a table keyed by the response model's name, after
+        delay seconds. Each answer is either used for every call, or a list consumed
+        one attempt at a time. Every attempt is kept in calls. Streamed requests get
+    the content in chunks of chunk_size characters.
+    """
+
+    retry_policy = RetryPolicy(max_retries=2, base_delay=0, max_delay=0)
+
+    def __init__(
+        self,
+        answers: Optional[dict[str, Union[Answer, list[Answer]]]] = None,
+        delay: float = 0.0,
+        model: str = "fake",
+        chunk_size: int = 8,
+    ):
+        # Lists are consumed, every provider gets its own
+        self.answers = {
+            name: list(answer) if isinstance(answer, list) else answer
+            for name, answer in (answers or {}).items()
+        }
+        self.delay = delay
+        self.model = model
+        self.chunk_size = chunk_size
+        self.calls: list[dict[str, Any]] = []
+
+    async def _agenerate(
+        self, ResponseModel, model, verbose, on_chunk, attempt, **kwargs
+    ) -> str:
+        self.calls.append({"ResponseModel": ResponseModel, **kwargs})
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        answer = self.answers[ResponseModel.__name__]
+        if isinstance(answer, list):
+            answer = answer.pop(0) if len(answer) > 1 else answer[0]
+
+        if callable(answer):
+            answer = answer(kwargs)
+
+        if isinstance(answer, BaseException):
+            raise answer
+
+        content = answer if isinstance(answer, str) else json.dumps(answer)
+        if on_chunk is not None:
+            for start in range(0, len(content), self.chunk_size):
+                delta = content[start : start + self.chunk_size]
+                snapshot = content[: start + self.chunk_size]
+                on_chunk(CompletionChunk(delta, snapshot, attempt=attempt))
+
+        return content
+
+    def calls_of(self, ResponseModel: type[BaseModel]) -> list[dict[str, Any]]:
+        return [call for call in self.calls if call["ResponseModel"] is ResponseModel]
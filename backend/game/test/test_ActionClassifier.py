@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import patch
+
+from game.classes.EntityClasses import Player
+from game.classes.NonCombatFloor import (
+    HandleUserInputError,
+    HandleUserInputSuggestedAction,
+    NonCombatFloor,
+)
+from game.classes.NonCombatFloorType import NonCombatFloorType
+from game.llm_api.ClassifyAndCheckRequest import ClassifyAndCheckResponseModel
+from game.models.ActionClassifier import (
+    ActionClassifier,
+    LocalClassification,
+    get_action_classifier,
+)
+from game.models.LLMCache import LLMCache
+
+from .fakes import FakeProvider
+
+SUGGESTED_ACTIONS = ["Open the chest", "Look around"]
+CONTEXT = ["A dark room. A wooden chest stands in the corner."]
+
+INTRO = {
+    "description": "A dark room.",
+    "investigation_hook": "A wooden chest stands in the corner.",
+    "suggested_actions": SUGGESTED_ACTIONS,
+    "summary": "A dark room with a wooden chest",
+}
+
+
+class ActionClassifierTest(unittest.TestCase):
+    def setUp(self):
+        self.classifier = ActionClassifier(min_samples=10)
+
+    def classify(self, user_input: str):
+        return self.classifier.classify(user_input, SUGGESTED_ACTIONS, CONTEXT)
+
+    def test_fuzzy_match(self):
+        local = self.classify("open the chest!!")
+        self.assertEqual((local.action_type, local.source), ("ability_check", "fuzzy"))
+
+    def test_skip_floor_rule(self):
+        local = self.classify("go to the next floor")
+        self.assertEqual((local.action_type, local.source), ("skip_floor", "rule"))
+
+    def test_check_verb_rule(self):
+        local = self.classify("search the wooden chest")
+        self.assertEqual((local.action_type, local.source), ("ability_check", "rule"))
+
+    def test_left_to_the_llm(self):
+        # Not mentioned by the floor, or several actions at once
+        self.assertIsNone(self.classify("search the spaceship"))
+        self.assertIsNone(self.classify("search the chest and then run away"))
+
+    def test_model_learns_from_observations(self):
+        self.assertIsNone(self.classify("whistle at the chest"))
+
+        for i in range(10):
+            self.classifier.observe(f"whistle at the chest {i}", "ability_check", True)
+
+        local = self.classify("whistle at the chest")
+        self.assertEqual((local.action_type, local.source), ("ability_check", "model"))
+
+    def test_can_skip_llm(self):
+        self.assertTrue(
+            self.classifier.can_skip_llm(LocalClassification("skip_floor", 1, "rule"))
+        )
+        self.assertTrue(
+            self.classifier.can_skip_llm(
+                LocalClassification("ability_check", 1, "fuzzy")
+            )
+        )
+        # The LLM still judges whether the check is consistent with the narrative
+        check = LocalClassification("ability_check", 1, "rule")
+        self.assertFalse(self.classifier.can_skip_llm(check))
+
+        self.classifier.trust_checks = True
+        self.assertTrue(self.classifier.can_skip_llm(check))
+
+    def test_disabled_by_default(self):
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertIsNone(get_action_classifier())
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class HandleUserInputTest(unittest.TestCase):
+    def setUp(self):
+        self.classifier = ActionClassifier(audit_rate=0)
+        patcher = patch(
+            "game.classes.NonCombatFloor.get_action_classifier",
+            return_value=self.classifier,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # The LLM finds every action inconsistent with the narrative
+        self.provider = FakeProvider(
+            {
+                "NonCombatFloorIntroResponseModel": INTRO,
+                "ClassifyAndCheckResponseModel": {
+                    "action_type": "ability_check",
+                    "narrative_consistency": False,
+                    "attribute": "dexterity",
+                    "difficulty_class": 3,
+                },
+                "AbilityCheckResponseModel": {
+                    "attribute": "dexterity",
+                    "difficulty_class": 3,
+                },
+                "AbilityCheckResolutionWithSuggestionsResponseModel": {
+                    "narrative": "The lid creaks open.",
+                    "health_change": 0,
+                    "summary": "Opened the chest",
+                    "suggested_actions": ["Take the coins", "Close the lid"],
+                },
+            }
+        )
+        self.provider.cache = LLMCache()
+
+    def play(self, user_input: str):
+        player = Player.create_start_player_with_random_stats("Tester", "A tester")
+        floor = NonCombatFloor("crypt", player, self.provider).reload()
+        floor.init_floor(NonCombatFloorType.TREASURE)
+
+        # A roll of 5 against DC 3, a success
+        with patch("game.classes.NonCombatFloor.random.randint", return_value=5):
+            return floor.handle_user_input(user_input, SUGGESTED_ACTIONS, verbose=False)
+
+    def classify_calls(self):
+        return len(self.provider.calls_of(ClassifyAndCheckResponseModel))
+
+    def test_local_check_still_judged_by_llm(self):
+        response = self.play("search the wooden chest")
+
+        self.assertEqual(self.classify_calls(), 1)
+        self.assertIsInstance(response, HandleUserInputError)
+        self.assertIn("not consistent with the narrative", response.error_message)
+
+    def test_trusted_local_check_skips_llm(self):
+        self.classifier.trust_checks = True
+        response = self.play("search the wooden chest")
+
+        self.assertEqual(self.classify_calls(), 0)
+        self.assertIsInstance(response, HandleUserInputSuggestedAction)
+        self.assertEqual(
+            response.suggested_actions, ["Take the coins", "Close the lid"]
+        )
+        self.assertIn(
+            {"role": "Narrator", "content": "The lid creaks open."}, response.messages
+        )
+
+    def test_observes_fresh_answers_only(self):
+        with patch.object(self.classifier, "observe") as observe:
+            self.play("I sneak past the chest")
+            # The same request again is a cache hit
+            self.play("I sneak past the chest")
+
+        self.assertEqual(self.classify_calls(), 1)
+        observe.assert_called_once()
+        self.assertEqual(observe.call_args.args[1:3], ("ability_check", False))
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from game.classes.EntityClasses import Player
+from game.classes.NonCombatFloor import NonCombatFloor
+from game.classes.NonCombatFloorType import NonCombatFloorType
+from game.llm_api.NonCombatFloorIntroRequest import NonCombatFloorIntroResponseModel
+from game.models.ContentStore import ContentStore
+
+from .fakes import FakeProvider
+
+INTRO = {
+    "description": "A dusty vault.",
+    "investigation_hook": "Something glitters.",
+    "suggested_actions": ["Look around"],
+    "summary": "A vault",
+}
+
+
+class ContentStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "content_store.sqlite3")
+
+        self.store = ContentStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def put_intro(
+        self,
+        theme: str,
+        floor_type: NonCombatFloorType,
+        variant: int,
+        player_description: str = "A tester",
+    ):
+        key = ContentStore.make_key(
+            theme, floor_type.value, "intro", player_description, variant
+        )
+        self.store.put(
+            key,
+            theme,
+            floor_type.value,
+            "intro",
+            player_description,
+            variant,
+            NonCombatFloorIntroResponseModel(**INTRO),
+        )
+        return key
+
+    def test_put_and_find(self):
+        key = self.put_intro("crypt", NonCombatFloorType.TREASURE, 0)
+        self.put_intro("crypt", NonCombatFloorType.TREASURE, 1)
+        self.put_intro("forest", NonCombatFloorType.TREASURE, 0)
+
+        self.assertTrue(self.store.has(key))
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(
+            self.store.get(key, NonCombatFloorIntroResponseModel).summary, "A vault"
+        )
+
+        found = self.store.find(
+            "crypt",
+            NonCombatFloorType.TREASURE.value,
+            "intro",
+            "A tester",
+            NonCombatFloorIntroResponseModel,
+        )
+        self.assertEqual(len(found), 2)
+
+    def request_intro(self, provider: FakeProvider, player_description: str):
+        floor = NonCombatFloor(
+            "crypt",
+            Player.create_start_player_with_random_stats("Tester", player_description),
+            provider,
+        )
+
+        with patch.dict("os.environ", {"CONTENT_STORE_ENABLED": "1"}), patch(
+            "game.models.ContentStore.CONTENT_STORE_PATH", self.path
+        ), patch("game.models.ContentStore._content_store", None):
+            return floor.request_floor_intro(NonCombatFloorType.TREASURE)
+
+    def test_floor_uses_stored_intro(self):
+        self.put_intro("crypt", NonCombatFloorType.TREASURE, 0)
+        provider = FakeProvider()
+
+        intro = self.request_intro(provider, "A tester")
+
+        self.assertEqual(intro.description, "A dusty vault.")
+        # Served from the store, not generated
+        self.assertEqual(provider.calls, [])
+
+    def test_intro_of_another_player_is_not_used(self):
+        self.put_intro("crypt", NonCombatFloorType.TREASURE, 0)
+        provider = FakeProvider(
+            {
+                "NonCombatFloorIntroResponseModel": {
+                    **INTRO,
+                    "description": "A vault built for a knight.",
+                }
+            }
+        )
+
+        intro = self.request_intro(provider, "A knight in shining armour")
+
+        self.assertEqual(intro.description, "A vault built for a knight.")
+        self.assertEqual(len(provider.calls), 1)
+        self.assertIn(
+            "A knight in shining armour", provider.calls[0]["messages"][1]["content"]
+        )
+
+    def test_disabled_by_default(self):
+        floor = NonCombatFloor(
+            "crypt",
+            Player.create_start_player_with_random_stats("Tester", "A tester"),
+            FakeProvider(),
+        )
+        with patch.dict("os.environ", {"CONTENT_STORE_ENABLED": "0"}):
+            self.assertIsNone(floor.stored_floor_intro(NonCombatFloorType.TREASURE))
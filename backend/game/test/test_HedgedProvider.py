@@ -0,0 +1,85 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from game.models.HedgedProvider import HedgedProvider, LatencyTracker
+from game.models.LLMProvider import get_provider_loop
+
+from .fakes import FakeProvider
+
+
+class Answer(BaseModel):
+    text: str
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class HedgedProviderTest(unittest.TestCase):
+    def test_fast_primary_wins(self):
+        primary = FakeProvider({"Answer": {"text": "primary"}})
+        secondary = FakeProvider({"Answer": {"text": "secondary"}})
+        hedged = HedgedProvider(primary, secondary, default_delay=1.0)
+
+        self.assertEqual(hedged.get_completion(Answer).text, "primary")
+        self.assertEqual(secondary.calls, [])
+        self.assertEqual(len(hedged.latency), 1)
+
+    def test_slow_primary_is_hedged(self):
+        primary = FakeProvider({"Answer": {"text": "primary"}}, delay=0.5)
+        secondary = FakeProvider({"Answer": {"text": "secondary"}})
+        hedged = HedgedProvider(primary, secondary, default_delay=0.05)
+
+        self.assertEqual(hedged.get_completion(Answer).text, "secondary")
+        self.assertEqual(hedged.stats["hedged"], 1)
+        self.assertEqual(hedged.stats["secondary_wins"], 1)
+
+        # The cancelled primary counts with the time it had already taken
+        time.sleep(0.05)
+        self.assertEqual(len(hedged.latency), 1)
+        self.assertGreaterEqual(hedged.latency.percentile(0.5), 0.05)
+
+    def test_cancelled_during_hedge_delay(self):
+        primary = FakeProvider({"Answer": {"text": "primary"}}, delay=1.0)
+        secondary = FakeProvider({"Answer": {"text": "secondary"}})
+        hedged = HedgedProvider(primary, secondary, default_delay=5.0)
+
+        # e.g. a discarded speculation
+        future = get_provider_loop().submit(hedged.aget_completion(Answer))
+        time.sleep(0.1)
+        future.cancel()
+        time.sleep(0.1)
+
+        # The primary is cancelled with the caller, not left running
+        self.assertEqual(primary.in_flight, 0)
+        self.assertEqual(len(hedged.latency), 1)
+        self.assertEqual(secondary.calls, [])
+
+    def test_single_attempt_on_primary(self):
+        primary = FakeProvider({"Answer": {"text": "primary"}})
+        hedged = HedgedProvider(primary, FakeProvider())
+
+        content = get_provider_loop().run(
+            hedged._agenerate(Answer, None, False, None, 0)
+        )
+        self.assertEqual(content, '{"text": "primary"}')
+
+    def test_failed_primary_fails_over(self):
+        primary = FakeProvider({"Answer": ValueError("bad output")})
+        secondary = FakeProvider({"Answer": {"text": "secondary"}})
+        hedged = HedgedProvider(primary, secondary, default_delay=1.0)
+
+        self.assertEqual(hedged.get_completion(Answer).text, "secondary")
+        self.assertEqual(hedged.stats["failovers"], 1)
+
+
+class LatencyTrackerTest(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker()
+        self.assertIsNone(tracker.percentile(0.95))
+
+        for latency in range(1, 101):
+            tracker.record(latency / 100)
+
+        self.assertEqual(tracker.percentile(0.5), 0.51)
+        self.assertEqual(tracker.percentile(1.0), 1.0)
@@ -0,0 +1,102 @@
+import json
+import unittest
+from typing import Annotated, Optional
+
+from pydantic import BaseModel, Field
+
+from game.llm_api.AbilityCheckRequest import AbilityCheckResponseModel
+from game.llm_api.ClassifyAndCheckRequest import ClassifyAndCheckResponseModel
+from game.models.JsonRepair import parse_json_tolerant, repair_response
+
+
+class Scores(BaseModel):
+    score: Optional[Annotated[int, Field(ge=0, le=10)]] = None
+    tags: list[str] = Field(default_factory=list, max_length=2)
+
+
+class ParseJsonTolerantTest(unittest.TestCase):
+    def test_code_fence(self):
+        data, fixes = parse_json_tolerant('```json\n{"a": 1}\n```')
+        self.assertEqual(data, {"a": 1})
+        self.assertEqual(fixes, ["stripped code fence"])
+
+    def test_leading_text(self):
+        data, fixes = parse_json_tolerant('Sure! {"a": 1}')
+        self.assertEqual(data, {"a": 1})
+        self.assertEqual(fixes, ["stripped leading text"])
+
+    def test_trailing_text(self):
+        data, fixes = parse_json_tolerant('{"a": 1} I hope this helps')
+        self.assertEqual(data, {"a": 1})
+        self.assertEqual(fixes, ["dropped trailing text"])
+
+    def test_truncated(self):
+        data, fixes = parse_json_tolerant('{"a": 1, "b": "unfinish')
+        self.assertEqual(data, {"a": 1, "b": "unfinish"})
+        self.assertEqual(fixes, ["closed truncated JSON"])
+
+    def test_no_object(self):
+        self.assertEqual(parse_json_tolerant("no JSON here"), (None, []))
+
+
+class RepairResponseTest(unittest.TestCase):
+    def test_clamps_and_coerces(self):
+        content = json.dumps({"attribute": "Strength ", "difficulty_class": 25})
+        response, fixes = repair_response(content, AbilityCheckResponseModel)
+
+        self.assertEqual(response.attribute, "strength")
+        self.assertEqual(response.difficulty_class, 19)
+        self.assertEqual(len(fixes), 2)
+
+    def test_non_finite_numbers(self):
+        for difficulty_class in ["NaN", "Infinity", '"inf"']:
+            content = (
+                f'{{"attribute": "strength", "difficulty_class": {difficulty_class}}}'
+            )
+            response, _ = repair_response(content, AbilityCheckResponseModel)
+            self.assertIsNone(response)
+
+    def test_optional_fields(self):
+        content = json.dumps(
+            {
+                "action_type": "Ability Check",
+                "narrative_consistency": True,
+                "attribute": "Dexterity",
+                "difficulty_class": "1.6",
+            }
+        )
+        response, _ = repair_response(content, ClassifyAndCheckResponseModel)
+
+        self.assertEqual(response.action_type, "ability_check")
+        self.assertEqual(response.attribute, "dexterity")
+        self.assertEqual(response.difficulty_class, 3)
+
+    def test_optional_literal_coerced(self):
+        content = json.dumps(
+            {
+                "action_type": "skip floor",
+                "narrative_consistency": True,
+                "attribute": "Wisdom",
+                "difficulty_class": None,
+            }
+        )
+        response, fixes = repair_response(content, ClassifyAndCheckResponseModel)
+
+        self.assertEqual(response.action_type, "skip_floor")
+        self.assertEqual(response.attribute, "wisdom")
+        self.assertIsNone(response.difficulty_class)
+        self.assertEqual(len(fixes), 2)
+
+    def test_annotated_optional_and_lists(self):
+        response, fixes = repair_response(
+            '{"score": 12, "tags": ["a", "b", "c"]}', Scores
+        )
+        self.assertEqual(response.score, 10)
+        self.assertEqual(response.tags, ["a", "b"])
+        self.assertEqual(len(fixes), 2)
+
+    def test_unrepairable(self):
+        response, _ = repair_response(
+            '{"attribute": "luck"}', AbilityCheckResponseModel
+        )
+        self.assertIsNone(response)
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from game.llm_api.SuggestActionRequest import SuggestActionResponseModel
+from game.models.LLMCache import LLMCache, get_shared_cache
+
+from .fakes import FakeProvider
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class OtherAnswer(BaseModel):
+    count: int
+
+
+class ThreadRecordingCache(LLMCache):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def get(self, key, ResponseModel):
+        self.threads.add(threading.current_thread().name)
+        return super().get(key, ResponseModel)
+
+    def set(self, key, response):
+        self.threads.add(threading.current_thread().name)
+        super().set(key, response)
+
+
+class LLMCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "llm_cache.sqlite3")
+
+    def open(self, **kwargs) -> LLMCache:
+        cache = LLMCache(path=self.path, **kwargs)
+        self.addCleanup(cache.connection.close)
+        return cache
+
+    def test_memory_hit(self):
+        cache = LLMCache()
+        cache.set("key", Answer(text="hello"))
+
+        self.assertEqual(cache.get("key", Answer), Answer(text="hello"))
+        self.assertIsNone(cache.get("other", Answer))
+        self.assertEqual(cache.stats["memory_hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_disk_shared_between_caches(self):
+        self.open().set("key", Answer(text="hello"))
+
+        other = self.open()
+        self.assertEqual(other.get("key", Answer), Answer(text="hello"))
+        self.assertEqual(other.stats["disk_hits"], 1)
+
+        # Promoted to the memory tier
+        self.assertEqual(other.get("key", Answer), Answer(text="hello"))
+        self.assertEqual(other.stats["memory_hits"], 1)
+
+    def test_expired_entry(self):
+        cache = self.open(ttl=-1)
+        cache.set("key", Answer(text="hello"))
+
+        self.assertIsNone(cache.get("key", Answer))
+        (count,) = cache.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        self.assertEqual(count, 0)
+
+    def test_invalid_entry_deleted(self):
+        cache = self.open()
+        cache.set("key", Answer(text="hello"))
+
+        # The response model changed since the entry was stored
+        self.assertIsNone(cache.get("key", OtherAnswer))
+        self.assertNotIn("key", cache.memory)
+        self.assertIsNone(self.open().get("key", Answer))
+
+    def test_memory_eviction(self):
+        cache = LLMCache(max_memory_entries=2)
+        for key in ["a", "b", "c"]:
+            cache.set(key, Answer(text=key))
+
+        self.assertIsNone(cache.get("a", Answer))
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_disk_trimmed_every_few_stores(self):
+        cache = self.open(max_disk_entries=2, evict_every=3)
+
+        def count():
+            return cache.connection.execute(
+                "SELECT COUNT(*) FROM llm_cache"
+            ).fetchone()[0]
+
+        for key in ["a", "b", "c"]:
+            cache.set(key, Answer(text=key))
+        self.assertEqual(count(), 2)
+
+        # Over the limit until the next trim
+        for key in ["d", "e"]:
+            cache.set(key, Answer(text=key))
+        self.assertEqual(count(), 4)
+
+        cache.set("f", Answer(text="f"))
+        self.assertEqual(count(), 2)
+
+    def test_disabled_by_default(self):
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertIsNone(get_shared_cache())
+
+    def test_key(self):
+        key = LLMCache.make_key("model", [{"role": "user"}], Answer, 0.0, 100)
+        self.assertEqual(
+            key, LLMCache.make_key("model", [{"role": "user"}], Answer, 0.0, 100)
+        )
+        self.assertNotEqual(
+            key, LLMCache.make_key("model", [{"role": "user"}], Answer, 0.7, 100)
+        )
+        self.assertNotEqual(
+            key, LLMCache.make_key("model", [{"role": "user"}], OtherAnswer, 0.0, 100)
+        )
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class ProviderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakeProvider(
+            {"SuggestActionResponseModel": {"suggested_actions": ["Run", "Hide"]}}
+        )
+        self.provider.cache = ThreadRecordingCache()
+
+    def complete(self, use_cache=True):
+        return self.provider.get_completion(
+            SuggestActionResponseModel,
+            use_cache=use_cache,
+            messages=[{"role": "user", "content": "What now?"}],
+            temperature=0,
+        )
+
+    def test_cache_hit_is_reused(self):
+        first = self.complete()
+        second = self.complete()
+
+        self.assertEqual(len(self.provider.calls), 1)
+        self.assertFalse(first.reused)
+        self.assertTrue(second.reused)
+        self.assertEqual(second.suggested_actions, ["Run", "Hide"])
+
+    def test_cache_off_the_provider_loop(self):
+        self.complete()
+        self.complete()
+
+        self.assertTrue(self.provider.cache.threads)
+        self.assertNotIn("llm-provider-loop", self.provider.cache.threads)
+
+    def test_not_cached_without_opt_in(self):
+        self.complete(use_cache=False)
+        self.complete(use_cache=False)
+
+        self.assertEqual(len(self.provider.calls), 2)
+        self.assertEqual(self.provider.cache.stats["stores"], 0)
@@ -0,0 +1,165 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from game.classes.EntityClasses import Player
+from game.classes.NonCombatFloor import NonCombatFloor
+from game.classes.NonCombatFloorType import NonCombatFloorType
+from game.models.LLMProvider import (
+    AsyncLLMProvider,
+    CompletionChunk,
+    TextFieldStream,
+    get_provider_loop,
+)
+from game.models.LlamaCppProvider import LlamaCppProvider, LlamaCppQueueFullError
+from game.models.RetryPolicy import RetryBudget
+
+from .fakes import FakeProvider
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class Story(BaseModel):
+    narrative: str
+    health_change: int
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class AsyncLLMProviderTest(unittest.TestCase):
+    def test_blocking_completion(self):
+        provider = FakeProvider({"Answer": {"text": "hello"}})
+
+        self.assertEqual(provider.get_completion(Answer), Answer(text="hello"))
+        self.assertEqual(provider.in_flight, 0)
+
+    def test_completion_from_another_loop(self):
+        provider = FakeProvider({"Answer": {"text": "hello"}}, delay=0.05)
+
+        async def both():
+            return await asyncio.gather(
+                provider.aget_completion(Answer, messages=[{"content": "a"}]),
+                provider.aget_completion(Answer, messages=[{"content": "b"}]),
+            )
+
+        self.assertEqual(asyncio.run(both()), [Answer(text="hello")] * 2)
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_cannot_block_inside_the_loop(self):
+        async def nested():
+            return get_provider_loop().run(asyncio.sleep(0))
+
+        with self.assertRaises(RuntimeError):
+            get_provider_loop().run(nested())
+
+    def test_error_reaches_the_caller(self):
+        provider = FakeProvider({"Answer": KeyError("answer")})
+
+        with self.assertRaises(KeyError):
+            provider.get_completion(Answer)
+        self.assertEqual(len(provider.calls), 1)
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class RetryLoopTest(unittest.TestCase):
+    def test_bad_output_retried(self):
+        provider = FakeProvider({"Answer": ["not JSON", {"text": "hello"}]})
+
+        with self.assertLogs("game.models.LLMProvider", "WARNING") as logs:
+            self.assertEqual(provider.get_completion(Answer), Answer(text="hello"))
+
+        self.assertEqual(len(provider.calls), 2)
+        self.assertIn("Answer attempt 1 failed", logs.output[0])
+
+    def test_gives_up_after_max_retries(self):
+        provider = FakeProvider({"Answer": "not JSON"})
+
+        with self.assertRaises(ValueError), self.assertLogs(level="WARNING"):
+            provider.get_completion(Answer)
+        self.assertEqual(len(provider.calls), 3)
+
+    def test_turn_retry_budget(self):
+        provider = FakeProvider({"Answer": ["not JSON", {"text": "hello"}]})
+
+        with self.assertRaises(ValueError):
+            provider.get_completion(Answer, retry_budget=RetryBudget(0))
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_provider_refuses_retry(self):
+        provider = LlamaCppProvider("model.gguf")
+        self.assertFalse(
+            provider.should_retry(LlamaCppQueueFullError("model.gguf", 8), 0)
+        )
+
+    def test_generation_is_required(self):
+        class NoGeneration(AsyncLLMProvider):
+            def __init__(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoGeneration()
+
+
+class TextFieldStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.stream = TextFieldStream("narrative", self.sent.append)
+
+    def test_forwards_the_field_only(self):
+        for snapshot in [
+            '{"narr',
+            '{"narrative": "You o',
+            '{"narrative": "You open it", "h',
+        ]:
+            self.stream(CompletionChunk(delta="", snapshot=snapshot))
+
+        self.assertEqual(self.sent, ["You o", "pen it"])
+
+    def test_retry_starts_again(self):
+        self.stream(CompletionChunk(delta="", snapshot='{"narrative": "You'))
+        self.stream(CompletionChunk(delta="", snapshot='{"narrative": "A', attempt=1))
+
+        self.assertEqual(self.sent, ["You", "A"])
+
+
+@patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "0"})
+class StreamCompletionTest(unittest.TestCase):
+    def test_chunks_then_response(self):
+        provider = FakeProvider(
+            {"Story": {"narrative": "You open it", "health_change": 0}}
+        )
+
+        async def stream():
+            return [chunk async for chunk in provider.astream_completion(Story)]
+
+        chunks = asyncio.run(stream())
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(chunks[-2].partial()["narrative"], "You open it")
+        self.assertEqual(
+            chunks[-1].response, Story(narrative="You open it", health_change=0)
+        )
+
+    def test_floor_intro_streamed(self):
+        provider = FakeProvider(
+            {
+                "NonCombatFloorIntroResponseModel": {
+                    "description": "A long hall lit by torches.",
+                    "investigation_hook": "A door creaks.",
+                    "suggested_actions": ["Open the door"],
+                    "summary": "A hall",
+                }
+            },
+            chunk_size=4,
+        )
+        player = Player.create_start_player_with_random_stats("Tester", "A tester")
+        floor = NonCombatFloor("crypt", player, provider).reload()
+
+        streamed = []
+        floor.narrative_stream = streamed.append
+        floor.init_floor(NonCombatFloorType.TREASURE)
+
+        self.assertGreater(len(streamed), 1)
+        self.assertEqual("".join(streamed), "A long hall lit by torches.")
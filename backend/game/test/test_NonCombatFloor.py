@@ -0,0 +1,158 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from game.classes.EntityClasses import Player
+from game.classes.NonCombatFloor import (
+    HandleUserInputEnd,
+    HandleUserInputRespond,
+    HandleUserInputSuggestedAction,
+    NonCombatFloor,
+)
+from game.classes.NonCombatFloorType import NonCombatFloorType
+from game.classes.Progression import Progression
+from game.classes.RollResults import RollResult
+from game.llm_api import LLMRequest as LLMRequestModule
+from game.llm_api.AbilityCheckRequest import AbilityCheckRequest
+from game.llm_api.AbilityCheckResolutionRequest import (
+    AbilityCheckResolutionRequest,
+    AbilityCheckResolutionResponseModel,
+    AbilityCheckResolutionWithSuggestionsRequest,
+    AbilityCheckResolutionWithSuggestionsResponseModel,
+)
+from game.llm_api.SuggestActionRequest import SuggestActionResponseModel
+
+from .fakes import FakeProvider
+
+RESOLUTION = {
+    "narrative": "You find a lever.",
+    "health_change": 0,
+    "summary": "Found a lever.",
+}
+
+
+def make_floor(provider: FakeProvider) -> NonCombatFloor:
+    player = Player.create_start_player_with_random_stats("Tester", "A tester")
+    floor = NonCombatFloor("crypt", player, provider).reload()
+    floor.floor_type = NonCombatFloorType.HIDDEN_TRAP
+    return floor
+
+
+class RequestObjectsTest(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakeProvider()
+
+    def shared_requests(self, provider: FakeProvider) -> dict:
+        return LLMRequestModule._shared_requests.get(provider, {})
+
+    def test_built_on_first_use(self):
+        floor = make_floor(self.provider)
+        self.assertEqual(self.shared_requests(self.provider), {})
+
+        request = floor.ability_check_request
+        self.assertIsInstance(request, AbilityCheckRequest)
+        self.assertEqual(
+            list(self.shared_requests(self.provider)), [AbilityCheckRequest]
+        )
+
+    def test_shared_by_floors_of_a_provider(self):
+        request = make_floor(self.provider).ability_check_request
+
+        self.assertIs(make_floor(self.provider).ability_check_request, request)
+        self.assertIsNot(make_floor(FakeProvider()).ability_check_request, request)
+
+
+class ResolutionWithSuggestionsTest(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakeProvider(
+            {
+                "AbilityCheckResolutionResponseModel": RESOLUTION,
+                "AbilityCheckResolutionWithSuggestionsResponseModel": {
+                    **RESOLUTION,
+                    "suggested_actions": ["Pull the lever", "Leave it"],
+                },
+                "SuggestActionResponseModel": {"suggested_actions": ["Unused"]},
+            }
+        )
+        self.floor = make_floor(self.provider)
+
+    def test_request_by_progression(self):
+        end = self.floor.event_length
+        for progression, request_cls in [
+            (Progression.load(1, end), AbilityCheckResolutionWithSuggestionsRequest),
+            (Progression.load(end, end), AbilityCheckResolutionRequest),
+            (Progression.load(-1, end), AbilityCheckResolutionRequest),
+        ]:
+            request = self.floor.resolution_request_for(progression)
+            self.assertIs(type(request), request_cls)
+
+    def test_suggestions_come_with_the_resolution(self):
+        output = self.floor.handle_ability_check(
+            "Search the room",
+            HandleUserInputRespond(),
+            by_pass_roll_result=RollResult.SUCCESS,
+            verbose=False,
+        )
+
+        self.assertIsInstance(output, HandleUserInputSuggestedAction)
+        self.assertEqual(output.suggested_actions, ["Pull the lever", "Leave it"])
+        self.assertEqual(self.provider.calls_of(SuggestActionResponseModel), [])
+
+    def test_failed_floor_uses_the_plain_resolution(self):
+        # The failure ends the event
+        with patch("game.classes.NonCombatFloor.random.random", return_value=0.0):
+            output = self.floor.handle_ability_check(
+                "Search the room",
+                HandleUserInputRespond(),
+                by_pass_roll_result=RollResult.FAILURE,
+                verbose=False,
+            )
+
+        self.assertIsInstance(output, HandleUserInputEnd)
+        self.assertEqual(
+            len(self.provider.calls_of(AbilityCheckResolutionResponseModel)), 1
+        )
+        self.assertEqual(
+            self.provider.calls_of(AbilityCheckResolutionWithSuggestionsResponseModel),
+            [],
+        )
+        self.assertEqual(self.provider.calls_of(SuggestActionResponseModel), [])
+
+
+class SpeculativeResolutionTest(unittest.TestCase):
+    def test_cancelled_when_the_roll_fails(self):
+        provider = FakeProvider(
+            {
+                "AbilityCheckResolutionWithSuggestionsResponseModel": {
+                    **RESOLUTION,
+                    "suggested_actions": ["Pull the lever"],
+                },
+            },
+            delay=5.0,
+        )
+        floor = make_floor(provider)
+
+        graphs = []
+
+        def speculate(*args):
+            graphs.append(NonCombatFloor.speculate_resolutions(floor, *args))
+            return graphs[-1]
+
+        with patch.object(NonCombatFloor, "speculative_resolution", True), patch.object(
+            floor, "speculate_resolutions", side_effect=speculate
+        ), patch.object(
+            floor, "handle_ability_roll", side_effect=ValueError("no ability check")
+        ):
+            with self.assertRaises(ValueError):
+                floor.handle_ability_check("Search the room", HandleUserInputRespond())
+
+        # Both resolutions were started and are not left running
+        (graph,) = graphs
+        self.assertEqual(len(graph.nodes), 2)
+        for node in graph.nodes.values():
+            self.assertTrue(node.future.cancelled())
+
+        deadline = time.monotonic() + 1.0
+        while provider.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(provider.in_flight, 0)
@@ -0,0 +1,55 @@
+import unittest
+
+from game.llm_api.PromptBudget import estimate_tokens, fit_lines
+
+MARKER = "(Earlier events omitted)\n"
+
+
+def line(role: str, words: int) -> tuple[str, str]:
+    line.count += 1
+    return role, f"{role} {line.count}: {'word ' * words}\n"
+
+
+line.count = 0
+
+
+class EstimateTokensTest(unittest.TestCase):
+    def test_estimate(self):
+        self.assertEqual(estimate_tokens(None), 0)
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("a" * 9), 3)
+
+
+class FitLinesTest(unittest.TestCase):
+    def test_everything_fits(self):
+        lines = [line("Narrator", 5), line("Player", 5)]
+        self.assertEqual(fit_lines(lines, 1000), "".join(text for _, text in lines))
+
+    def test_newest_line_always_kept(self):
+        lines = [line("Narrator", 5), line("Player", 500)]
+        self.assertEqual(fit_lines(lines, 10), MARKER + lines[-1][1])
+
+    def test_collapses_to_narrator_lines(self):
+        lines = [
+            line("Narrator", 10),
+            line("Player", 10),
+            line("Narrator", 10),
+            line("Player", 10),
+            line("Narrator", 10),
+        ]
+        # Room for three recent lines and the oldest narrator line
+        budget = estimate_tokens(lines[-1][1]) * 4
+        fitted = fit_lines(lines, budget)
+
+        # Only the collapsed player line is dropped, it still needs the note
+        self.assertTrue(fitted.startswith(MARKER))
+        self.assertNotIn(lines[1][1], fitted)
+        self.assertIn(lines[0][1], fitted)
+        self.assertTrue(fitted.endswith(lines[-1][1]))
+
+    def test_oldest_lines_dropped(self):
+        lines = [line("Narrator", 50)] + [line("Player", 10) for _ in range(3)]
+        fitted = fit_lines(lines, estimate_tokens(lines[-1][1]) * 2)
+
+        self.assertTrue(fitted.startswith(MARKER))
+        self.assertNotIn(lines[0][1], fitted)
@@ -0,0 +1,91 @@
+import unittest
+
+from game.classes.EntityClasses import Player
+from game.classes.FloorHistory import FloorHistory
+from game.llm_api.AbilityCheckRequest import AbilityCheckRequest
+from game.llm_api.PromptTemplates import (
+    FIELD_TIERS,
+    PromptTemplate,
+    PromptTemplateError,
+    get_prompt_templates,
+)
+from game.models.LLMProvider import ollama
+
+from .fakes import FakeProvider
+
+
+class PromptTemplateTest(unittest.TestCase):
+    def test_format_matches_str_format(self):
+        user = "Describe the floor.\n\nTheme: {theme}\nHistory: {history!r}\nAction: {user_input:>8}"
+        template = PromptTemplate("test", "system", user)
+        context = {"theme": "A crypt", "history": "none", "user_input": "Run"}
+
+        self.assertEqual(template.format(**context), user.format(**context))
+        self.assertEqual(template.fields, {"theme", "history", "user_input"})
+
+    def test_missing_field(self):
+        template = PromptTemplate("test", "system", "Theme: {theme}")
+        with self.assertRaises(PromptTemplateError):
+            template.format()
+
+    def test_stable_fields_first(self):
+        with self.assertRaises(PromptTemplateError):
+            PromptTemplate("test", "system", "Action: {user_input}\nTheme: {theme}")
+
+    def test_instructions_before_placeholders(self):
+        with self.assertRaises(PromptTemplateError):
+            PromptTemplate("test", "system", "Theme: {theme}\nAnswer in JSON.")
+
+    def test_unknown_field(self):
+        with self.assertRaises(PromptTemplateError):
+            PromptTemplate("test", "system", "Weather: {weather}")
+
+    def test_plain_names_only(self):
+        with self.assertRaises(PromptTemplateError):
+            PromptTemplate("test", "system", "Theme: {theme.title}")
+
+
+class PromptTemplateRegistryTest(unittest.TestCase):
+    def test_shipped_templates_load(self):
+        templates = get_prompt_templates()
+        self.assertTrue(templates.templates)
+
+        with self.assertRaises(PromptTemplateError):
+            templates.get("missing.txt")
+
+
+class PrefixStableLayoutTest(unittest.TestCase):
+    def test_shipped_templates_are_prefix_stable(self):
+        for name, template in get_prompt_templates().templates.items():
+            with self.subTest(name):
+                template.check_prefix_stable()
+                tiers = [
+                    FIELD_TIERS[field]
+                    for _, field, _, _ in template.segments
+                    if field is not None
+                ]
+                self.assertEqual(tiers, sorted(tiers))
+
+    def test_turns_share_the_prompt_prefix(self):
+        request = AbilityCheckRequest(FakeProvider())
+        player = Player.create_start_player_with_random_stats("Tester", "A tester")
+        history = FloorHistory()
+        history.add_narrative("A dark room with a wooden chest")
+
+        first = request.render(player, history, "Open the chest").messages
+        second = request.render(player, history, "Look around").messages
+
+        self.assertEqual(first[0], second[0])
+        # Only the action at the end differs, so the backend can reuse its KV cache
+        prefix = first[1]["content"].split("Open the chest")[0]
+        self.assertTrue(second[1]["content"].startswith(prefix))
+        self.assertIn("A dark room with a wooden chest", prefix)
+
+    def test_ollama_keeps_the_model_loaded(self):
+        provider = ollama(base_url="http://127.0.0.1:9/v1")
+        kwargs = provider.with_extra_body({"extra_body": {"seed": 1}})
+
+        self.assertEqual(
+            kwargs["extra_body"],
+            {"keep_alive": ollama.extra_body["keep_alive"], "seed": 1},
+        )
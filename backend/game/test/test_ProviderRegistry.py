@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch
+
+from game.models.HedgedProvider import HedgedProvider
+from game.models.LLMProvider import Llama_3_3_8B_Instruct, OpenRouterProvider, ollama
+from game.models.LlamaCppProvider import LlamaCppProvider
+from game.models.ProviderRegistry import ProviderRegistry, get_session_provider
+
+
+@patch.dict("os.environ", {"LLM_CACHE_ENABLED": "0"})
+class ProviderRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ProviderRegistry()
+
+    def test_reuses_provider(self):
+        provider = self.registry.get(ollama)
+
+        self.assertIs(self.registry.get(ollama), provider)
+        self.assertIsNot(self.registry.get(ollama, model="other"), provider)
+
+    def test_base_url(self):
+        provider = self.registry.get(ollama, base_url="http://gpu-box:11434/v1")
+
+        self.assertEqual(provider.base_url, "http://gpu-box:11434/v1")
+        self.assertIsNot(self.registry.get(ollama), provider)
+        self.assertIs(
+            self.registry.get(ollama, base_url="http://gpu-box:11434/v1"), provider
+        )
+
+    def test_base_url_not_taken(self):
+        with self.assertRaises(ValueError):
+            self.registry.get(OpenRouterProvider, base_url="http://gpu-box/v1")
+
+        with self.assertRaises(ValueError):
+            self.registry.get(LlamaCppProvider, model="model.gguf")
+
+    def test_hedged_over_shared_backends(self):
+        with patch.dict("os.environ", {"OPENROUTER_API_KEY": "key"}):
+            hedged = self.registry.get_hedged(ollama, Llama_3_3_8B_Instruct)
+
+        self.assertIsInstance(hedged, HedgedProvider)
+        self.assertIs(hedged.primary, self.registry.get(ollama))
+        self.assertIs(self.registry.get_hedged(ollama, Llama_3_3_8B_Instruct), hedged)
+
+    def test_session_provider(self):
+        with patch(
+            "game.models.ProviderRegistry.provider_registry", self.registry
+        ), patch.dict("os.environ", {"LLM_PRIMARY_PROVIDER": "ollama"}):
+            self.assertIs(get_session_provider(), self.registry.get(ollama))
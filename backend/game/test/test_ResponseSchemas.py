@@ -0,0 +1,33 @@
+import unittest
+
+from game.llm_api.ClassifyAndCheckRequest import ClassifyAndCheckResponseModel
+from game.models.ResponseSchemas import get_response_schema
+
+
+class ResponseSchemaTest(unittest.TestCase):
+    def test_strict_response_format(self):
+        schema = get_response_schema(ClassifyAndCheckResponseModel)
+        response_format = schema.response_format
+
+        self.assertEqual(response_format["type"], "json_schema")
+        self.assertEqual(
+            response_format["json_schema"]["name"], "ClassifyAndCheckResponseModel"
+        )
+        self.assertTrue(response_format["json_schema"]["strict"])
+
+        # Strict mode wants every property required and no extra ones
+        strict = response_format["json_schema"]["schema"]
+        self.assertFalse(strict["additionalProperties"])
+        self.assertEqual(set(strict["required"]), set(strict["properties"]))
+
+    def test_computed_once(self):
+        self.assertIs(
+            get_response_schema(ClassifyAndCheckResponseModel),
+            get_response_schema(ClassifyAndCheckResponseModel),
+        )
+
+    def test_validate_json(self):
+        response = get_response_schema(ClassifyAndCheckResponseModel).validate_json(
+            '{"action_type": "skip_floor", "narrative_consistency": true}'
+        )
+        self.assertEqual(response.action_type, "skip_floor")
@@ -0,0 +1,158 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from game.llm_api.PromptTemplates import PromptTemplateError
+from game.models.RetryPolicy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    EmptyResponseError,
+    RetryBudget,
+    RetryPolicy,
+    current_retry_budget,
+    retry_budget_scope,
+)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(max_retries=2, base_delay=0.5, max_delay=1.0)
+
+    def test_delay_is_capped(self):
+        for retry in range(5):
+            delay = self.policy.delay(retry)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(1.0, 0.5 * 2**retry))
+
+    def test_retried_errors(self):
+        request = httpx.Request("POST", "http://llm")
+        retried = [
+            json.JSONDecodeError("bad", "{", 0),
+            EmptyResponseError(),
+            openai.APIConnectionError(request=request),
+            openai.APITimeoutError(request=request),
+        ]
+        for error in retried:
+            self.assertTrue(self.policy.should_retry(error, 0), error)
+
+        self.assertFalse(self.policy.should_retry(KeyError("answer"), 0))
+        self.assertFalse(self.policy.should_retry(ValueError("bad argument"), 0))
+        self.assertFalse(self.policy.should_retry(CircuitOpenError("llm", 10), 0))
+
+    def test_broken_template_not_retried(self):
+        # A ValueError too, but it fails the same way every time
+        error = PromptTemplateError("intro: missing fields theme")
+        self.assertFalse(self.policy.is_output_error(error))
+        self.assertFalse(self.policy.should_retry(error, 0))
+
+    def test_status_errors(self):
+        request = httpx.Request("POST", "http://llm")
+
+        def status_error(status_code):
+            response = httpx.Response(status_code, request=request)
+            return openai.APIStatusError("error", response=response, body=None)
+
+        self.assertTrue(self.policy.should_retry(status_error(503), 0))
+        self.assertFalse(self.policy.should_retry(status_error(400), 0))
+
+    def test_max_retries(self):
+        error = EmptyResponseError()
+        self.assertTrue(self.policy.should_retry(error, 1))
+        self.assertFalse(self.policy.should_retry(error, 2))
+
+
+class RetryBudgetTest(unittest.TestCase):
+    def test_consume(self):
+        budget = RetryBudget(2)
+        self.assertTrue(budget.consume())
+        self.assertTrue(budget.consume())
+        self.assertFalse(budget.consume())
+
+    def test_scope_shared_by_nested_calls(self):
+        @retry_budget_scope
+        def inner():
+            return current_retry_budget.get()
+
+        @retry_budget_scope
+        def outer():
+            return current_retry_budget.get(), inner()
+
+        budget, inner_budget = outer()
+        self.assertIsNotNone(budget)
+        self.assertIs(budget, inner_budget)
+        self.assertIsNone(current_retry_budget.get())
+
+        # Every turn gets a budget of its own
+        self.assertIsNot(outer()[0], budget)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch(
+            "game.models.RetryPolicy.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+
+    def open_circuit(self):
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        self.open_circuit()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_trial_closes(self):
+        self.open_circuit()
+        self.now += 10
+
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        # Only one trial at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_cancelled_trial_reopens(self):
+        self.open_circuit()
+        self.now += 10
+        self.breaker.before_call()
+
+        self.breaker.record_cancelled()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        # A new trial once the fresh timeout passed
+        self.now += 10
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_lost_trial_is_replaced(self):
+        self.open_circuit()
+        self.now += 10
+        self.breaker.before_call()
+
+        # The trial never reports back
+        self.now += 10
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_cancel_while_closed_is_ignored(self):
+        self.breaker.before_call()
+        self.breaker.record_cancelled()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
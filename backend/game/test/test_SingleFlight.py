@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from game.models.SingleFlight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def work(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+    async def test_coalesces_concurrent_calls(self):
+        first = asyncio.create_task(self.single_flight.do("key", self.work))
+        second = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await first, (1, False))
+        self.assertEqual(await second, (1, True))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.single_flight.stats, {"leaders": 1, "followers": 1})
+
+    async def test_landed_flight_leaves_no_state(self):
+        first = asyncio.create_task(self.single_flight.do("key", self.work))
+        second = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+        self.release.set()
+        await asyncio.gather(first, second)
+
+        self.assertEqual(len(self.single_flight), 0)
+        self.assertEqual(self.single_flight.flights, {})
+
+        # The next call starts a new flight
+        self.assertEqual(await self.single_flight.do("key", self.work), (2, False))
+
+    async def test_survives_leader_cancel(self):
+        leader = asyncio.create_task(self.single_flight.do("key", self.work))
+        follower = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await follower, (1, True))
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+    async def test_cancels_work_without_waiters(self):
+        leader = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+        task = self.single_flight.flights["key"].task
+
+        leader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0)
+
+        self.assertTrue(task.cancelled())
+        self.assertEqual(len(self.single_flight), 0)
+
+    async def test_new_flight_not_cancelled_by_old_waiters(self):
+        first = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+        self.release.set()
+        await first
+
+        # A waiter of the landed flight leaving must not touch the new one
+        self.release.clear()
+        second = asyncio.create_task(self.single_flight.do("key", self.work))
+        await asyncio.sleep(0)
+        self.assertEqual(self.single_flight.flights["key"].waiters, 1)
+
+        self.release.set()
+        self.assertEqual(await second, (2, False))
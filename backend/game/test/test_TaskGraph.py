@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import unittest
+
+from game.models.TaskGraph import SpeculationStats, TaskGraph
+
+player: contextvars.ContextVar[str] = contextvars.ContextVar("player", default="")
+
+
+async def value(result, delay: float = 0.0):
+    await asyncio.sleep(delay)
+    return result
+
+
+async def forever():
+    await asyncio.Event().wait()
+
+
+class TaskGraphTest(unittest.TestCase):
+    def test_dependencies_get_results(self):
+        with TaskGraph() as graph:
+            graph.add("a", lambda: value(1))
+            graph.add("b", lambda: value(2))
+            graph.add("sum", lambda a, b: value(a + b), deps=("a", "b"))
+
+            self.assertEqual(graph.result("sum"), 3)
+
+    def test_unknown_dependency(self):
+        with TaskGraph() as graph:
+            with self.assertRaises(ValueError):
+                graph.add("b", lambda a: value(a), deps=("a",))
+
+    def test_independent_calls_run_concurrently(self):
+        with TaskGraph() as graph:
+            graph.add("a", lambda: value(1, 0.1))
+            graph.add("b", lambda: value(2, 0.1))
+            graph.add("c", lambda a: value(a, 0.1), deps=("a",))
+            graph.result("b")
+            graph.result("c")
+
+            timing = graph.timing()
+
+        self.assertLess(timing["critical_path_ms"], timing["serial_ms"])
+        self.assertGreaterEqual(timing["critical_path_ms"], 190)
+        self.assertLess(timing["wall_ms"], timing["serial_ms"])
+
+    def test_discard_cancels_speculation(self):
+        with TaskGraph() as graph:
+            graph.add("used", lambda: value(1))
+            graph.add("speculation", forever, speculative=True)
+            graph.result("used")
+
+            graph.discard("speculation")
+            self.assertTrue(graph.nodes["speculation"].future.cancelled())
+            self.assertEqual(graph.timing()["discarded"], ["speculation"])
+
+    def test_close_cancels_running_calls(self):
+        graph = TaskGraph()
+        graph.add("pending", forever)
+
+        timing = graph.close()
+        self.assertTrue(graph.nodes["pending"].future.cancelled())
+        self.assertEqual(timing["discarded"], ["pending"])
+
+    def test_calls_see_caller_context(self):
+        async def read_player():
+            return player.get()
+
+        token = player.set("tester")
+        try:
+            with TaskGraph() as graph:
+                graph.add("player", read_player)
+                self.assertEqual(graph.result("player"), "tester")
+
+        finally:
+            player.reset(token)
+
+
+class SpeculationStatsTest(unittest.TestCase):
+    def test_summary(self):
+        stats = SpeculationStats()
+        self.assertIsNone(stats.summary()["hit_rate"])
+
+        stats.record(hit=True, extra_calls=1, saved_ms=300)
+        stats.record(hit=False, extra_calls=1)
+
+        self.assertEqual(
+            stats.summary(),
+            {
+                "attempts": 2,
+                "hit_rate": 0.5,
+                "extra_calls_per_attempt": 1.0,
+                "saved_ms_per_attempt": 150.0,
+            },
+        )
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from game.models.Telemetry import LLMCallRecord, SQLiteSink, Telemetry, TelemetrySink
+
+
+class ListSink(TelemetrySink):
+    def __init__(self):
+        self.records = []
+        self.threads = set()
+
+    def write(self, record: LLMCallRecord):
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+class TelemetryTest(unittest.TestCase):
+    def test_aggregates_per_request_type(self):
+        telemetry = Telemetry()
+        telemetry.record(LLMCallRecord(request_type="intro", completion_tokens=100))
+        telemetry.record(LLMCallRecord(request_type="intro", cached=True))
+        telemetry.record(LLMCallRecord(request_type="reward", error="ValueError"))
+
+        summary = telemetry.summary()
+        self.assertEqual(summary["intro"]["calls"], 2)
+        self.assertEqual(summary["intro"]["cache_hits"], 1)
+        # The cache hit cost no tokens
+        self.assertEqual(summary["intro"]["completion_tokens"]["count"], 1)
+        self.assertEqual(summary["reward"]["errors"], 1)
+
+    def test_sinks_written_off_the_caller_thread(self):
+        sink = ListSink()
+        telemetry = Telemetry([sink])
+        for _ in range(3):
+            telemetry.record(LLMCallRecord(request_type="intro"))
+
+        telemetry.flush()
+        self.assertEqual(len(sink.records), 3)
+        self.assertEqual(sink.threads, {"telemetry-writer"})
+
+    def test_failing_sink_is_skipped(self):
+        class FailingSink(TelemetrySink):
+            def write(self, record):
+                raise OSError("disk full")
+
+        sink = ListSink()
+        telemetry = Telemetry([FailingSink(), sink])
+        telemetry.record(LLMCallRecord(request_type="intro"))
+
+        telemetry.flush()
+        self.assertEqual(len(sink.records), 1)
+
+
+class SQLiteSinkTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "telemetry.sqlite3")
+
+    def rows(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute("SELECT * FROM llm_calls")]
+
+    def test_writes_every_column(self):
+        sink = SQLiteSink(self.path)
+        sink.write(
+            LLMCallRecord(
+                request_type="intro", truncations=1, estimated_prompt_tokens=321
+            )
+        )
+        sink.close()
+
+        [row] = self.rows()
+        self.assertEqual(set(row), set(SQLiteSink.columns))
+        self.assertEqual(row["truncations"], 1)
+        self.assertEqual(row["estimated_prompt_tokens"], 321)
+
+    def test_migrates_old_table(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE llm_calls (timestamp REAL, request_type TEXT, "
+                "session TEXT, provider TEXT, model TEXT, prompt_tokens INTEGER, "
+                "completion_tokens INTEGER, latency_ms REAL, retries INTEGER, "
+                "validation_failures INTEGER, repairs INTEGER, cached INTEGER, "
+                "coalesced INTEGER, error TEXT)"
+            )
+            connection.execute("INSERT INTO llm_calls (request_type) VALUES ('old')")
+        connection.close()
+
+        sink = SQLiteSink(self.path)
+        sink.write(LLMCallRecord(request_type="new", truncations=2))
+        sink.close()
+
+        old, new = self.rows()
+        self.assertIsNone(old["truncations"])
+        self.assertEqual(new["truncations"], 2)
@@ -0,0 +1,83 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from game.models.TokenBudget import TokenBudgets, get_token_budgets
+
+
+def join_saves():
+    for thread in threading.enumerate():
+        if thread.name == "token-budgets-save":
+            thread.join()
+
+
+class TokenBudgetsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "llm_token_budgets.json")
+
+    def test_default_until_enough_samples(self):
+        budgets = TokenBudgets(min_samples=5, margin=0.25)
+        for _ in range(4):
+            budgets.observe("intro", 100)
+        self.assertEqual(budgets.budget("intro", 300), 300)
+
+        budgets.observe("intro", 100)
+        self.assertEqual(budgets.budget("intro", 300), 125)
+
+    def test_bounded_by_default(self):
+        budgets = TokenBudgets(min_samples=1, max_factor=2)
+        budgets.observe("intro", 1000)
+        self.assertEqual(budgets.budget("intro", 100), 200)
+
+    def test_widen_after_truncation(self):
+        budgets = TokenBudgets(min_samples=3)
+        for _ in range(3):
+            budgets.observe("intro", 40)
+
+        self.assertEqual(budgets.widen("intro", 100), 150)
+        self.assertGreaterEqual(budgets.budget("intro", 100), 150)
+
+        # Enough lengths since the truncation drop the widened minimum
+        for _ in range(3):
+            budgets.observe("intro", 40)
+        self.assertEqual(budgets.types["intro"].floor, 0)
+
+    def test_save_and_load(self):
+        budgets = TokenBudgets(path=self.path, min_samples=1)
+        budgets.observe("intro", 80)
+        budgets.save()
+        join_saves()
+
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["intro"]["samples"], [80])
+
+        loaded = TokenBudgets(path=self.path, min_samples=1, margin=0)
+        self.assertEqual(loaded.budget("intro", 300), 80)
+
+    def test_throttled_save_writes_from_a_thread(self):
+        budgets = TokenBudgets(path=self.path, save_interval=3600)
+        budgets.observe("intro", 80)
+        budgets.observe("intro", 90)
+
+        join_saves()
+
+        # Only the first observation was written, the second waits for the interval
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["intro"]["samples"], [80])
+        self.assertTrue(budgets.dirty)
+
+
+class GetTokenBudgetsTest(unittest.TestCase):
+    def test_off_by_default(self):
+        with patch.dict("os.environ"):
+            os.environ.pop("LLM_TOKEN_BUDGETS_ENABLED", None)
+            self.assertIsNone(get_token_budgets())
+
+    @patch.dict("os.environ", {"LLM_TOKEN_BUDGETS_ENABLED": "1"})
+    def test_enabled(self):
+        self.assertIsInstance(get_token_budgets(), TokenBudgets)